@@ -1,50 +1,15 @@
 import streamlit as st
-import altair as alt
-import pandas as pd
 import plotly.express as px
 import streamlit_shadcn_ui as ui
 
+from denviewer import data
+from denviewer.layout import setup_page, footer
 
-
-# Set Streamlit page config
-st.set_page_config(
-    page_title="DENViewer ", #Decoding 
-    page_icon="🧫",
-    layout="wide",
-    initial_sidebar_state="auto",
-)
+# Set Streamlit page config, sidebar logo and styling
+setup_page(wide_content=False)
 
 # App content
 st.markdown("<h1 style='text-align: center;'>Welcome to DENViewer</h1>", unsafe_allow_html=True)
-# Add logo (replace with your image path)
-
-
-st.sidebar.image("pages/images/lab_logo.png", use_container_width=True)
-st.sidebar.markdown('<p class="sidebar-title">DENViewer</p>', unsafe_allow_html=True)
-
-# Sidebar customization
-st.sidebar.markdown(
-    """
-    <style>
-        .sidebar-title {
-            font-size: 24px;
-            font-weight: bold;
-            text-align: center;
-            color: "white";
-            margin-bottom: 10px;
-        }
-        .sidebar-logo {
-            display: block;
-            margin: 0 auto;
-            width: 150px;  /* Adjust size as needed */
-            border-radius: 10px;
-        }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
-# Optional: Add a separator for aesthetics
-st.sidebar.markdown("---")
 #st.image("pages/images/background.webp", caption="created using DALL.E")
 
 #Description
@@ -63,10 +28,97 @@ st.markdown(
     )
 
 
-#Load GISAID data
-df = pd.read_csv('pages/files/gisaid_arbo_2025_03_31_07.csv')
-df2 = pd.read_csv('pages/files/all_demographics.csv')
-df3 = pd.read_csv('pages/files/Cases prevalent in India over time.csv')
+#Load GISAID, demographics and case report data
+df2 = data.load_demographics()
+df3 = data.load_cases()
+
+
+# Each widget and the chart it drives is a fragment: changing the widget
+# reruns only that fragment, not the whole page
+@st.fragment
+def surveillance_bubble_chart(aggregates):
+    df_scatter = aggregates["by_date_location"]
+
+# Dropdown to select serotype
+    serotype_options = ["All"] + sorted(df_scatter["Serotype"].unique().tolist())
+    selected_serotype = st.selectbox("Select Serotype:", serotype_options)
+
+# Filter data based on selection
+    if selected_serotype == "All":
+        df_filtered = df_scatter.groupby(["Date", "Location"], as_index=False)["Count"].sum()
+    else:
+        df_filtered = df_scatter[df_scatter["Serotype"] == selected_serotype]
+
+# Plotly Scatter Plot
+    fig1 = px.scatter(
+        df_filtered,
+        x="Date",
+        y="Location",
+        size="Count",
+        color="Location",
+        title="Country-wise Dengue Genome Surveillance",
+        height=800, width= 800,
+        opacity =1,
+    )
+
+# Force all y-axis values to display
+    fig1.update_layout(
+        xaxis=dict(
+            type="-",  # Ensures proper numerical representation
+            tickmode="array",
+            tickvals=aggregates["dates"],  # Show all unique x-values
+        ),
+        yaxis=dict(
+            categoryorder="total ascending",
+            tickmode="array",
+            tickvals=aggregates["locations"],
+        ),
+    )
+
+    fig1.update_traces(textposition="middle right")
+
+   # Display in Streamlit
+    st.plotly_chart(fig1)
+
+
+@st.fragment
+def state_case_tables(df3):
+    year_list = list(df3.Year.unique())[::-1]
+    selected_year = st.selectbox('Select a year', year_list, index=0)
+
+    df_selected_year = df3[df3.Year == selected_year].sort_values(by="Cases", ascending=False)
+    st.dataframe(
+        df_selected_year[["State", "Cases"]],
+            hide_index=True,
+            column_config={
+            "State": st.column_config.TextColumn("State"),
+            "Cases": st.column_config.ProgressColumn(
+                "Cases",
+                    format="%d",
+                    min_value=0,
+                    max_value=df_selected_year["Cases"].max(),
+                ),
+            },
+            width=None,
+        )
+
+    st.dataframe(
+        df_selected_year[["State", "Deaths"]],
+            hide_index=True,
+            column_config={
+            "State": st.column_config.TextColumn("State"),
+            "Deaths": st.column_config.ProgressColumn(
+                "Deaths",
+                    format="%d",
+                    min_value=0,
+                    max_value=df_selected_year["Deaths"].max(),
+                ),
+            },
+            width=None,
+        )    
+
+
+aggregates = data.load_gisaid_aggregates()
 
 #piechart count
 total_samples = len(df2)  
@@ -74,7 +126,7 @@ total_samples = len(df2)
 
 
 
-df_count = df.groupby(["Serotype", "Date"]).size().reset_index(name="Count")
+df_count = aggregates["by_serotype_date"]
 
 # Create bar chart
 fig2= px.area(
@@ -90,7 +142,7 @@ fig2= px.area(
 
 # Update layout for stacked area
 fig2.update_layout(
-    xaxis=dict(title="Date", tickvals=df["Date"].unique(),),
+    xaxis=dict(title="Date", tickvals=aggregates["dates"],),
     yaxis=dict(title="Number of Sequences"),
     legend_title="Serotype",
 )
@@ -104,8 +156,8 @@ with col1:
     
     df_gen = df2.dropna(subset=["Gender", "Severity"])  
 
-    gender_order = ["Male", "Female", "Child"]
-    df2["Gender"] = pd.Categorical(df2["Gender"], categories=gender_order, ordered=True)
+    # Gender and Severity are already ordered categoricals in the shared frame
+    gender_order = data.GENDER_ORDER
     
     if "Gender" in df2.columns:
         gender_counts = df2["Gender"].value_counts().reset_index()
@@ -120,8 +172,7 @@ with col1:
             category_orders={"Gender": gender_order}
         ).update_layout(width=500, height=500)
 
-    severity_order = ["Mild", "Moderate", "Severe"]
-    df2["Severity"] = pd.Categorical(df2["Severity"], categories=severity_order, ordered=True)
+    severity_order = data.SEVERITY_ORDER
 
     fig_gvs = px.sunburst(df_gen, 
         path=["Gender", "Severity"], 
@@ -141,90 +192,14 @@ with col2:
     sub_col1, sub_col2 = st.columns([2.5,1.5])
     
     with sub_col1:
-# Group by Date, Location, and Serotype to get the count
-        df_scatter = df.groupby(["Date", "Location", "Serotype"]).size().reset_index(name="Count")
-
-# Dropdown to select serotype
-        serotype_options = ["All"] + sorted(df_scatter["Serotype"].unique().tolist())
-        selected_serotype = st.selectbox("Select Serotype:", serotype_options)
-
-# Filter data based on selection
-        if selected_serotype == "All":
-            df_filtered = df_scatter.groupby(["Date", "Location"], as_index=False)["Count"].sum()
-        else:
-            df_filtered = df_scatter[df_scatter["Serotype"] == selected_serotype]
-
-# Plotly Scatter Plot
-        fig1 = px.scatter(
-        df_filtered,
-        x="Date",
-        y="Location",
-        size="Count",
-        color="Location",
-        title="Country-wise Dengue Genome Surveillance",
-        height=800, width= 800,
-        opacity =1,
-        )
-
-
-# Force all y-axis values to display
-        fig1.update_layout(
-        xaxis=dict(
-        type="-",  # Ensures proper numerical representation
-        tickmode="array",
-        tickvals=df["Date"].unique(),  # Show all unique x-values
-        ),  
-      yaxis=dict(
-        categoryorder="total ascending",
-        tickmode="array",
-        tickvals=df["Location"].unique(),
-        ),
-    )
-
-        fig1.update_traces(textposition="middle right")
-
-   # Display in Streamlit
-        st.plotly_chart(fig1)
+        surveillance_bubble_chart(aggregates)
 # Display second plot
         st.plotly_chart(fig2, use_container_width=True)
 
     with sub_col2:
         st.markdown('#### Case and Death Reports in Indian States')
 
-        year_list = list(df3.Year.unique())[::-1]
-        selected_year = st.selectbox('Select a year', year_list, index=0)
-
-        df_selected_year = df3[df3.Year == selected_year].sort_values(by="Cases", ascending=False)
-        st.dataframe(
-            df_selected_year[["State", "Cases"]],
-                hide_index=True,
-                column_config={
-                "State": st.column_config.TextColumn("State"),
-                "Cases": st.column_config.ProgressColumn(
-                    "Cases",
-                        format="%d",
-                        min_value=0,
-                        max_value=df_selected_year["Cases"].max(),
-                    ),
-                },
-                width=None,
-            )
-    
-        df_selected_year = df3[df3.Year == selected_year].sort_values(by="Cases", ascending=False)
-        st.dataframe(
-            df_selected_year[["State", "Deaths"]],
-                hide_index=True,
-                column_config={
-                "State": st.column_config.TextColumn("State"),
-                "Deaths": st.column_config.ProgressColumn(
-                    "Deaths",
-                        format="%d",
-                        min_value=0,
-                        max_value=df_selected_year["Deaths"].max(),
-                    ),
-                },
-                width=None,
-            )    
+        state_case_tables(df3)
 
         st.write('''
         Plot Data Source: [NCVBDC](<https://ncvbdc.mohfw.gov.in/index4.php?lang=1&level=0&linkid=431&lid=3715>).
@@ -238,12 +213,4 @@ with col2:
             ''')
 
 # Footer
-st.markdown(
-    """
-    <hr>
-    <p style='text-align: center;'>
-    © 2024 Rajesh Pandey | INGEN-HOPE Lab
-    </p>
-    """,
-    unsafe_allow_html=True
-)
+footer()
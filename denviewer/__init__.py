@@ -0,0 +1,5 @@
+# Shared helpers for the DENViewer pages.
+#
+# layout and assets only need streamlit, so the static Team page does not pay
+# for pandas or plotly. Heavier dependencies are imported by the modules that
+# need them (data, ...) or inside functions when only one code path uses them.
@@ -0,0 +1,215 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pyarrow as pa
+
+from denviewer import data, export, mutations, refresh, serotypes
+
+# Read-only HTTP API over the aggregates the dashboard draws. Every response
+# body is rendered once per data generation and carries a strong ETag, so
+# clients that send If-None-Match get a 304 until the data changes.
+API_PREFIX = "/api"
+EXPORT_PREFIX = API_PREFIX + "/export"
+# Bytes copied from an export file to the socket at a time
+STREAM_BYTES = 1 << 16
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8502
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+JSON_TYPE = "application/json"
+
+logger = logging.getLogger(__name__)
+
+
+def _severity_by_gender():
+    demographics = data.load_demographics().dropna(subset=["Gender", "Severity"])
+    counts = demographics.groupby(["Gender", "Severity"], observed=True).size()
+    return counts.reset_index(name="Count")
+
+
+def _age_by_severity():
+    demographics = data.load_demographics().dropna(subset=["Gender", "Severity", "Age"])
+    quartiles = demographics.groupby(["Gender", "Severity"], observed=True)["Age"].describe()
+    return quartiles.reset_index()
+
+
+def _mutation_frequency():
+    columns = ["Position", "Mutation", "Gene", "AA_mut", "Mutation Type", "Year",
+               "Frequency", *mutations.SEVERITY_FREQUENCIES.values()]
+    return mutations.load_mutations()[columns]
+
+
+# Dataset name -> (description, function returning its DataFrame)
+DATASETS = {
+    "serotypes-over-time": (
+        "GISAID sequences per serotype and year (Home area chart)",
+        lambda: data.load_gisaid_aggregates()["by_serotype_date"],
+    ),
+    "surveillance-by-location": (
+        "GISAID sequences per year, country and serotype (Home bubble chart)",
+        lambda: data.load_gisaid_aggregates()["by_date_location"],
+    ),
+    "state-cases": (
+        "Dengue cases and deaths per Indian state and year",
+        lambda: data.load_cases(),
+    ),
+    "mutation-frequency": (
+        "Mutation frequencies per year, overall and per severity class",
+        _mutation_frequency,
+    ),
+    "severity-association": (
+        "Per-mutation chi-square test of association with severity",
+        lambda: mutations.load_association(),
+    ),
+    "clinical-severity-by-gender": (
+        "Patients per gender and severity (Home sunburst)",
+        _severity_by_gender,
+    ),
+    "clinical-age-by-severity": (
+        "Age summary per gender and severity (Home box plot)",
+        _age_by_severity,
+    ),
+    "coinfection-combinations": (
+        "Samples per putative serotype combination",
+        lambda: serotypes.coinfection_summary()["combinations"],
+    ),
+    "coinfection-severity": (
+        "Severity counts per serotype combination",
+        lambda: serotypes.coinfection_summary()["severity_counts"].reset_index(),
+    ),
+}
+
+
+def _encode(df, fmt):
+    df = export.portable(df)
+    if fmt == "arrow":
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue(), ARROW_TYPE
+    return df.to_json(orient="records", date_format="iso").encode("utf-8"), JSON_TYPE
+
+
+@refresh.cached
+def render(name, fmt):
+    # Response body, content type and ETag of one dataset, cached per data
+    # generation so polling clients never trigger a recomputation
+    if name is None:
+        index = {key: {"description": desc, "url": f"{API_PREFIX}/{key}"} for key, (desc, _) in DATASETS.items()}
+        index["exports"] = {view: f"{EXPORT_PREFIX}/{view}" for view in export.VIEWS}
+        body, content_type = json.dumps(index, indent=1).encode("utf-8"), JSON_TYPE
+    else:
+        body, content_type = _encode(DATASETS[name][1](), fmt)
+    etag = '"' + hashlib.sha256(body).hexdigest()[:20] + '"'
+    return body, content_type, etag
+
+
+def _etag_matches(header, etag):
+    if header is None:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "DENViewerAPI/1.0"
+
+    def _send_export(self, view, query, send_body):
+        # Stream a filtered view from the export cache without reading it
+        # into memory; see denviewer.export for the query parameters
+        filters, columns, fmt = export.filters_from_query(parse_qs(query))
+        try:
+            path, f = export.open_export(view, filters, columns, fmt)
+        except ValueError as e:
+            self.send_error(HTTPStatus.BAD_REQUEST, str(e))
+            return
+        except Exception:
+            logger.exception("Failed to export %s", view)
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR)
+            return
+
+        with f:
+            # The file name is a hash of everything that determines its contents
+            etag = '"' + os.path.splitext(os.path.basename(path))[0] + '"'
+            if _etag_matches(self.headers.get("If-None-Match"), etag):
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(HTTPStatus.OK)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Content-Type", export.FORMATS[fmt][0])
+            self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+            self.send_header("Content-Disposition", f'attachment; filename="{export.export_name(view, fmt)}"')
+            self.end_headers()
+            if send_body:
+                shutil.copyfileobj(f, self.wfile, STREAM_BYTES)
+
+    def _respond(self, send_body):
+        url = urlsplit(self.path)
+        path = url.path.rstrip("/")
+        if path.startswith(EXPORT_PREFIX + "/") and path[len(EXPORT_PREFIX) + 1:] in export.VIEWS:
+            self._send_export(path[len(EXPORT_PREFIX) + 1:], url.query, send_body)
+            return
+        if path in (API_PREFIX, ""):
+            name = None
+        elif path.startswith(API_PREFIX + "/") and path[len(API_PREFIX) + 1:] in DATASETS:
+            name = path[len(API_PREFIX) + 1:]
+        else:
+            self.send_error(HTTPStatus.NOT_FOUND, "Unknown dataset; see /api for the list")
+            return
+
+        # ?format=arrow|json, else the Accept header decides
+        fmt = parse_qs(url.query).get("format", [None])[0]
+        if fmt is None:
+            fmt = "arrow" if ARROW_TYPE in self.headers.get("Accept", "") else "json"
+        if fmt not in ("json", "arrow"):
+            self.send_error(HTTPStatus.BAD_REQUEST, "format must be json or arrow")
+            return
+
+        try:
+            body, content_type, etag = render(name, fmt)
+        except Exception:
+            logger.exception("Failed to render %s", name)
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR)
+            return
+
+        not_modified = _etag_matches(self.headers.get("If-None-Match"), etag)
+        self.send_response(HTTPStatus.NOT_MODIFIED if not_modified else HTTPStatus.OK)
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept")
+        if not not_modified:
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body and not not_modified:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    # Serve until interrupted, following data refreshes like the app does
+    refresh.start_watcher()
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    logger.info("Serving %s on http://%s:%d%s", ", ".join(DATASETS), host, port, API_PREFIX)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
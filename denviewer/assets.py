@@ -0,0 +1,44 @@
+import json
+import os
+from functools import lru_cache
+
+IMAGES_DIR = "pages/images"
+OPTIMIZED_DIR = "pages/images/optimized"
+MANIFEST_PATH = os.path.join(OPTIMIZED_DIR, "manifest.json")
+
+# Width (px) each image is actually displayed at. st.image re-encodes anything
+# wider than the requested width on every rerun, so derivatives are built at
+# exactly this size and served as-is.
+TEAM_PHOTO_WIDTH = 300
+LOGO_WIDTH = 640  # sidebar is ~320px wide, kept sharp on 2x screens
+
+DISPLAY_WIDTHS = {
+    "pages/images/lab_logo.png": LOGO_WIDTH,
+    "pages/images/rajesh.jpg": TEAM_PHOTO_WIDTH,
+    "pages/images/varsha.jpeg": TEAM_PHOTO_WIDTH,
+    "pages/images/imran.jpg": TEAM_PHOTO_WIDTH,
+    "pages/images/rama.jpg": TEAM_PHOTO_WIDTH,
+    "pages/images/jyoti.jpg": TEAM_PHOTO_WIDTH,
+    "pages/images/priyanka.jpg": TEAM_PHOTO_WIDTH,
+    "pages/images/Balendu.jpg": TEAM_PHOTO_WIDTH,
+    "pages/images/Aswin.jpg": TEAM_PHOTO_WIDTH,
+    "pages/images/raj.jpeg": TEAM_PHOTO_WIDTH,
+}
+
+
+@lru_cache(maxsize=1)
+def _manifest():
+    try:
+        with open(MANIFEST_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def image(path):
+    # Path of the optimized derivative built by scripts/build_images.py,
+    # falling back to the original if the build step has not been run
+    derived = _manifest().get(path)
+    if derived and os.path.isfile(derived):
+        return derived
+    return path
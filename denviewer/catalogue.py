@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+from denviewer import refresh
+
+CATALOGUE_FILE = "pages/files/Tabulated information of Dengue virus complete genome-2013-2024.csv"
+
+# Facet name -> derived column it is built from
+FACETS = {
+    "Serotype": "Serotype",
+    "Country": "Country",
+    "Collection Year": "Year",
+    "Host": "Host",
+    "Length": "Length Range",
+}
+
+LENGTH_BINS = [0, 2000, 5000, 10000, 10500, 10700, 11000, np.inf]
+LENGTH_LABELS = ["< 2 kb", "2-5 kb", "5-10 kb", "10-10.5 kb", "10.5-10.7 kb", "10.7-11 kb", "> 11 kb"]
+
+
+def normalize_catalogue(df):
+    # Facet-friendly columns on top of the NCBI Virus table: DENV-n serotype
+    # from "Dengue virus n", country from "Country: region", year from any
+    # date spelling and a length range
+    df = df.copy()
+    serotype = df["Organism_Name"].str.extract(r"(?i)dengue virus\s*(\d)", expand=False)
+    df["Serotype"] = ("DENV-" + serotype).fillna(df["Organism_Name"])
+    df["Country"] = df["Geo_Location"].str.split(":").str[0].str.strip()
+    df["Year"] = df["Collection_Date"].astype(str).str.extract(r"((?:19|20)\d\d)", expand=False)
+    # Kept as pd.cut's ordered categorical so the facet lists the bins by size
+    length_range = pd.cut(df["Length"], LENGTH_BINS, labels=LENGTH_LABELS, right=False)
+    df["Length Range"] = length_range.cat.add_categories("Unknown")
+    for col in FACETS.values():
+        df[col] = df[col].fillna("Unknown").astype("category")
+    return df
+
+
+def build_index(df):
+    # Inverted index per facet: the distinct values, each row's value code and
+    # the sorted row ids (postings) holding each value
+    index = {"size": len(df), "facets": {}}
+    for facet, col in FACETS.items():
+        values = df[col]
+        if values.cat.ordered:
+            # Ordered facets keep their category order, not the alphabetical one
+            values = values.cat.remove_unused_categories()
+            codes, values = values.cat.codes.to_numpy(), values.cat.categories
+        else:
+            codes, values = pd.factorize(values, sort=True)
+        codes = codes.astype(np.int32)
+        order = np.argsort(codes, kind="stable").astype(np.int32)
+        bounds = np.searchsorted(codes[order], np.arange(len(values) + 1))
+        index["facets"][facet] = {
+            "values": [str(v) for v in values],
+            "codes": codes,
+            "postings": {str(v): order[bounds[i]:bounds[i + 1]] for i, v in enumerate(values)},
+        }
+    return index
+
+
+def _facet_rows(index, facet, selected):
+    # Row ids matching any of the selected values of one facet (values are
+    # disjoint, so the union is a concatenation)
+    postings = index["facets"][facet]["postings"]
+    rows = [postings[v] for v in selected if v in postings]
+    if not rows:
+        return np.empty(0, dtype=np.int32)
+    return np.sort(np.concatenate(rows))
+
+
+def _intersect(row_sets):
+    # Intersection of sorted row-id arrays, smallest first; None means all rows
+    row_sets = sorted(row_sets, key=len)
+    if not row_sets:
+        return None
+    rows = row_sets[0]
+    for other in row_sets[1:]:
+        rows = np.intersect1d(rows, other, assume_unique=True)
+    return rows
+
+
+def search(index, selections):
+    # Row ids matching every facet with a selection (OR within a facet)
+    rows = _intersect([_facet_rows(index, f, v) for f, v in selections.items() if v])
+    return np.arange(index["size"], dtype=np.int32) if rows is None else rows
+
+
+def facet_counts(index, selections):
+    # Live counts per facet value. Each facet is counted over the rows matched
+    # by the other facets' selections, so picking a value never hides its
+    # siblings. Cost scales with the matching rows, not the catalogue.
+    per_facet = {f: _facet_rows(index, f, v) for f, v in selections.items() if v}
+    counts = {}
+    for facet, entry in index["facets"].items():
+        rows = _intersect([r for f, r in per_facet.items() if f != facet])
+        if rows is None:
+            tally = np.array([len(entry["postings"][v]) for v in entry["values"]])
+        else:
+            tally = np.bincount(entry["codes"][rows], minlength=len(entry["values"]))
+        counts[facet] = dict(zip(entry["values"], tally.tolist()))
+    return counts
+
+
+@refresh.cached
+def load_catalogue(path=CATALOGUE_FILE):
+    df = normalize_catalogue(pd.read_csv(path))
+    return df, build_index(df)
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+from denviewer import phylo, refresh
+
+# Residuals beyond this many robust standard deviations flag a tip as an outlier
+OUTLIER_Z = 3.0
+
+
+def decimal_year(periods):
+    # Mid-month decimal year for monthly periods (NaN where missing)
+    periods = pd.PeriodIndex(periods, freq="M")
+    return np.where(periods.isna(), np.nan, periods.year + (periods.month - 0.5) / 12)
+
+
+def _ols(x, y):
+    slope, intercept = np.polyfit(x, y, 1)
+    r = np.corrcoef(x, y)[0, 1] if len(x) > 2 else np.nan
+    return slope, intercept, r
+
+
+def fit_clock(dates, distances, outlier_z=OUTLIER_Z):
+    # Root-to-tip regression of divergence on sampling date. Tips whose
+    # residual is beyond outlier_z robust (MAD) standard deviations are
+    # flagged and the reported fit uses the remaining tips.
+    dated = ~np.isnan(dates)
+    x, y = dates[dated], distances[dated]
+    if len(x) < 3 or np.ptp(x) == 0:
+        return None
+
+    slope, intercept, _ = _ols(x, y)
+    residuals = np.full(len(dates), np.nan)
+    residuals[dated] = y - (slope * x + intercept)
+    # Measured from the median residual: a far outlier pulls the least-squares
+    # line off every other tip, which would otherwise all be flagged with it
+    deviation = np.abs(residuals - np.nanmedian(residuals))
+    mad = np.nanmedian(deviation) * 1.4826
+    outlier = dated & (deviation > outlier_z * mad) if mad > 0 else np.zeros(len(dates), dtype=bool)
+
+    keep = dated & ~outlier
+    if keep.sum() < 2 or np.ptp(dates[keep]) == 0:
+        # Not enough dates left to fit without the outliers, so fit them all
+        # and flag none
+        outlier = np.zeros(len(dates), dtype=bool)
+        keep = dated
+    slope, intercept, r = _ols(dates[keep], distances[keep])
+    return {
+        "rate": slope,  # substitutions per site per year
+        "intercept": intercept,
+        "root_date": -intercept / slope if slope > 0 else np.nan,
+        "r": r,
+        "r2": r * r,
+        "n": int(keep.sum()),
+        "residuals": residuals,
+        "outlier": outlier,
+    }
+
+
+def root_to_tip(tree, metadata):
+    # Divergence from the root and decimal sampling date for every tip
+    return pd.DataFrame({
+        "strain": tree.names[tree.tips],
+        "Distance": tree.dist[tree.tips],
+        "Date": decimal_year(metadata["Collection_date"]),
+        "Collection_date": metadata["Collection_date"].astype(str).to_numpy(),
+        "Severity": metadata["Severity"].to_numpy(),
+    })
+
+
+def time_scaled_x(tree, fit):
+    # Strict-clock calendar position of every node: root date plus divergence
+    # converted to years at the fitted rate
+    return fit["root_date"] + tree.dist / fit["rate"]
+
+
+@refresh.cached
+def load_clock(path=phylo.TREE_FILE):
+    # Root-to-tip table and clock fit, computed once per tree and metadata
+    tree = phylo.load_tree(path)
+    table = root_to_tip(tree, phylo.load_tip_metadata(path))
+    fit = fit_clock(table["Date"].to_numpy(), table["Distance"].to_numpy())
+    if fit is not None:
+        table["Residual"] = fit["residuals"]
+        table["Outlier"] = fit["outlier"]
+    return table, fit
+
+
+@refresh.cached
+def load_time_scaled_x(path=phylo.TREE_FILE):
+    _, fit = load_clock(path)
+    if fit is None or not fit["rate"] > 0:
+        return None
+    return time_scaled_x(phylo.load_tree(path), fit)
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+from denviewer import phylo, refresh
+
+
+def subtree_diameters(tree):
+    # One reverse-preorder pass (children before parents): height is the
+    # longest root-to-tip path inside each subtree and diameter the largest
+    # patristic distance between two of its tips
+    height = np.zeros(tree.n)
+    diameter = np.zeros(tree.n)
+    best = np.zeros(tree.n)  # longest and second-longest child paths so far
+    second = np.zeros(tree.n)
+    parent, length = tree.parent, tree.length
+    for v in range(tree.n - 1, 0, -1):
+        p = parent[v]
+        reach = height[v] + length[v]
+        if reach > best[p]:
+            best[p], second[p] = reach, best[p]
+        elif reach > second[p]:
+            second[p] = reach
+        height[p] = best[p]
+        diameter[p] = max(diameter[p], diameter[v], best[p] + second[p])
+    return height, diameter
+
+
+def find_clusters(tree, max_distance, min_support=None, min_size=2, diameters=None):
+    # Putative transmission clusters: the largest clades whose tips are all
+    # within max_distance of each other and whose root branch support is at
+    # least min_support. Nodes without a support value pass the support test,
+    # so trees without support labels are clustered on distance alone.
+    # Returns the cluster id of each tip (in tree.tips order, -1 when not
+    # clustered) and a table with one row per cluster.
+    _, diameter = diameters if diameters is not None else subtree_diameters(tree)
+    n_tips = tree.tip_end - tree.tip_start
+
+    qualifies = ~tree.is_tip & (diameter <= max_distance) & (n_tips >= min_size)
+    if min_support is not None:
+        qualifies &= ~(tree.support < min_support)
+
+    # Keep only clades not nested in an earlier one: in preorder an ancestor
+    # comes first and its subtree is the id range [v, v + size)
+    roots, covered_until = [], -1
+    for v in np.flatnonzero(qualifies):
+        if v >= covered_until:
+            roots.append(v)
+            covered_until = v + tree.size[v]
+    roots = np.array(roots, dtype=np.int32)
+
+    tip_cluster = np.full(len(tree.tips), -1, dtype=np.int32)
+    starts, ends = tree.tip_start[roots], tree.tip_end[roots]
+    if len(roots):
+        cluster_ids = np.repeat(np.arange(len(roots)), ends - starts)
+        positions = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+        tip_cluster[positions] = cluster_ids
+
+    table = pd.DataFrame({
+        "Cluster": np.arange(len(roots)),
+        "Node": tree.names[roots] if len(roots) else np.array([], dtype=object),
+        "Tips": ends - starts,
+        "Max Distance": diameter[roots],
+        "Support": tree.support[roots],
+    })
+    return tip_cluster, table
+
+
+def cluster_crosstabs(tip_cluster, metadata):
+    # Clustered tips by collection month and by severity, one row per cluster
+    clustered = metadata.assign(Cluster=tip_cluster)[tip_cluster >= 0]
+    by_month = pd.crosstab(clustered["Cluster"], clustered["Collection_date"])
+    by_severity = pd.crosstab(clustered["Cluster"], clustered["Severity"])
+    return by_month, by_severity
+
+
+@refresh.cached
+def load_diameters(path=phylo.TREE_FILE):
+    return subtree_diameters(phylo.load_tree(path))
+
+
+@refresh.cached
+def load_clusters(max_distance, min_support=None, min_size=2, path=phylo.TREE_FILE):
+    # Clusters and their date/severity cross-tabulations, cached per threshold
+    tree = phylo.load_tree(path)
+    tip_cluster, table = find_clusters(
+        tree, max_distance, min_support, min_size, diameters=load_diameters(path)
+    )
+    metadata = phylo.load_tip_metadata(path)
+    by_month, by_severity = cluster_crosstabs(tip_cluster, metadata)
+
+    dates = metadata.assign(Cluster=tip_cluster)[tip_cluster >= 0].groupby("Cluster")["Collection_date"]
+    table["First Sample"] = table["Cluster"].map(dates.min())
+    table["Last Sample"] = table["Cluster"].map(dates.max())
+    severity = by_severity.reindex(table["Cluster"], fill_value=0)
+    for col in severity.columns:
+        table[str(col)] = severity[col].to_numpy()
+    return {
+        "tip_cluster": tip_cluster,
+        "table": table,
+        "by_month": by_month,
+        "by_severity": by_severity,
+    }
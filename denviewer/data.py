@@ -0,0 +1,95 @@
+import pandas as pd
+
+from denviewer import dataplane, refresh
+
+DEMOGRAPHICS_FILE = "pages/files/all_demographics.csv"
+MUTATIONS_FILE = "pages/files/all_Mutations.csv"
+CASES_FILE = "pages/files/Cases prevalent in India over time.csv"
+GISAID_FILE = "pages/files/gisaid_arbo_2025_03_31_07.csv"
+# Default output of scripts/build_mutations.py; the curated MUTATIONS_FILE is never overwritten
+GENERATED_MUTATIONS_FILE = "pages/files/generated/all_Mutations.csv"
+
+SEVERITY_ORDER = ["Mild", "Moderate", "Severe"]
+GENDER_ORDER = ["Male", "Female", "Child"]
+
+# Identifier and free-text columns that stay as strings
+DEMOGRAPHICS_TEXT = ["strain"]
+DEMOGRAPHICS_CATEGORIES = {
+    "Severity": SEVERITY_ORDER,
+    "Gender": GENDER_ORDER,
+    "Putative Serotypes": None,
+}
+# Collection dates come as "Jun-23" (2023 batch) or "13-10-2022" (2022 batch)
+DATE_FORMATS = ["%b-%y", "%d-%m-%Y"]
+
+
+def parse_month(values):
+    # Month-resolution period for each date string, NaT where no format matches
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    for fmt in DATE_FORMATS:
+        parsed = parsed.fillna(pd.to_datetime(values, format=fmt, errors="coerce"))
+    return parsed.dt.to_period("M")
+
+
+def compact_demographics(df):
+    # Categoricals for labels, float32 for measurements and monthly periods for
+    # dates. Stray text in numeric columns ("YES", "4.9.9", ...) becomes NaN.
+    df = df.copy()
+    for col, categories in DEMOGRAPHICS_CATEGORIES.items():
+        if categories is None:
+            df[col] = df[col].astype("category")
+        else:
+            df[col] = pd.Categorical(df[col], categories=categories, ordered=True)
+    df["Collection_date"] = parse_month(df["Collection_date"])
+
+    skip = set(DEMOGRAPHICS_TEXT) | set(DEMOGRAPHICS_CATEGORIES) | {"Collection_date"}
+    for col in df.columns.difference(list(skip), sort=False):
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype("float32")
+    return df
+
+
+@refresh.cached
+def load_demographics(path=DEMOGRAPHICS_FILE):
+    # One compact copy shared by every session in the process (and, when the
+    # data plane is published, mapped from it). Treat the returned frame as
+    # read-only; derive filtered views instead of mutating.
+    mapped = dataplane.frame("demographics", path)
+    return mapped if mapped is not None else compact_demographics(pd.read_csv(path))
+
+
+@refresh.cached
+def load_gisaid(path=GISAID_FILE):
+    mapped = dataplane.frame("gisaid", path)
+    return mapped if mapped is not None else pd.read_csv(path)
+
+
+@refresh.cached
+def load_gisaid_aggregates(path=GISAID_FILE):
+    # Sequence counts behind the GISAID charts on the Home page
+    gisaid = load_gisaid(path)
+    return {
+        "by_serotype_date": gisaid.groupby(["Serotype", "Date"]).size().reset_index(name="Count"),
+        "by_date_location": gisaid.groupby(["Date", "Location", "Serotype"]).size().reset_index(name="Count"),
+        "dates": gisaid["Date"].unique(),
+        "locations": gisaid["Location"].unique(),
+    }
+
+
+@refresh.cached
+def load_cases(path=CASES_FILE):
+    mapped = dataplane.frame("cases", path)
+    return mapped if mapped is not None else pd.read_csv(path)
+
+
+def memory_report(frames):
+    # Rows, columns and deep memory footprint (MB) of each named DataFrame
+    rows = [
+        {
+            "Dataset": name,
+            "Rows": len(df),
+            "Columns": df.shape[1],
+            "Memory (MB)": df.memory_usage(deep=True).sum() / 2**20,
+        }
+        for name, df in frames.items()
+    ]
+    return pd.DataFrame(rows)
@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from denviewer import refresh
+
+# Precomputed arrays shared by every dashboard process on the host. Each
+# published version is a directory of .npy files plus manifest.json; the
+# CURRENT file names the live version and is replaced atomically, so a reader
+# never sees a half-written version. Processes map the arrays read-only
+# (np.load with mmap_mode), so the page cache holds one copy per host however
+# many processes serve the app.
+DATA_PLANE_DIR = os.environ.get("DENVIEWER_DATA_PLANE", "pages/files/dataplane")
+POINTER_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+# Versions kept on disk: the live one and the one before it, which processes
+# that have not picked up the swap may still have mapped
+KEEP_VERSIONS = 2
+
+
+def source_signature(path):
+    # Size and modification time of a source file, used to detect a data plane
+    # published from an older copy of it
+    stat = os.stat(path)
+    return {"path": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def encode_frame(df):
+    # Column arrays and the metadata to rebuild df from them. Categoricals are
+    # stored as codes, monthly periods as ordinals and text as codes into a
+    # list of unique values; every array is a plain fixed-width dtype that can
+    # be memory-mapped.
+    arrays, columns = {}, []
+    for i, (col, values) in enumerate(df.items()):
+        key = f"c{i}"
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            arrays[key] = values.cat.codes.to_numpy()
+            columns.append({"name": col, "kind": "category", "key": key,
+                            "categories": values.cat.categories.tolist(), "ordered": values.cat.ordered})
+        elif isinstance(values.dtype, pd.PeriodDtype):
+            arrays[key] = values.array.asi8
+            columns.append({"name": col, "kind": "period", "key": key, "dtype": str(values.dtype)})
+        elif values.dtype == object or pd.api.types.is_string_dtype(values.dtype):
+            codes, uniques = pd.factorize(values)
+            arrays[key] = codes.astype(np.int32)
+            columns.append({"name": col, "kind": "text", "key": key, "categories": uniques.tolist()})
+        else:
+            arrays[key] = values.to_numpy()
+            columns.append({"name": col, "kind": "numeric", "key": key})
+    return arrays, {"columns": columns}
+
+
+def decode_frame(arrays, meta):
+    # DataFrame over the mapped arrays. Numeric, categorical and period columns
+    # reference the mapping without copying; text columns are rebuilt as
+    # Python strings.
+    columns = {}
+    for spec in meta["columns"]:
+        values = arrays[spec["key"]]
+        if spec["kind"] == "category":
+            dtype = pd.CategoricalDtype(spec["categories"], ordered=spec["ordered"])
+            columns[spec["name"]] = pd.Categorical.from_codes(values, dtype=dtype)
+        elif spec["kind"] == "period":
+            columns[spec["name"]] = pd.arrays.PeriodArray(values, dtype=pd.api.types.pandas_dtype(spec["dtype"]))
+        elif spec["kind"] == "text":
+            lookup = np.array(spec["categories"] + [np.nan], dtype=object)
+            columns[spec["name"]] = lookup[values]  # code -1 (missing) picks the trailing NaN
+        else:
+            columns[spec["name"]] = values
+    return pd.DataFrame(columns, copy=False)
+
+
+def publish(datasets, root=DATA_PLANE_DIR):
+    # Write a new version and make it live. datasets maps each name to
+    # {"arrays": {key: ndarray}, "meta": {...}, "sources": [signatures]},
+    # plus optionally "replaces": [paths] for a dataset built from other files
+    # that stands in for those default sources. Returns the version name.
+    os.makedirs(root, exist_ok=True)
+    manifest = {
+        name: {
+            "files": {key: f"{name}.{key}.npy" for key in dataset["arrays"]},
+            "meta": dataset.get("meta", {}),
+            "sources": dataset.get("sources", []),
+            "replaces": dataset.get("replaces", []),
+        }
+        for name, dataset in datasets.items()
+    }
+    digest = hashlib.sha256(json.dumps(manifest, sort_keys=True).encode())
+    for name in sorted(datasets):
+        for key in sorted(datasets[name]["arrays"]):
+            digest.update(f"{name}/{key}".encode())
+            digest.update(np.ascontiguousarray(datasets[name]["arrays"][key]).tobytes())
+    version = f"{time.strftime('%Y%m%dT%H%M%S')}-{digest.hexdigest()[:10]}"
+    directory = os.path.join(root, version)
+
+    # The name covers the timestamp and everything written, so an existing
+    # version (the same inputs published again within the second) is reused
+    if not os.path.isdir(directory):
+        staging = os.path.join(root, f".{version}.{os.getpid()}.tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for name, dataset in datasets.items():
+            for key, array in dataset["arrays"].items():
+                path = os.path.join(staging, manifest[name]["files"][key])
+                np.save(path, np.ascontiguousarray(array), allow_pickle=False)
+        with open(os.path.join(staging, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+        try:
+            os.replace(staging, directory)
+        except OSError:
+            # Another process published the same version first
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.path.isdir(directory):
+                raise
+
+    # Swap the pointer: write a temporary file, then rename over CURRENT
+    pointer_tmp = os.path.join(root, f".{POINTER_FILE}.{os.getpid()}")
+    with open(pointer_tmp, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, os.path.join(root, POINTER_FILE))
+
+    versions = sorted(v for v in os.listdir(root) if not v.startswith(".") and v != POINTER_FILE)
+    for old in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    return version
+
+
+def current_version(root=DATA_PLANE_DIR):
+    try:
+        with open(os.path.join(root, POINTER_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def open_version(version, root=DATA_PLANE_DIR):
+    # Manifest of one version with every array mapped read-only (plain
+    # ndarray views over the mapping, so downstream results are not memmaps)
+    directory = os.path.join(root, version)
+    with open(os.path.join(directory, MANIFEST_FILE), encoding="utf-8") as f:
+        manifest = json.load(f)
+    for dataset in manifest.values():
+        dataset["arrays"] = {
+            key: np.asarray(np.load(os.path.join(directory, file), mmap_mode="r"))
+            for key, file in dataset["files"].items()
+        }
+    return {"version": version, "datasets": manifest}
+
+
+@refresh.cached
+def active(root=DATA_PLANE_DIR):
+    # The version live when the current data generation was built, or None
+    # when nothing has been published
+    version = current_version(root)
+    return open_version(version, root) if version else None
+
+
+def _unchanged(signature):
+    if not os.path.exists(signature["path"]):
+        return False
+    current = source_signature(signature["path"])
+    return (current["size"], current["mtime_ns"]) == (signature["size"], signature["mtime_ns"])
+
+
+def dataset(name, *sources):
+    # Mapped arrays and metadata of one dataset from the active version, or
+    # None when it is not published or any source file has changed since. A
+    # dataset that replaces a source (published from a generated file) is
+    # used in its place as long as the files it was built from are unchanged.
+    plane = active()
+    if plane is None or name not in plane["datasets"]:
+        return None
+    entry = plane["datasets"][name]
+    recorded = {s["path"]: s for s in entry["sources"]}
+    replaced = set(entry.get("replaces", []))
+    for path in sources:
+        if path in replaced:
+            if not all(_unchanged(s) for s in entry["sources"]):
+                return None
+        elif path not in recorded or not _unchanged(recorded[path]):
+            return None
+    return entry
+
+
+def frame(name, *sources):
+    entry = dataset(name, *sources)
+    return None if entry is None else decode_frame(entry["arrays"], entry["meta"])
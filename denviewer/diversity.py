@@ -0,0 +1,81 @@
+import numpy as np
+
+from denviewer import data, dataplane, mutations, refresh
+
+# Length of the DENV-2 reference genome (NC_001474.2)
+GENOME_LENGTH = 10723
+CLASSES = ["All", *mutations.SEVERITY_FREQUENCIES]
+
+
+def _xlog2x(p):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(p > 0, p * np.log2(p), 0.0)
+
+
+def site_diversity(df, sizes=None, length=GENOME_LENGTH):
+    # Shannon entropy (bits) and nucleotide diversity of every genome position,
+    # for each year and severity class at once. Alt allele proportions come
+    # from the per-class frequencies; the reference allele takes the rest.
+    # "All" pools the carriers of the three classes rather than using the
+    # Frequency column. Returns arrays shaped (years, classes, positions)
+    # together with their cumulative sums along the genome, so the mean over
+    # any window is two lookups (see window_means).
+    sizes = mutations.group_sizes(df) if sizes is None else sizes
+    df = df.drop_duplicates(["Year", "Position", "Alt Allele"])
+    years = np.sort(df["Year"].unique())
+    length = max(length, int(df["Position"].max()))
+
+    row_sizes = sizes.reindex(df["Year"]).fillna(0).to_numpy(dtype=np.float64)
+    freq = df[list(mutations.SEVERITY_FREQUENCIES.values())].fillna(0).to_numpy(dtype=np.float64)
+    carriers = np.minimum(np.round(freq * row_sizes), row_sizes)
+    carriers = np.column_stack([carriers.sum(axis=1), carriers])  # rows x classes
+    class_sizes = sizes.reindex(years).fillna(0).to_numpy(dtype=np.float64)
+    n = np.column_stack([class_sizes.sum(axis=1), class_sizes])  # years x classes
+
+    y = np.searchsorted(years, df["Year"].to_numpy())
+    p = carriers / np.where(n[y] > 0, n[y], 1)
+    index = (y[:, None], np.arange(len(CLASSES))[None, :], df["Position"].to_numpy()[:, None] - 1)
+    alt = np.zeros((len(years), len(CLASSES), length))
+    alt_entropy = np.zeros_like(alt)
+    alt_squares = np.zeros_like(alt)
+    np.add.at(alt, index, p)
+    np.add.at(alt_entropy, index, -_xlog2x(p))
+    np.add.at(alt_squares, index, p * p)
+
+    ref = np.clip(1 - alt, 0, 1)
+    entropy = alt_entropy - _xlog2x(ref)
+    # Unbiased heterozygosity: n / (n - 1) * (1 - sum of squared proportions)
+    correction = np.where(n > 1, n / np.maximum(n - 1, 1), 0)[:, :, None]
+    pi = correction * np.clip(1 - alt_squares - ref * ref, 0, None)
+
+    def cumulative(values):
+        return np.concatenate([np.zeros(values.shape[:-1] + (1,)), np.cumsum(values, axis=-1)], axis=-1)
+
+    return {
+        "years": years,
+        "classes": CLASSES,
+        "sizes": n.astype(np.int64),
+        "entropy": entropy,
+        "pi": pi,
+        "entropy_cumsum": cumulative(entropy),
+        "pi_cumsum": cumulative(pi),
+    }
+
+
+def window_means(cumsum, width, step):
+    # Mean of each sliding window (1-based start every step positions) from a
+    # cumulative sum along the last axis: O(1) per window for any width.
+    # Returns the window centres and the means, shaped (..., windows).
+    length = cumsum.shape[-1] - 1
+    width = min(width, length)
+    starts = np.arange(0, length - width + 1, step)
+    means = (cumsum[..., starts + width] - cumsum[..., starts]) / width
+    return starts + (width + 1) / 2, means
+
+
+@refresh.cached
+def load_diversity(path=data.MUTATIONS_FILE):
+    mapped = dataplane.dataset("diversity", path)
+    if mapped is not None:
+        return {**mapped["arrays"], "classes": CLASSES}
+    return site_diversity(mutations.load_mutations(path), mutations.load_group_sizes(path)[0])
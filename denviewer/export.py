@@ -0,0 +1,269 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlencode
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+from denviewer import data, mutations, refresh
+
+# Downloads of filtered views. Exports are written chunk by chunk from the
+# shared cached frames (no filtered copy of the whole view is made) into a
+# directory shared by every process, named by a hash of the view, filters,
+# columns, format and the contents of the frame being exported, so a popular
+# export is written once and then served from disk. Least recently used files are dropped past
+# EXPORT_CACHE_BYTES.
+EXPORT_DIR = os.environ.get("DENVIEWER_EXPORT_CACHE", "pages/files/exports")
+EXPORT_CACHE_BYTES = 512 * 2**20
+# Exports written or reused this recently are never pruned, so a file just
+# handed to a session or API thread is still there when it is opened
+PRUNE_GRACE_SECONDS = 60
+CHUNK_ROWS = 5000
+# Base URL of scripts/serve_api.py as the browser reaches it. When set, pages
+# link to its streaming /api/export endpoint instead of handing the file to
+# Streamlit, which keeps download contents in memory per session.
+API_URL = os.environ.get("DENVIEWER_API_URL")
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# View name -> loader of the shared frame
+VIEWS = {
+    "mutations": mutations.load_mutations,
+    "clinical": data.load_demographics,
+}
+
+_lock = threading.Lock()
+_writing = {}  # export path -> lock held while it is written
+
+
+def portable(df):
+    # Periods and categoricals as plain strings, for formats without them
+    df = df.copy()
+    for col, values in df.items():
+        if isinstance(values.dtype, (pd.PeriodDtype, pd.CategoricalDtype)):
+            df[col] = values.astype(str).where(values.notna(), None)
+    return df
+
+
+def normalize_filters(filters):
+    # Filters are (column, "in", values) or (column, "between", (lo, hi)).
+    # Values are kept as strings so filters built by a page and parsed from a
+    # URL hash alike; an empty "in" list means no filter on that column.
+    normalized = []
+    for column, op, values in filters:
+        if op not in ("in", "between"):
+            raise ValueError(f"Unknown filter operator {op!r}")
+        values = [str(v) for v in values]
+        if op == "between" and len(values) != 2:
+            raise ValueError(f"{column}: between needs two values")
+        if values:
+            normalized.append([column, op, values])
+    return sorted(normalized)
+
+
+def filter_rows(df, filters):
+    # Positions of the rows matching every filter
+    mask = np.ones(len(df), dtype=bool)
+    for column, op, values in normalize_filters(filters):
+        if column not in df.columns:
+            raise ValueError(f"Unknown column {column!r}")
+        col = df[column]
+        if op == "between":
+            lo, hi = (float(v) for v in values)
+            mask &= ((col >= lo) & (col <= hi)).to_numpy()
+        elif pd.api.types.is_numeric_dtype(col):
+            mask &= col.isin(pd.to_numeric(values)).to_numpy()
+        else:
+            mask &= col.astype(str).isin(values).to_numpy()
+    return np.flatnonzero(mask)
+
+
+def iter_chunks(df, rows, columns, chunk_rows=CHUNK_ROWS):
+    # The selected rows and columns, chunk_rows at a time (at least one,
+    # possibly empty, chunk so the header is always written)
+    positions = df.columns.get_indexer(columns)
+    for start in range(0, max(len(rows), 1), chunk_rows):
+        yield df.iloc[rows[start:start + chunk_rows], positions]
+
+
+def _arrow_schema(df):
+    fields = []
+    for col, values in df.items():
+        if pd.api.types.is_numeric_dtype(values.dtype) and not isinstance(values.dtype, pd.CategoricalDtype):
+            fields.append(pa.field(col, pa.from_numpy_dtype(values.dtype)))
+        else:
+            fields.append(pa.field(col, pa.string()))
+    return pa.schema(fields)
+
+
+def write_csv(chunks, path):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(f, header=i == 0, index=False)
+
+
+def write_parquet(chunks, path):
+    # One row group per chunk; the schema is fixed up front so text columns
+    # that are empty in some chunk keep their type
+    writer = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                schema = _arrow_schema(chunk)
+                writer = pq.ParquetWriter(path, schema)
+            writer.write_table(pa.Table.from_pandas(portable(chunk), schema=schema, preserve_index=False))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+@refresh.cached
+def view_digest(view):
+    # Hash of the view's frame as loaded in the current data generation. The
+    # files on disk may already be newer than the generation a session has
+    # pinned, so exports are keyed by the data actually exported; cached per
+    # generation next to the frame it describes.
+    df = VIEWS[view]()
+    digest = hashlib.sha256(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def export_key(view, filters, columns, fmt):
+    spec = {
+        "view": view,
+        "filters": normalize_filters(filters),
+        "columns": list(columns),
+        "format": fmt,
+        "data": view_digest(view),
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()[:24]
+
+
+def prune(directory=EXPORT_DIR, limit=EXPORT_CACHE_BYTES, grace=PRUNE_GRACE_SECONDS):
+    # Drop the least recently used exports until the directory fits in limit,
+    # keeping any used in the last grace seconds
+    recent = time.time_ns() - int(grace * 1e9)
+    files = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+    files.sort(reverse=True)
+    total = 0
+    for mtime_ns, size, path in files:
+        total += size
+        if total > limit and mtime_ns < recent:
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # already pruned by another process, or open on Windows
+
+
+def export_file(view, filters=(), columns=None, fmt="csv"):
+    # Path of the export of one filtered view, writing it unless it is cached.
+    # columns=None exports every column.
+    if view not in VIEWS:
+        raise ValueError(f"Unknown view {view!r}")
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    df = VIEWS[view]()
+    columns = list(df.columns) if not columns else list(columns)
+    unknown = [c for c in columns if c not in df.columns]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+
+    key = export_key(view, filters, columns, fmt)
+    path = os.path.join(EXPORT_DIR, f"{view}-{key}.{FORMATS[fmt][1]}")
+    with _lock:
+        writing = _writing.setdefault(path, threading.Lock())
+    # One thread writes each export; others asking for it wait and reuse it
+    with writing:
+        if os.path.exists(path):
+            os.utime(path)  # mark as recently used
+            return path
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        # Written under a temporary name and renamed, so other processes never
+        # serve a partial file
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        chunks = iter_chunks(df, filter_rows(df, filters), columns)
+        try:
+            (write_csv if fmt == "csv" else write_parquet)(chunks, tmp)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            with _lock:
+                _writing.pop(path, None)
+    prune(EXPORT_DIR)
+    return path
+
+
+def open_export(view, filters=(), columns=None, fmt="csv"):
+    # export_file's path and the file opened for reading. Another process can
+    # still prune the file between the two, in which case it is written again
+    # once; after it is open, removing it no longer matters.
+    path = export_file(view, filters, columns, fmt)
+    try:
+        return path, open(path, "rb")
+    except FileNotFoundError:
+        path = export_file(view, filters, columns, fmt)
+        return path, open(path, "rb")
+
+
+def export_name(view, fmt):
+    return f"denviewer_{view}.{FORMATS[fmt][1]}"
+
+
+def filters_from_query(params):
+    # Filters, columns and format from parsed query parameters: column=<name>
+    # (repeatable) selects columns, format=csv|parquet, and any other
+    # parameter filters that column, "lo..hi" for a range or repeated values
+    # for a set
+    filters = []
+    for name, values in params.items():
+        if name in ("column", "format"):
+            continue
+        if len(values) == 1 and ".." in values[0]:
+            filters.append((name, "between", values[0].split("..", 1)))
+        else:
+            filters.append((name, "in", values))
+    return filters, params.get("column"), params.get("format", ["csv"])[0]
+
+
+def export_url(view, filters, columns, fmt, base=None):
+    query = [("column", c) for c in columns] + [("format", fmt)]
+    for column, op, values in normalize_filters(filters):
+        if op == "between":
+            query.append((column, "..".join(values)))
+        else:
+            query.extend((column, v) for v in values)
+    return f"{(base or API_URL).rstrip('/')}/api/export/{view}?{urlencode(query)}"
+
+
+def export_controls(view, filters, columns, key):
+    # Column picker, format and download button for a filtered view
+    with st.expander("Download"):
+        chosen = st.multiselect("Columns", columns, default=columns, key=f"{key}_columns")
+        fmt = st.radio("Format", list(FORMATS), horizontal=True, key=f"{key}_format")
+        if not chosen:
+            st.caption("Select at least one column.")
+        elif API_URL:
+            st.link_button("Download", export_url(view, filters, chosen, fmt))
+        elif st.button("Prepare download", key=f"{key}_prepare"):
+            _, f = open_export(view, filters, chosen, fmt)
+            with f:
+                st.download_button(
+                    "Download", f, file_name=export_name(view, fmt), mime=FORMATS[fmt][0],
+                    key=f"{key}_download", on_click="ignore",
+                )
@@ -0,0 +1,205 @@
+import numpy as np
+import pandas as pd
+
+from denviewer import data, mutations
+
+# The tree is rooted on this reference and mutations are numbered against it
+REFERENCE_ID = "NC_001474.2"
+
+# Regions of NC_001474.2 as (gene, first nt, last nt, first nt of the amino
+# acid numbering). Coding regions follow the polyprotein frame (CDS 97..10269)
+# and amino acids are numbered within each mature peptide.
+REFERENCE_FEATURES = [
+    ("5'UTR", 1, 96, None),
+    ("C", 97, 396, 97),
+    ("ancC", 397, 438, 97),
+    ("prM", 439, 714, 439),
+    ("M", 715, 936, 715),
+    ("E", 937, 2421, 937),
+    ("NS1", 2422, 3477, 2422),
+    ("NS2A", 3478, 4131, 3478),
+    ("NS2B", 4132, 4521, 4132),
+    ("NS3", 4522, 6375, 4522),
+    ("NS4A", 6376, 6756, 6376),
+    ("2K", 6757, 6825, 6757),
+    ("NS4B", 6826, 7569, 6826),
+    ("NS5", 7570, 10269, 7570),
+    ("3'UTR", 10270, 10723, None),
+]
+CDS_START = 97
+
+BASES = "ACGT"
+# Base code of every byte: 0-3 for A, C, G, T (either case), 4 for gaps and
+# ambiguity codes, which are never called
+BASE_CODES = np.full(256, 4, dtype=np.uint8)
+for _code, _base in enumerate(BASES):
+    BASE_CODES[ord(_base)] = BASE_CODES[ord(_base.lower())] = _code
+
+# Rows compared against the reference per block, bounding the temporaries
+# when the alignment is memory-mapped
+CHUNK_ROWS = 512
+
+AMINO_ACIDS = {
+    "A": "Ala", "R": "Arg", "N": "Asn", "D": "Asp", "C": "Cys", "Q": "Gln", "E": "Glu",
+    "G": "Gly", "H": "His", "I": "Ile", "L": "Leu", "K": "Lys", "M": "Met", "F": "Phe",
+    "P": "Pro", "S": "Ser", "T": "Thr", "W": "Trp", "Y": "Tyr", "V": "Val", "*": "Ter",
+}
+_CODON_TABLE = "FFLLSSSSYY**CC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG"
+CODONS = {
+    a + b + c: _CODON_TABLE[16 * i + 4 * j + k]
+    for i, a in enumerate("TCAG") for j, b in enumerate("TCAG") for k, c in enumerate("TCAG")
+}
+
+
+def read_fasta(path):
+    # Stream (name, sequence) records, holding one record in memory at a time.
+    # The name is the header up to the first whitespace.
+    name, chunks = None, []
+    with open(path, encoding="ascii") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith(">"):
+                if name is not None:
+                    yield name, "".join(chunks)
+                header = line[1:].split(maxsplit=1)
+                name, chunks = header[0] if header else "", []
+            elif line:
+                chunks.append(line)
+    if name is not None:
+        yield name, "".join(chunks)
+
+
+def encode_alignment(path, mmap_path=None):
+    # Sequence names and a (sequences x columns) uint8 matrix of ASCII bytes.
+    # A first streaming pass sizes the matrix; with mmap_path it is an .npy
+    # file on disk, so batches larger than memory can be encoded and compared.
+    names, width = [], None
+    for name, seq in read_fasta(path):
+        if width is None:
+            width = len(seq)
+        elif len(seq) != width:
+            raise ValueError(f"{name} has {len(seq)} columns, expected {width}; is {path} aligned?")
+        names.append(name)
+    if not names:
+        raise ValueError(f"No sequences in {path}")
+
+    shape = (len(names), width)
+    if mmap_path is None:
+        matrix = np.empty(shape, dtype=np.uint8)
+    else:
+        matrix = np.lib.format.open_memmap(mmap_path, mode="w+", dtype=np.uint8, shape=shape)
+    for row, (_, seq) in enumerate(read_fasta(path)):
+        matrix[row] = np.frombuffer(seq.encode("ascii"), dtype=np.uint8)
+    return names, matrix
+
+
+def allele_counts(matrix, ref_row, groups, n_groups, chunk_rows=CHUNK_ROWS):
+    # Count of each base (A, C, G, T) at every reference position for each
+    # group of sequences: (groups x 4 x positions). groups holds one or more
+    # group ids per row (rows x k, -1 for none), so a sequence can count
+    # towards several groups in the same pass. Columns where the reference
+    # has a gap (insertions) are dropped. Each block of rows is one-hot
+    # encoded per base and summed per group with a matrix product.
+    groups = np.asarray(groups).reshape(matrix.shape[0], -1)
+    ref_columns = np.flatnonzero(BASE_CODES[matrix[ref_row]] < 4)
+    counts = np.zeros((n_groups, len(BASES), len(ref_columns)), dtype=np.int64)
+    for start in range(0, matrix.shape[0], chunk_rows):
+        block_groups = groups[start:start + chunk_rows]
+        keep = (block_groups >= 0).any(axis=1)
+        if not keep.any():
+            continue
+        block_groups = block_groups[keep]
+        codes = BASE_CODES[matrix[start:start + chunk_rows][keep][:, ref_columns]]
+        membership = np.zeros((n_groups, len(codes)), dtype=np.float32)
+        for column in block_groups.T:
+            member = column >= 0
+            membership[column[member], np.flatnonzero(member)] = 1
+        for b in range(len(BASES)):
+            counts[:, b] += np.rint(membership @ (codes == b).astype(np.float32)).astype(np.int64)
+    return counts, ref_columns
+
+
+def annotate(positions, ref_alleles, alt_alleles, reference):
+    # Gene, function, amino acid change and variant type of each substitution
+    # against the reference sequence (one string, 1-based positions)
+    rows = []
+    for pos, ref, alt in zip(positions, ref_alleles, alt_alleles):
+        gene, _, _, aa_start = next(
+            (f for f in REFERENCE_FEATURES if f[1] <= pos <= f[2]), ("3'UTR", pos, pos, None)
+        )
+        if aa_start is None:
+            kind = "Upstream Gene Variant" if pos < CDS_START else "Downstream Gene Variant"
+            rows.append((gene, "non-coding", "", kind))
+            continue
+        frame = (pos - CDS_START) % 3
+        codon_start = pos - frame
+        codon = reference[codon_start - 1:codon_start + 2]
+        mutant = codon[:frame] + alt + codon[frame + 1:]
+        ref_aa, alt_aa = CODONS.get(codon, "X"), CODONS.get(mutant, "X")
+        number = (codon_start - aa_start) // 3 + 1
+        aa_mut = f"p.{AMINO_ACIDS.get(ref_aa, 'Xaa')}{number}{AMINO_ACIDS.get(alt_aa, 'Xaa')}"
+        if ref_aa == alt_aa:
+            rows.append((gene, "synonymous", aa_mut, "Synonymous Variant"))
+        elif alt_aa == "*":
+            rows.append((gene, "non-synonymous", aa_mut, "Stop Gained"))
+        else:
+            rows.append((gene, "non-synonymous", aa_mut, "Missense Variant"))
+    return pd.DataFrame(rows, columns=["Gene", "Function", "AA_mut", "Mutation Type"])
+
+
+def sample_groups(names, demographics):
+    # Collection year and severity class of each sequence, from the
+    # demographics table (strain column); None where unknown
+    info = demographics.drop_duplicates("strain").set_index("strain").reindex(names)
+    dates = info["Collection_date"]
+    years = np.where(dates.isna(), -1, dates.dt.year.fillna(-1)).astype(np.int64)
+    severity = info["Severity"].astype(object).where(info["Severity"].notna(), None)
+    return years, severity.to_numpy()
+
+
+def mutation_table(names, matrix, demographics, reference_id=REFERENCE_ID):
+    # Per-year substitution frequencies against the reference, overall and per
+    # severity class, in the layout of all_Mutations.csv. Overall frequencies
+    # count every sequence of the year; class frequencies only that class.
+    if reference_id not in names:
+        raise ValueError(f"Reference {reference_id} is not in the alignment")
+    ref_row = names.index(reference_id)
+    years, severity = sample_groups(names, demographics)
+    years[ref_row] = -1  # never count the reference itself
+
+    year_list = np.unique(years[years >= 0])
+    classes = ["All", *data.SEVERITY_ORDER]
+    year_index = np.searchsorted(year_list, years)
+    class_index = np.array([data.SEVERITY_ORDER.index(s) + 1 if s in data.SEVERITY_ORDER else -1 for s in severity])
+
+    # Group g = year * classes + class; "All" groups are filled in afterwards
+    n_groups = len(year_list) * len(classes)
+    by_class = np.where((years >= 0) & (class_index > 0), year_index * len(classes) + class_index, -1)
+    by_year = np.where(years >= 0, year_index * len(classes), -1)
+    groups = np.column_stack([by_year, by_class])
+    counts, ref_columns = allele_counts(matrix, ref_row, groups, n_groups)
+    sizes = np.bincount(groups[groups >= 0], minlength=n_groups)
+
+    reference = matrix[ref_row, ref_columns].tobytes().decode("ascii").upper()
+    ref_codes = BASE_CODES[matrix[ref_row, ref_columns]]
+    counts = counts.reshape(len(year_list), len(classes), len(BASES), -1)
+    sizes = sizes.reshape(len(year_list), len(classes))
+
+    # Substitutions: a non-reference base seen in at least one sequence of the year
+    alt_counts = counts[:, 0].copy()
+    alt_counts[:, ref_codes, np.arange(len(ref_codes))] = 0
+    y, b, p = np.nonzero(alt_counts)
+    freq = counts[y, :, b, p] / np.maximum(sizes[y], 1)
+
+    table = pd.DataFrame({
+        "Position": p + 1,
+        "Ref Allele": [reference[i] for i in p],
+        "Alt Allele": np.array(list(BASES))[b],
+    })
+    table["Mutation"] = table["Ref Allele"] + table["Position"].astype(str) + table["Alt Allele"]
+    table = pd.concat([table, annotate(table["Position"], table["Ref Allele"], table["Alt Allele"], reference)], axis=1)
+    table["Frequency"] = freq[:, 0]
+    for i, col in enumerate(mutations.SEVERITY_FREQUENCIES.values(), start=1):
+        table[col] = freq[:, i]
+    table["Year"] = year_list[y]
+    return table.sort_values(["Year", "Position", "Alt Allele"], ignore_index=True)
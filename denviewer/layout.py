@@ -0,0 +1,75 @@
+import streamlit as st
+
+from denviewer import assets, refresh
+
+LOGO_PATH = "pages/images/lab_logo.png"
+
+# Sidebar title and logo styling shared by every page
+SIDEBAR_CSS = """
+    <style>
+        .sidebar-title {
+            font-size: 24px;
+            font-weight: bold;
+            text-align: center;
+            color: "white";
+            margin-bottom: 10px;
+        }
+        .sidebar-logo {
+            display: block;
+            margin: 0 auto;
+            width: 150px;  /* Adjust size as needed */
+            border-radius: 10px;
+        }
+    </style>
+    """
+
+# Custom CSS to expand content area
+WIDE_CONTENT_CSS = """
+    <style>
+    .block-container {
+        max-width: 95%;
+        padding-left: 2rem;
+        padding-right: 2rem;
+    }
+    </style>
+    """
+
+FOOTER_HTML = """
+    <hr>
+    <p style='text-align: center;'>
+    © 2024 Rajesh Pandey | INGEN-HOPE Lab
+    </p>
+    """
+
+
+def setup_page(wide_content=True, hide_menu=False):
+    # Page config, sidebar logo/title and CSS in one call at the top of a page
+    page_config = dict(
+        page_title="DENViewer",
+        page_icon="🧫",
+        layout="wide",
+        initial_sidebar_state="auto",
+    )
+    if hide_menu:
+        page_config["menu_items"] = {
+            "Get Help": None,
+            "Report a bug": None,
+            "About": None,
+        }
+    st.set_page_config(**page_config)
+
+    # Pin this run to the live data generation and keep the data fresh
+    refresh.start_watcher()
+    refresh.pin()
+
+    st.sidebar.image(assets.image(LOGO_PATH), use_container_width=True)
+    st.sidebar.markdown('<p class="sidebar-title">DENViewer</p>', unsafe_allow_html=True)
+    st.sidebar.markdown(SIDEBAR_CSS, unsafe_allow_html=True)
+    st.sidebar.markdown("---")
+
+    if wide_content:
+        st.markdown(WIDE_CONTENT_CSS, unsafe_allow_html=True)
+
+
+def footer():
+    st.markdown(FOOTER_HTML, unsafe_allow_html=True)
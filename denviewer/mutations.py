@@ -0,0 +1,189 @@
+import logging
+import math
+
+import numpy as np
+import pandas as pd
+
+from denviewer import data, dataplane, refresh
+
+SEVERITY_FREQUENCIES = {
+    "Mild": "Mild Frequency",
+    "Moderate": "Moderate Frequency",
+    "Severe": "Severe Frequency",
+}
+# Largest class size group_sizes looks for
+MAX_GROUP_SIZE = 100000
+
+logger = logging.getLogger(__name__)
+
+
+def read_mutations(path=data.MUTATIONS_FILE):
+    # all_Mutations.csv with numeric position and frequencies; rows missing
+    # either are dropped
+    df = pd.read_csv(path)
+    for col in ["Position", "Frequency", *SEVERITY_FREQUENCIES.values()]:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df = df.dropna(subset=["Position", "Frequency"]).reset_index(drop=True)
+    df["Position"] = df["Position"].astype(np.int32)
+    return df
+
+
+@refresh.cached
+def load_mutations(path=data.MUTATIONS_FILE):
+    # Shared read-only copy, mapped from the data plane when published
+    mapped = dataplane.frame("mutations", path)
+    return mapped if mapped is not None else read_mutations(path)
+
+
+def _denominator(freqs, max_size, tol=1e-6):
+    # Smallest n for which every frequency is a whole number of genomes out
+    # of n, 0 when there are none (the class had no genomes that year)
+    freqs = np.unique(freqs[freqs > 0])
+    if not len(freqs):
+        return 0
+    for start in range(1, max_size + 1, 1000):
+        n = np.arange(start, min(start + 1000, max_size + 1), dtype=np.float64)[:, None]
+        counts = freqs * n
+        whole = (np.abs(counts - np.round(counts)) <= tol).all(axis=1)
+        if whole.any():
+            return int(n[whole.argmax(), 0])
+    return None
+
+
+def group_sizes(df, max_size=MAX_GROUP_SIZE):
+    # Genomes per year and severity class that the table's frequencies were
+    # computed over: the smallest denominator that makes every frequency of
+    # the group an exact count. Classes with no genomes in a year are 0.
+    sizes = {}
+    for col in SEVERITY_FREQUENCIES.values():
+        freq = df[col].fillna(0).to_numpy(dtype=np.float64)
+        sizes[col] = {
+            year: _denominator(freq[rows], max_size)
+            for year, rows in df.groupby("Year").indices.items()
+        }
+    sizes = pd.DataFrame(sizes).rename_axis("Year")
+    if sizes.isna().any(axis=None):
+        missing = sizes.isna().stack()
+        raise ValueError(
+            "Frequencies are not whole counts out of any class size up to "
+            f"{max_size}: {', '.join(f'{year} {col}' for year, col in missing[missing].index)}"
+        )
+    return sizes.astype(np.int64)
+
+
+def sample_sizes(demographics):
+    # Sequenced genomes per collection year and severity class in the
+    # demographics table (one per strain), to check group_sizes against
+    samples = demographics.dropna(subset=["strain", "Collection_date", "Severity"]).drop_duplicates("strain")
+    sizes = pd.crosstab(samples["Collection_date"].dt.year.rename("Year"), samples["Severity"].astype(str))
+    sizes = sizes.reindex(columns=list(SEVERITY_FREQUENCIES), fill_value=0)
+    return sizes.rename(columns=SEVERITY_FREQUENCIES).rename_axis(columns=None).astype(np.int64)
+
+
+def size_mismatches(sizes, samples):
+    # Year and class pairs whose table denominator differs from the
+    # demographics count, as rows of Year, Class, Table and Demographics
+    samples = samples.reindex(index=sizes.index, columns=sizes.columns).fillna(0).astype(np.int64)
+    differs = sizes.ne(samples).stack()
+    rows = [
+        {"Year": year, "Class": col.removesuffix(" Frequency"),
+         "Table": sizes.at[year, col], "Demographics": samples.at[year, col]}
+        for year, col in differs[differs].index
+    ]
+    return pd.DataFrame(rows, columns=["Year", "Class", "Table", "Demographics"])
+
+
+def benjamini_hochberg(p, groups):
+    # BH-adjusted q-values, with each group (year) its own family of tests
+    p = np.asarray(p, dtype=np.float64)
+    order = np.lexsort((p, groups))
+    p_sorted, g_sorted = p[order], np.asarray(groups)[order]
+    # Rank within group and group size for every sorted position
+    starts = np.r_[0, np.flatnonzero(g_sorted[1:] != g_sorted[:-1]) + 1]
+    sizes = np.diff(np.r_[starts, len(p)])
+    rank = np.arange(len(p)) - np.repeat(starts, sizes) + 1
+    m = np.repeat(sizes, sizes)
+    q_sorted = p_sorted * m / rank
+    # Enforce monotonicity from the largest p downwards within each group
+    q_sorted = pd.Series(q_sorted[::-1]).groupby(g_sorted[::-1]).cummin().to_numpy()[::-1]
+    q = np.empty_like(q_sorted)
+    q[order] = np.minimum(q_sorted, 1.0)
+    return q
+
+
+def chi2_sf(x, df):
+    # Chi-square survival function for 0, 1 or 2 degrees of freedom (all a
+    # 2 x 3 table can have): erfc(sqrt(x / 2)) for one, exp(-x / 2) for two
+    x, df = np.broadcast_arrays(np.asarray(x, dtype=np.float64), df)
+    erfc = np.frompyfunc(math.erfc, 1, 1)
+    p = np.where(df == 2, np.exp(-x / 2), 1.0)
+    one = df == 1
+    p[one] = erfc(np.sqrt(x[one] / 2)).astype(np.float64)
+    return p
+
+
+def severity_association(df, sizes=None):
+    # Chi-square test of independence between carrying each mutation and
+    # severity class, for all mutations and years at once. Classes without
+    # genomes that year are left out of the table, so it is 2 x 3 or 2 x 2 and
+    # the degrees of freedom follow. "Low Expected Cells" counts cells with an
+    # expected count below 5, where the chi-square approximation is rough.
+    # Also reports the severe-vs-mild log2 odds ratio (+0.5 Haldane
+    # correction) as the direction of the association.
+    sizes = group_sizes(df) if sizes is None else sizes
+    n = sizes.reindex(df["Year"]).fillna(0).to_numpy(dtype=np.float64)  # rows x classes
+    freq = df[list(SEVERITY_FREQUENCIES.values())].fillna(0).to_numpy(dtype=np.float64)
+    carriers = np.minimum(np.round(freq * n), n)
+    observed = np.stack([carriers, n - carriers], axis=1)  # rows x 2 x classes
+
+    total = observed.sum(axis=(1, 2), keepdims=True)
+    row_totals = observed.sum(axis=2, keepdims=True)
+    col_totals = observed.sum(axis=1, keepdims=True)
+    expected = row_totals * col_totals / np.where(total > 0, total, 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cells = np.where(expected > 0, (observed - expected) ** 2 / expected, 0.0)
+    chi2 = cells.sum(axis=(1, 2))
+    # Empty rows (nobody or everybody carries it) and classes have no freedom
+    dof = (np.maximum((row_totals[:, :, 0] > 0).sum(axis=1) - 1, 0)
+           * np.maximum((col_totals[:, 0, :] > 0).sum(axis=1) - 1, 0))
+    p = chi2_sf(chi2, dof)
+    low_expected = ((expected < 5) & (col_totals > 0)).sum(axis=(1, 2))
+
+    mild, severe = carriers[:, 0], carriers[:, 2]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log2_or = np.log2(
+            ((severe + 0.5) * (n[:, 0] - mild + 0.5)) / ((mild + 0.5) * (n[:, 2] - severe + 0.5))
+        )
+    # Undefined without both mild and severe genomes
+    log2_or[(n[:, 0] == 0) | (n[:, 2] == 0)] = np.nan
+
+    result = df[["Mutation", "Position", "Gene", "AA_mut", "Mutation Type", "Year"]].copy()
+    for i, label in enumerate(SEVERITY_FREQUENCIES):
+        result[f"{label} Carriers"] = carriers[:, i].astype(np.int64)
+    result["Chi-square"] = chi2
+    result["df"] = dof.astype(np.int64)
+    result["Low Expected Cells"] = low_expected.astype(np.int64)
+    result["p-value"] = p
+    result["q-value"] = benjamini_hochberg(p, df["Year"].to_numpy())
+    result["log2 OR (Severe vs Mild)"] = log2_or
+    result["-log10 p"] = -np.log10(np.maximum(p, np.finfo(np.float64).tiny))
+    return result
+
+
+@refresh.cached
+def load_group_sizes(path=data.MUTATIONS_FILE):
+    # Class sizes of the mutation table and where they disagree with the
+    # demographics; the table's own sizes are used either way
+    sizes = group_sizes(load_mutations(path))
+    mismatches = size_mismatches(sizes, sample_sizes(data.load_demographics()))
+    if len(mismatches):
+        logger.warning(
+            "Class sizes of %s differ from the demographics: %s", path,
+            "; ".join(f"{r.Year} {r.Class} {r.Table} vs {r.Demographics}" for r in mismatches.itertuples()),
+        )
+    return sizes, mismatches
+
+
+@refresh.cached
+def load_association(path=data.MUTATIONS_FILE):
+    return severity_association(load_mutations(path), load_group_sizes(path)[0])
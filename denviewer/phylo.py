@@ -0,0 +1,276 @@
+import re
+
+import numpy as np
+
+from denviewer import data, dataplane, refresh
+
+TREE_FILE = "pages/files/tree.nwk"
+# ArrayTree attributes published to the data plane; the rest are rebuilt
+TREE_ARRAYS = [
+    "parent", "length", "child_offsets", "child_ids", "is_tip", "support", "level", "dist",
+    "size", "tips", "tip_start", "tip_end", "euler", "first", "_sparse", "_euler_levels",
+]
+
+_NEWICK_TOKENS = re.compile(
+    r"\s*(?:(\[[^\]]*\])|([(),;])|:\s*([^\s,();\[]+)|'((?:[^']|'')*)'|([^\s,():;\[']+))"
+)
+
+
+def parse_newick(text):
+    # Node names, parent ids and branch lengths in the order nodes are opened.
+    # Iterative, so deep (ladder-like) trees do not hit the recursion limit.
+    names, parent, length = [""], [-1], [0.0]
+    stack, current = [], 0
+    for comment, punct, brlen, quoted, label in _NEWICK_TOKENS.findall(text):
+        if comment:
+            continue
+        if punct == "(":
+            stack.append(current)
+            names.append(""), parent.append(current), length.append(0.0)
+            current = len(names) - 1
+        elif punct == ",":
+            names.append(""), parent.append(stack[-1]), length.append(0.0)
+            current = len(names) - 1
+        elif punct == ")":
+            current = stack.pop()
+        elif punct == ";":
+            break
+        elif brlen:
+            length[current] = float(brlen)
+        else:
+            names[current] = quoted.replace("''", "'") if quoted else label
+    if stack:
+        raise ValueError("Unbalanced parentheses in Newick string")
+    return names, np.array(parent, dtype=np.int64), np.array(length, dtype=np.float64)
+
+
+_SUPPORT_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)")
+
+
+def parse_support(names):
+    # Branch support from internal node labels such as "95", "0.98" or
+    # "80/95" (first value); NaN where a label is not numeric, e.g. NODE_0000003
+    support = np.full(len(names), np.nan)
+    for i, name in enumerate(names):
+        match = _SUPPORT_RE.match(name)
+        if match:
+            support[i] = float(match.group(1))
+    return support
+
+
+class ArrayTree:
+    """Rooted tree stored as flat arrays, with nodes numbered in preorder.
+
+    Preorder numbering makes every subtree a contiguous id range
+    ``[v, v + size[v])`` and its tips the slice ``tips[tip_start[v]:tip_end[v]]``.
+    An Euler tour with a sparse table over node levels answers lowest common
+    ancestor queries in O(1), and through them MRCA and patristic distances.
+    """
+
+    def __init__(self, names, parent, length):
+        n = len(parent)
+        children = [[] for _ in range(n)]
+        for child in range(1, n):
+            children[parent[child]].append(child)
+
+        # Preorder relabelling: new id for every parse-order node
+        order = np.empty(n, dtype=np.int64)
+        stack, i = [0], 0
+        while stack:
+            node = stack.pop()
+            order[i] = node
+            i += 1
+            stack.extend(reversed(children[node]))
+        new_id = np.empty(n, dtype=np.int64)
+        new_id[order] = np.arange(n)
+
+        self.n = n
+        self.names = np.array(names, dtype=object)[order]
+        self.parent = np.where(parent[order] >= 0, new_id[parent[order]], -1).astype(np.int32)
+        self.length = length[order]
+        self.length[0] = 0.0
+
+        # Children in CSR form: children of v are child_ids[child_offsets[v]:child_offsets[v + 1]]
+        counts = np.bincount(self.parent[1:], minlength=n)
+        self.child_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int32)
+        self.child_ids = np.argsort(self.parent[1:], kind="stable").astype(np.int32) + 1
+        self.is_tip = counts == 0
+        self.support = parse_support(self.names)
+        self.support[self.is_tip] = np.nan
+
+        # Levels and root distances; parents always precede children in preorder
+        self.level = np.zeros(n, dtype=np.int32)
+        self.dist = np.zeros(n, dtype=np.float64)
+        for v in range(1, n):
+            p = self.parent[v]
+            self.level[v] = self.level[p] + 1
+            self.dist[v] = self.dist[p] + self.length[v]
+
+        # Subtree sizes and tip ranges, accumulated bottom-up
+        self.size = np.ones(n, dtype=np.int32)
+        tip_count = self.is_tip.astype(np.int32)
+        for v in range(n - 1, 0, -1):
+            self.size[self.parent[v]] += self.size[v]
+            tip_count[self.parent[v]] += tip_count[v]
+        self.tips = np.flatnonzero(self.is_tip).astype(np.int32)
+        self.tip_start = np.cumsum(self.is_tip) - self.is_tip
+        self.tip_end = self.tip_start + tip_count
+        self.tip_index = {name: int(v) for name, v in zip(self.names[self.tips], self.tips)}
+
+        self._build_lca_index()
+
+    @classmethod
+    def from_arrays(cls, names, arrays):
+        # Tree over previously computed arrays (e.g. memory-mapped from the
+        # data plane) without re-running the construction passes
+        tree = cls.__new__(cls)
+        for key in TREE_ARRAYS:
+            setattr(tree, key, arrays[key])
+        tree.n = len(tree.parent)
+        tree.names = np.asarray(names, dtype=object)
+        tree.tip_index = {name: int(v) for name, v in zip(tree.names[tree.tips], tree.tips)}
+        return tree
+
+    def to_arrays(self):
+        return {key: getattr(self, key) for key in TREE_ARRAYS}
+
+    def _build_lca_index(self):
+        # Euler tour (2n - 1 visits) and a sparse table of argmin-by-level
+        # over every power-of-two window
+        euler = np.empty(2 * self.n - 1, dtype=np.int32)
+        first = np.empty(self.n, dtype=np.int32)
+        pos, stack = 0, [(0, self.child_offsets[0])]
+        first[0] = 0
+        euler[0] = 0
+        while stack:
+            node, k = stack[-1]
+            if k < self.child_offsets[node + 1]:
+                stack[-1] = (node, k + 1)
+                child = self.child_ids[k]
+                pos += 1
+                euler[pos] = child
+                first[child] = pos
+                stack.append((child, self.child_offsets[child]))
+            else:
+                stack.pop()
+                if stack:
+                    pos += 1
+                    euler[pos] = stack[-1][0]
+        self.euler, self.first = euler, first
+
+        levels = self.level[euler]
+        table = [np.arange(len(euler), dtype=np.int32)]
+        width = 1
+        while 2 * width <= len(euler):
+            prev = table[-1]
+            left, right = prev[:-width], prev[width:]
+            best = np.where(levels[left] <= levels[right], left, right)
+            # Pad to full length so the table is one 2-D array; padded
+            # entries are never read by a valid query
+            table.append(np.concatenate([best, prev[len(best):]]))
+            width *= 2
+        self._sparse = np.vstack(table)
+        self._euler_levels = levels
+
+    def _range_min(self, lo, hi):
+        # Node with the smallest level among Euler positions lo..hi (inclusive);
+        # works elementwise on arrays of ranges
+        k = np.log2(np.asarray(hi) - lo + 1).astype(np.int64)
+        a = self._sparse[k, lo]
+        b = self._sparse[k, hi - (1 << k) + 1]
+        return self.euler[np.where(self._euler_levels[a] <= self._euler_levels[b], a, b)]
+
+    def node(self, name):
+        # Node id of a tip by name (KeyError if absent)
+        return self.tip_index[name]
+
+    def lca(self, u, v):
+        # Lowest common ancestor of u and v (scalars or equal-length arrays)
+        fu, fv = self.first[u], self.first[v]
+        return self._range_min(np.minimum(fu, fv), np.maximum(fu, fv))
+
+    def mrca(self, nodes):
+        # Most recent common ancestor of a set of nodes: the LCA of the two
+        # that appear first and last in the Euler tour
+        positions = self.first[np.asarray(nodes)]
+        return int(self._range_min(positions.min(), positions.max()))
+
+    def patristic(self, u, v):
+        # Sum of branch lengths on the path between u and v
+        return self.dist[u] + self.dist[v] - 2 * self.dist[self.lca(u, v)]
+
+    def is_ancestor(self, a, v):
+        return a <= v < a + self.size[a]
+
+    def subtree(self, v):
+        # Ids of every node below v (inclusive), in preorder
+        return np.arange(v, v + self.size[v], dtype=np.int32)
+
+    def subtree_tips(self, v):
+        return self.tips[self.tip_start[v]:self.tip_end[v]]
+
+    def path_to_root(self, v):
+        path = [v]
+        while self.parent[path[-1]] >= 0:
+            path.append(int(self.parent[path[-1]]))
+        return np.array(path, dtype=np.int32)
+
+
+def from_newick(text):
+    return ArrayTree(*parse_newick(text))
+
+
+def rectangular_layout(tree, x=None):
+    # Tip rows in preorder, parents centred on their children. x defaults to
+    # topological depth; pass tree.dist for branch-length scaling.
+    x = tree.level.astype(np.float64) if x is None else x
+    y = np.zeros(tree.n, dtype=np.float64)
+    y[tree.tips] = np.arange(len(tree.tips))
+    # Process one level at a time from the deepest, averaging child rows
+    n_children = np.diff(tree.child_offsets)
+    sums = np.zeros(tree.n)
+    for level in range(tree.level.max(), 0, -1):
+        nodes = np.flatnonzero(tree.level == level)
+        parents = tree.parent[nodes]
+        np.add.at(sums, parents, y[nodes])
+        touched = np.unique(parents)
+        y[touched] = sums[touched] / n_children[touched]
+    return x, y
+
+
+def edge_segments(tree, x, y, nodes=None):
+    # Elbow segments parent -> child for a single line trace. Each edge is a
+    # vertical then a horizontal step, separated from the next by a NaN gap.
+    nodes = np.arange(1, tree.n) if nodes is None else nodes[tree.parent[nodes] >= 0]
+    parents = tree.parent[nodes]
+    xs = np.column_stack([x[parents], x[parents], x[nodes], np.full(len(nodes), np.nan)]).ravel()
+    ys = np.column_stack([y[parents], y[nodes], y[nodes], np.full(len(nodes), np.nan)]).ravel()
+    return xs, ys
+
+
+def tip_metadata(tree, demographics):
+    # Demographic rows aligned to tree.tips (NaN for tips without a record)
+    records = demographics.drop_duplicates("strain").set_index("strain")
+    return records.reindex(tree.names[tree.tips]).reset_index(names="strain")
+
+
+@refresh.cached
+def load_tree(path=TREE_FILE):
+    mapped = dataplane.dataset("tree", path)
+    if mapped is not None:
+        return ArrayTree.from_arrays(mapped["arrays"]["names"], mapped["arrays"])
+    with open(path, encoding="utf-8") as f:
+        return from_newick(f.read())
+
+
+@refresh.cached
+def load_layout(path=TREE_FILE):
+    mapped = dataplane.dataset("tree", path)
+    if mapped is not None:
+        return mapped["arrays"]["x"], mapped["arrays"]["y"]
+    return rectangular_layout(load_tree(path))
+
+
+@refresh.cached
+def load_tip_metadata(path=TREE_FILE):
+    return tip_metadata(load_tree(path), data.load_demographics())
@@ -0,0 +1,211 @@
+import collections
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Cached loaders and the data generation they were built for.
+#
+# Every loader decorated with @cached keeps its results per generation. A
+# background thread polls the data directory; once a change has settled it
+# rebuilds, under the next generation, what each loader returns when called
+# without arguments, and only then makes that generation live. Each script run
+# pins the live generation when the page starts (setup_page calls pin), so a
+# run that is already in flight finishes on the data it started with while the
+# next rerun picks up the new one without paying for the rebuild. Results for
+# other arguments (cluster thresholds and the like) are kept for the
+# MAX_ARGUMENT_ENTRIES most recently used argument sets and recomputed on
+# demand after a refresh.
+#
+# Fragment reruns (st.fragment) do not run setup_page, so they keep reading
+# the generation the whole page was rendered from, matching the rest of the
+# page. Only once that generation has been dropped, two refreshes later, does
+# a fragment read the live one.
+DATA_DIR = "pages/files"
+# Extra files watched besides the top level of DATA_DIR
+WATCHED_FILES = ["pages/files/dataplane/CURRENT"]
+POLL_SECONDS = 10.0
+MAX_ARGUMENT_ENTRIES = 32
+SESSION_KEY = "data_generation"
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_entries = {}  # (loader, generation, args) -> value
+_recent = collections.OrderedDict()  # argument-keyed entries, least recently used first
+_building = {}  # (loader, generation, args) -> lock held while it is computed
+_loaders = {}  # loader name -> (function, args of a call without arguments or None)
+# oldest: the oldest generation whose entries are still kept
+_state = {"live": 0, "oldest": 0, "watcher": None}
+_local = threading.local()
+
+
+def snapshot(directory=DATA_DIR, extra=WATCHED_FILES):
+    # Name, size and modification time of every watched file
+    files = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file():
+                stat = entry.stat()
+                files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+    for path in extra:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            files[path] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def generation():
+    # The generation loaders read from: the one being built on a rebuild
+    # thread, else the one pinned by the current script run, else the live one
+    building = getattr(_local, "generation", None)
+    if building is not None:
+        return building
+    if get_script_run_ctx(suppress_warning=True) is not None:
+        pinned = st.session_state.get(SESSION_KEY, _state["live"])
+        # A run outlasting two refreshes reads the live data rather than
+        # recomputing a generation that has been dropped
+        if pinned >= _state["oldest"]:
+            return pinned
+    return _state["live"]
+
+
+def pin():
+    # Called at the top of every full page run, not on fragment reruns
+    st.session_state[SESSION_KEY] = _state["live"]
+
+
+def _used(key):
+    # Mark an argument-keyed entry as recently used, dropping the least
+    # recently used ones past MAX_ARGUMENT_ENTRIES. Call with _lock held.
+    if key[2] == _loaders[key[0]][1]:
+        return
+    _recent[key] = None
+    _recent.move_to_end(key)
+    while len(_recent) > MAX_ARGUMENT_ENTRIES:
+        old, _ = _recent.popitem(last=False)
+        _entries.pop(old, None)
+
+
+def _drop(keys):
+    # Call with _lock held
+    for key in keys:
+        _entries.pop(key, None)
+        _recent.pop(key, None)
+
+
+def _get(name, func, gen, key_args):
+    key = (name, gen, key_args)
+    with _lock:
+        if key in _entries:
+            _used(key)
+            return _entries[key]
+        building = _building.setdefault(key, threading.Lock())
+    # One thread computes each entry; others asking for it wait and reuse it
+    with building:
+        with _lock:
+            if key in _entries:
+                _used(key)
+                return _entries[key]
+        args, kwargs = key_args
+        try:
+            value = func(*args, **dict(kwargs))
+            with _lock:
+                _entries[key] = value
+                _used(key)
+        finally:
+            # Also on failure, so the next call for this key computes afresh
+            with _lock:
+                _building.pop(key, None)
+    return value
+
+
+def _key_args(bound):
+    bound.apply_defaults()
+    return (bound.args, tuple(sorted(bound.kwargs.items())))
+
+
+def cached(func):
+    # Drop-in replacement for st.cache_resource on data loaders: one shared,
+    # read-only result per argument set and data generation
+    # Keyed by file as well, since every page script runs as __main__
+    name = f"{func.__code__.co_filename}:{func.__qualname__}"
+    signature = inspect.signature(func)
+    try:
+        default = _key_args(signature.bind())
+    except TypeError:
+        default = None  # has required arguments, so nothing to warm
+    _loaders[name] = (func, default)
+
+    @functools.wraps(func)
+    def load(*args, **kwargs):
+        key_args = _key_args(signature.bind(*args, **kwargs))
+        return _get(name, func, generation(), key_args)
+
+    return load
+
+
+def rebuild():
+    # Recompute, under the next generation, the no-argument entries the live
+    # generation holds, then swap. On failure the live generation stays and
+    # the error is logged.
+    live = _state["live"]
+    new = live + 1
+    with _lock:
+        keys = [key for key in _entries if key[1] == live and key[2] == _loaders[key[0]][1]]
+    _local.generation = new
+    try:
+        for name, _, key_args in keys:
+            _get(name, _loaders[name][0], new, key_args)
+    except Exception:
+        logger.exception("Data refresh failed; keeping generation %d", live)
+        with _lock:
+            _drop([k for k in _entries if k[1] == new])
+        return False
+    finally:
+        _local.generation = None
+
+    with _lock:
+        _state["live"] = new
+        # Keep the previous generation for runs still pinned to it
+        _state["oldest"] = live
+        _drop([k for k in _entries if k[1] < live])
+    logger.info("Data refreshed: generation %d (%d entries)", new, len(keys))
+    return True
+
+
+def _watch(seen, interval):
+    pending = None
+    while True:
+        time.sleep(interval)
+        try:
+            current = snapshot()
+        except OSError:
+            continue
+        if current == seen:
+            pending = None
+        elif current != pending:
+            # Wait for one more unchanged poll so files still being copied
+            # are not read half-written
+            pending = current
+        elif rebuild():
+            seen, pending = current, None
+        else:
+            # Still unseen, so the next poll tries again
+            logger.warning("Retrying the data refresh in %.0f s", interval)
+
+
+def start_watcher(interval=POLL_SECONDS):
+    # Start the watcher thread once per process, from the files as they are now
+    with _lock:
+        if _state["watcher"] is not None:
+            return
+        _state["watcher"] = threading.Thread(
+            target=_watch, args=(snapshot(), interval), name="data-refresh", daemon=True
+        )
+    _state["watcher"].start()
@@ -0,0 +1,122 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from denviewer import data, refresh
+
+SEROTYPES = ["DENV1", "DENV2", "DENV3", "DENV4"]
+# Per-serotype RT-PCR Ct columns in all_demographics.csv
+CT_COLUMNS = {
+    "DENV1": "DENV-1",
+    "DENV2": "DENV-2(Ct)",
+    "DENV3": "DENV-3",
+    "DENV4": "DENV-4",
+}
+NO_SEROTYPE = "Not typed"
+
+_SEROTYPE_RE = re.compile(r"DENV\s*-?\s*([1-4])", re.IGNORECASE)
+
+
+def parse_serotypes(values):
+    # Boolean sample x serotype matrix from free text like "DENV2 , DENV3".
+    # Only the distinct strings are parsed; rows are then gathered by their
+    # category code, so the cost grows with the number of spellings, not samples.
+    values = values.astype("category")
+    lookup = np.zeros((len(values.cat.categories) + 1, len(SEROTYPES)), dtype=bool)
+    for i, text in enumerate(values.cat.categories):
+        for digit in _SEROTYPE_RE.findall(str(text)):
+            lookup[i, int(digit) - 1] = True
+    # Code -1 (missing) picks the trailing all-False row
+    present = lookup[values.cat.codes.to_numpy()]
+    return pd.DataFrame(present, index=values.index, columns=SEROTYPES)
+
+
+def combination_labels(present):
+    # "DENV2 + DENV3" style label per sample, ordered by number of serotypes
+    bits = present.to_numpy().astype(np.int64) @ (1 << np.arange(len(SEROTYPES)))
+    names = {}
+    for mask in np.unique(bits):
+        members = [s for i, s in enumerate(SEROTYPES) if mask >> i & 1]
+        names[mask] = " + ".join(members) if members else NO_SEROTYPE
+    order = sorted(names, key=lambda m: (m == 0, bin(m).count("1"), names[m]))
+    position = np.zeros(1 << len(SEROTYPES), dtype=np.int64)
+    position[order] = np.arange(len(order))
+    return pd.Categorical.from_codes(position[bits], categories=[names[m] for m in order])
+
+
+def serotype_table(demographics):
+    # One row per sample: severity, serotype presence flags, Ct per serotype
+    # ("<serotype> Ct", NaN when not measured) and the co-infection combination
+    present = parse_serotypes(demographics["Putative Serotypes"])
+    ct = demographics[list(CT_COLUMNS.values())].to_numpy(dtype=np.float32)
+    ct[ct <= 0] = np.nan  # Ct of 0 marks a failed or absent reaction
+    ct = pd.DataFrame(ct, index=demographics.index, columns=[f"{s} Ct" for s in SEROTYPES])
+
+    table = pd.concat([demographics[["strain", "Severity"]], present, ct], axis=1)
+    table["Combination"] = combination_labels(present)
+    return table
+
+
+def combination_counts(table):
+    counts = table["Combination"].value_counts(sort=False).rename("Samples").reset_index()
+    counts["Serotypes"] = counts["Combination"].astype(str).str.count(r"\+") + 1
+    counts.loc[counts["Combination"] == NO_SEROTYPE, "Serotypes"] = 0
+    counts["Share (%)"] = 100 * counts["Samples"] / counts["Samples"].sum()
+    return counts
+
+
+def ct_by_combination(table):
+    # Box-plot statistics of Ct per combination and serotype, so the chart
+    # draws one precomputed box per group instead of shipping every sample
+    long = table.melt(
+        id_vars="Combination",
+        value_vars=[f"{s} Ct" for s in SEROTYPES],
+        var_name="Serotype",
+        value_name="Ct",
+    ).dropna(subset=["Ct"])
+    long["Serotype"] = long["Serotype"].str.removesuffix(" Ct")
+
+    grouped = long.groupby(["Combination", "Serotype"], observed=True)["Ct"]
+    stats = grouped.quantile([0.0, 0.25, 0.5, 0.75, 1.0]).unstack()
+    stats.columns = ["min", "q1", "median", "q3", "max"]
+    stats["n"] = grouped.size()
+    iqr = stats["q3"] - stats["q1"]
+    stats["lowerfence"] = np.maximum(stats["min"], stats["q1"] - 1.5 * iqr)
+    stats["upperfence"] = np.minimum(stats["max"], stats["q3"] + 1.5 * iqr)
+    return stats.reset_index()
+
+
+def severity_by_combination(table):
+    # Severity counts per combination, the within-combination share and the
+    # standardized (Pearson) residual against independence: positive values
+    # mean the combination is over-represented in that severity class
+    typed = table.dropna(subset=["Severity"])
+    counts = pd.crosstab(typed["Combination"], typed["Severity"], dropna=False)
+    counts = counts.loc[counts.sum(axis=1) > 0, counts.sum(axis=0) > 0]
+
+    observed = counts.to_numpy(dtype=np.float64)
+    expected = observed.sum(axis=1, keepdims=True) * observed.sum(axis=0, keepdims=True) / observed.sum()
+    residuals = (observed - expected) / np.sqrt(expected)
+
+    share = 100 * counts.div(counts.sum(axis=1), axis=0)
+    residuals = pd.DataFrame(residuals, index=counts.index, columns=counts.columns)
+    return counts, share, residuals
+
+
+@refresh.cached
+def load_serotypes():
+    return serotype_table(data.load_demographics())
+
+
+@refresh.cached
+def coinfection_summary():
+    table = load_serotypes()
+    counts, share, residuals = severity_by_combination(table)
+    return {
+        "combinations": combination_counts(table),
+        "ct": ct_by_combination(table),
+        "severity_counts": counts,
+        "severity_share": share,
+        "severity_residuals": residuals,
+    }
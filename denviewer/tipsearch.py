@@ -0,0 +1,92 @@
+import numpy as np
+
+from denviewer import phylo, refresh
+
+# Demographic fields searched alongside the tip name
+SEARCH_FIELDS = ["Severity", "Gender", "Collection_date", "Putative Serotypes"]
+MAX_RESULTS = 50
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def build_search_index(names, fields):
+    # names: tip names in tree.tips order; fields: {label: strings aligned to
+    # names, None where missing}.
+    # Builds a sorted key array for O(log n) prefix lookups and a trigram
+    # postings index for substring lookups, plus each tip's display label.
+    keys, key_tips = [], []
+    texts = []
+    for i, name in enumerate(names):
+        values = [f[i] for f in fields.values() if f[i]]
+        tip_keys = [name.lower()] + [v.lower() for v in values]
+        keys.extend(tip_keys)
+        key_tips.extend([i] * len(tip_keys))
+        texts.append("\x00".join(tip_keys))
+
+    order = np.argsort(np.array(keys, dtype=str), kind="stable")
+    postings = {}
+    for i, text in enumerate(texts):
+        for gram in _trigrams(text):
+            if "\x00" not in gram:
+                postings.setdefault(gram, []).append(i)
+
+    labels = [
+        f"{name} ({', '.join(f[i] for f in fields.values() if f[i])})"
+        for i, name in enumerate(names)
+    ]
+    return {
+        "keys": np.array(keys, dtype=str)[order],
+        "key_tips": np.array(key_tips, dtype=np.int32)[order],
+        "postings": {g: np.array(p, dtype=np.int32) for g, p in postings.items()},
+        "texts": texts,
+        "labels": labels,
+    }
+
+
+def prefix_matches(index, query):
+    # Tips with any key starting with query, via binary search on sorted keys
+    keys = index["keys"]
+    lo = np.searchsorted(keys, query, side="left")
+    hi = np.searchsorted(keys, query + "\uffff", side="left")
+    return np.unique(index["key_tips"][lo:hi])
+
+
+def substring_matches(index, query):
+    # Tips containing query anywhere: intersect the trigram postings, then
+    # confirm the candidates (trigrams can match out of order)
+    grams = sorted(_trigrams(query), key=lambda g: len(index["postings"].get(g, ())))
+    if not grams or grams[0] not in index["postings"]:
+        return np.empty(0, dtype=np.int32)
+    candidates = index["postings"][grams[0]]
+    for gram in grams[1:]:
+        candidates = np.intersect1d(candidates, index["postings"].get(gram, ()), assume_unique=True)
+        if not len(candidates):
+            break
+    texts = index["texts"]
+    return np.array([i for i in candidates if query in texts[i]], dtype=np.int32)
+
+
+def search(index, query, limit=MAX_RESULTS):
+    # Tip positions (into tree.tips) matching query: prefix matches first,
+    # then other substring matches for queries of three or more characters
+    query = query.strip().lower()
+    if not query:
+        return np.empty(0, dtype=np.int32)
+    hits = prefix_matches(index, query)
+    if len(query) >= 3:
+        others = np.setdiff1d(substring_matches(index, query), hits, assume_unique=True)
+        hits = np.concatenate([hits, others])
+    return hits[:limit]
+
+
+@refresh.cached
+def load_search_index(path=phylo.TREE_FILE):
+    tree = phylo.load_tree(path)
+    metadata = phylo.load_tip_metadata(path)
+    fields = {
+        col: [None if missing else str(v) for v, missing in zip(metadata[col], metadata[col].isna())]
+        for col in SEARCH_FIELDS
+    }
+    return build_search_index(list(tree.names[tree.tips]), fields)
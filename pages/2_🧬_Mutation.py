@@ -1,55 +1,19 @@
 import streamlit as st
-import pandas as pd
 import plotly.graph_objects as go
 import numpy as np
 import plotly.express as px
+from plotly.subplots import make_subplots
 import streamlit_shadcn_ui as ui
 
-# Set Streamlit page config
-st.set_page_config(
-    page_title="DENViewer",
-    page_icon="🧫",
-    layout="wide",
-    initial_sidebar_state="auto",
-)
+from denviewer import data, diversity, export, mutations, refresh
+from denviewer.layout import setup_page, footer
 
-# Sidebar: Add logo and title
-st.sidebar.image("pages/images/lab_logo.png", use_container_width=True)
-st.sidebar.markdown('<p class="sidebar-title">DENViewer</p>', unsafe_allow_html=True)
+# Set Streamlit page config, sidebar logo and styling
+setup_page()
 
-# Sidebar styling
-st.sidebar.markdown(
-    """
-    <style>
-        .sidebar-title {
-            font-size: 24px;
-            font-weight: bold;
-            text-align: center;
-            color: black;
-            margin-bottom: 10px;
-        }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
-
-st.sidebar.markdown("---")
-# Custom CSS to expand content area
-st.markdown(
-    """
-    <style>
-    .block-container {
-        max-width: 95%;
-        padding-left: 2rem;
-        padding-right: 2rem;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
 # Load Data
 try:
-    df = pd.read_csv('pages/files/all_Mutations.csv')
+    df = mutations.load_mutations()
 except FileNotFoundError:
     st.error("File 'all_Mutations.csv' not found. Please check the file path.")
     st.stop()
@@ -62,6 +26,7 @@ st.markdown(
     #### **Key Features:**  
     - **Year-wise Mutation Analysis:** Select different years from the sidebar to compare mutation trends over time.  
     - **Lollipop Plot Visualization:** View mutations mapped along the viral genome, highlighting key variations.  
+    - **Genetic Diversity Tracks:** Compare Shannon entropy and nucleotide diversity across genes, years and severity classes.  
     - **Comprehensive Mutation List:** Access a detailed list of mutations, including nucleotide and amino acid changes.  
 """)
 
@@ -91,66 +56,6 @@ with col3:
 with col4:
      ui.metric_card(title="Selected Year", content=selected_year, description="Year selected for mutation statistics")
 
-# Ensure numeric columns
-df['Position'] = pd.to_numeric(df['Position'], errors='coerce')
-df['Frequency'] = pd.to_numeric(df['Frequency'], errors='coerce')
-
-# Drop rows with NaN values in essential columns
-df.dropna(subset=['Position', 'Frequency'], inplace=True)
-
-# Add small jitter to position
-df['Position Jittered'] = df['Position'] + np.random.uniform(-0.5, 0.5, size=len(df))
-
-# Define mutation types and colors
-mutation_types = df['Mutation Type'].unique()
-colors = px.colors.qualitative.Set1[:len(mutation_types)]
-
-# Create a dictionary of DataFrames for each mutation type
-filtered_dataframes = {mt: df[df['Mutation Type'] == mt] for mt in mutation_types}
-
-# Function to create scatter plots (lollipop chart)
-def create_figure(data, color):
-    return [
-        go.Scatter(
-            x=data['Position Jittered'],
-            y=data['Frequency'],
-            mode='lines',
-            line=dict(color='SlateGrey', width=0.25),
-            hoverinfo='skip',
-            showlegend=False
-        ),
-        go.Scatter(
-            x=data['Position Jittered'],
-            y=data['Frequency'],
-            mode='markers',
-            marker=dict(
-                size=np.maximum(data['Frequency'] * 10, 5),   # Scale marker size
-                color=color,
-                opacity=0.6
-            ),
-            hoverinfo='text',
-            text=[
-                f"Position: {row['Position']}<br>"
-                f"Mutation Type: {row['Mutation Type']}<br>"
-                f"Frequency: {row['Frequency']}<br>"
-                f"Mild Frequency: {row['Mild Frequency']}<br>"
-                f"Moderate Frequency: {row['Moderate Frequency']}<br>"
-                f"Severe Frequency: {row['Severe Frequency']}"
-                for index, row in data.iterrows()
-            ],
-            name=data['Mutation Type'].iloc[0]  
-        )
-    ]
-
-# Initialize figure
-fig = go.Figure()
-
-# Add traces for each mutation type
-for mt, color in zip(mutation_types, colors):
-    traces = create_figure(filtered_dataframes[mt], color)
-    for trace in traces:
-        fig.add_trace(trace)
-
 # Define gene regions with distinct colors
 gene_ranges = [
     {'start': 1, 'end': 99, 'gene': '5 UTR', 'color': '#FFA07A'},  # Light Salmon
@@ -167,125 +72,351 @@ gene_ranges = [
     {'start': 10276, 'end': 11000, 'gene': '3 UTR', 'color': '#2E8B57'}  # Sea Green
 ]
 
-gene_bar_height = 0.04 * max(df['Frequency'])  # Adjust height relative to max Frequency
 
-for gene in gene_ranges:
-    fig.add_shape(
-        type='rect',
-        x0=gene['start'], x1=gene['end'],
-        y0=-gene_bar_height, y1=0,  # Extend the height downwards
-        fillcolor=gene['color'], opacity=0.5,  # Increase opacity for better visibility
-        layer='below', line_width=0
-    )
-    fig.add_annotation(
-        x=(gene['start'] + gene['end']) / 2,
-        y=-1.5 * gene_bar_height,  # Move labels slightly lower
-        text=gene['gene'],
-        showarrow=False,
-        font=dict(size=14, color='black', family="Arial Bold"),  # Larger & bolder text
-        textangle=0,  # Keep horizontal for better readability
-        align='center'
-    )
+@refresh.cached
+def load_lollipop_figure():
+    # Lollipop chart of every mutation with its gene bar, built once per data
+    # generation and shared by all sessions
+    df = mutations.load_mutations().copy()
+
+    # Add small jitter to position
+    df['Position Jittered'] = df['Position'] + np.random.uniform(-0.5, 0.5, size=len(df))
+
+    # Define mutation types and colors
+    mutation_types = df['Mutation Type'].unique()
+    colors = px.colors.qualitative.Set1[:len(mutation_types)]
+
+    # Create a dictionary of DataFrames for each mutation type
+    filtered_dataframes = {mt: df[df['Mutation Type'] == mt] for mt in mutation_types}
+
+    # Function to create scatter plots (lollipop chart)
+    def create_figure(data, color):
+        return [
+            go.Scatter(
+                x=data['Position Jittered'],
+                y=data['Frequency'],
+                mode='lines',
+                line=dict(color='SlateGrey', width=0.25),
+                hoverinfo='skip',
+                showlegend=False
+            ),
+            go.Scatter(
+                x=data['Position Jittered'],
+                y=data['Frequency'],
+                mode='markers',
+                marker=dict(
+                    size=np.maximum(data['Frequency'] * 10, 5),   # Scale marker size
+                    color=color,
+                    opacity=0.6
+                ),
+                hoverinfo='text',
+                text=[
+                    f"Position: {row['Position']}<br>"
+                    f"Mutation Type: {row['Mutation Type']}<br>"
+                    f"Frequency: {row['Frequency']}<br>"
+                    f"Mild Frequency: {row['Mild Frequency']}<br>"
+                    f"Moderate Frequency: {row['Moderate Frequency']}<br>"
+                    f"Severe Frequency: {row['Severe Frequency']}"
+                    for index, row in data.iterrows()
+                ],
+                name=data['Mutation Type'].iloc[0]  
+            )
+        ]
+
+    # Initialize figure
+    fig = go.Figure()
+
+    # Add traces for each mutation type
+    for mt, color in zip(mutation_types, colors):
+        traces = create_figure(filtered_dataframes[mt], color)
+        for trace in traces:
+            fig.add_trace(trace)
+
+
+    gene_bar_height = 0.04 * max(df['Frequency'])  # Adjust height relative to max Frequency
+
+    for gene in gene_ranges:
+        fig.add_shape(
+            type='rect',
+            x0=gene['start'], x1=gene['end'],
+            y0=-gene_bar_height, y1=0,  # Extend the height downwards
+            fillcolor=gene['color'], opacity=0.5,  # Increase opacity for better visibility
+            layer='below', line_width=0
+        )
+        fig.add_annotation(
+            x=(gene['start'] + gene['end']) / 2,
+            y=-1.5 * gene_bar_height,  # Move labels slightly lower
+            text=gene['gene'],
+            showarrow=False,
+            font=dict(size=14, color='black', family="Arial Bold"),  # Larger & bolder text
+            textangle=0,  # Keep horizontal for better readability
+            align='center'
+        )
     
-# Create dropdown buttons
-dropdown_buttons = [
-    {'label': 'All Mutation Types', 'method': 'update',
-     'args': [{'visible': [True] * (2 * len(mutation_types))},
-              {'title': 'All Mutation Types'}]}
-]
+    # Create dropdown buttons
+    dropdown_buttons = [
+        {'label': 'All Mutation Types', 'method': 'update',
+         'args': [{'visible': [True] * (2 * len(mutation_types))},
+                  {'title': 'All Mutation Types'}]}
+    ]
 
-for i, mt in enumerate(mutation_types):
-    visibility = [False] * (2 * len(mutation_types))
-    visibility[2 * i] = True
-    visibility[2 * i + 1] = True
+    for i, mt in enumerate(mutation_types):
+        visibility = [False] * (2 * len(mutation_types))
+        visibility[2 * i] = True
+        visibility[2 * i + 1] = True
+        dropdown_buttons.append({
+            'label': mt,
+            'method': 'update',
+            'args': [{'visible': visibility},
+                     {'title': mt}]
+        })
+
+    # Reset button
     dropdown_buttons.append({
-        'label': mt,
+        'label': 'Reset Filter',
         'method': 'update',
-        'args': [{'visible': visibility},
-                 {'title': mt}]
+        'args': [{'visible': [True] * (2 * len(mutation_types))},
+                 {'title': 'Reset Filter'}]
     })
 
-# Reset button
-dropdown_buttons.append({
-    'label': 'Reset Filter',
-    'method': 'update',
-    'args': [{'visible': [True] * (2 * len(mutation_types))},
-             {'title': 'Reset Filter'}]
-})
-
-# Update figure layout
-fig.update_layout(
-    updatemenus=[{
-        'buttons': dropdown_buttons,
-        'direction': 'up',
-        'showactive': True,
-        'x': 0.9,
-        'xanchor': 'right',
-        'y': -0.2,
-        'yanchor': 'bottom',
-    }],
-    legend=dict(
-        orientation="h",
-        x=0, y=-0.3,
-        title="Mutation Type",
-        traceorder="normal",
-        itemsizing="constant",
-        font=dict(size=14),
-    ),
-    margin=dict(l=40, r=40, t=40, b=150),
-    height=600,
-    plot_bgcolor='white',
-    xaxis=dict(title='Position', showgrid=False),
-    yaxis=dict(title='Mutation Frequency', showgrid=False),
-    title='Dengue Virus Mutation Frequency'
-)
+    # Update figure layout
+    fig.update_layout(
+        updatemenus=[{
+            'buttons': dropdown_buttons,
+            'direction': 'up',
+            'showactive': True,
+            'x': 0.9,
+            'xanchor': 'right',
+            'y': -0.2,
+            'yanchor': 'bottom',
+        }],
+        legend=dict(
+            orientation="h",
+            x=0, y=-0.3,
+            title="Mutation Type",
+            traceorder="normal",
+            itemsizing="constant",
+            font=dict(size=14),
+        ),
+        margin=dict(l=40, r=40, t=40, b=150),
+        height=600,
+        plot_bgcolor='white',
+        xaxis=dict(title='Position', showgrid=False),
+        yaxis=dict(title='Mutation Frequency', showgrid=False),
+        title='Dengue Virus Mutation Frequency'
+    )
+
+    return fig
+
 
 # Display in Streamlit
-st.plotly_chart(fig, use_container_width=True)
-
-st.markdown('#### Mutations List')
-
-# Sidebar selection for Mutation Type
-mutation_types = df_selected_year["Mutation Type"].unique()
-selected_mutation_type = st.selectbox("Select Mutation Type", ["All"] + list(mutation_types))
-
-# Sidebar slider for Mutation Position
-min_pos, max_pos = df_selected_year["Position"].min(), df_selected_year["Position"].max()
-selected_position = st.slider("Select Position Range", int(min_pos), int(max_pos), (int(min_pos), int(max_pos)))
-
-# Filter DataFrame based on selection
-filtered_df = df_selected_year.copy()
-
-if selected_mutation_type != "All":
-    filtered_df = filtered_df[filtered_df["Mutation Type"] == selected_mutation_type]
-
-filtered_df = filtered_df[(filtered_df["Position"] >= selected_position[0]) & 
-                          (filtered_df["Position"] <= selected_position[1])]
-
-# Display the filtered dataframe with selected columns
-st.dataframe(
-    filtered_df,  # Ensure correct column selection
-    hide_index=True,
-    width=None,
-    column_config={
-        "Position": st.column_config.TextColumn("Position"),
-        "Frequency": st.column_config.ProgressColumn("Frequency", format="%.6f"),
-        "Mild Frequency": st.column_config.ProgressColumn("Mild Frequency", format="%.6f"),
-        "Moderate Frequency": st.column_config.ProgressColumn("Moderate Frequency", format="%.6f"),
-        "Severe Frequency": st.column_config.ProgressColumn("Severe Frequency", format="%.6f"),
-        "Year": st.column_config.TextColumn("Year"),
-        "Annotation": st.column_config.TextColumn("Annotation"),
-        "Gene": st.column_config.TextColumn("Gene")
-    }
-)
+st.plotly_chart(load_lollipop_figure(), use_container_width=True)
+
+# Genetic diversity along the genome, averaged over sliding windows. This and
+# the sections below are fragments: their controls rerun only their own section
+@st.fragment
+def diversity_tracks(selected_year):
+    st.markdown('#### Genetic Diversity')
+    diversity_data = diversity.load_diversity()
+
+    d1, d2, d3, d4, d5 = st.columns(5)
+    with d1:
+        diversity_metric = st.radio("Metric", ["Shannon entropy", "Nucleotide diversity (π)"])
+    with d2:
+        diversity_years = st.multiselect("Years", diversity_data["years"].tolist(), default=[selected_year])
+    with d3:
+        diversity_classes = st.multiselect("Severity", diversity_data["classes"], default=["All"])
+    with d4:
+        window_width = st.select_slider("Window width (nt)", options=[1, 25, 50, 100, 200, 500, 1000], value=100)
+    with d5:
+        window_step = st.select_slider("Step (nt)", options=[1, 10, 25, 50, 100, 250], value=25)
+
+    metric_key = "entropy" if diversity_metric == "Shannon entropy" else "pi"
+    window_x, window_y = diversity.window_means(diversity_data[f"{metric_key}_cumsum"], window_width, window_step)
+
+    fig_diversity = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.12, 0.88], vertical_spacing=0.02)
+    for gene in gene_ranges:
+        fig_diversity.add_shape(
+            type='rect', x0=gene['start'], x1=gene['end'], y0=0, y1=1,
+            fillcolor=gene['color'], opacity=0.5, line_width=0, row=1, col=1,
+        )
+        fig_diversity.add_annotation(
+            x=(gene['start'] + gene['end']) / 2, y=0.5, text=gene['gene'], showarrow=False,
+            font=dict(size=12, color='black'), row=1, col=1,
+        )
+
+    class_colors = dict(zip(diversity_data["classes"], ["black", "#32CD32", "#FFA500", "#DC143C"]))
+    year_dashes = ["solid", "dash", "dot", "dashdot"]
+    for year in diversity_years:
+        y_index = diversity_data["years"].tolist().index(year)
+        for severity in diversity_classes:
+            c_index = diversity_data["classes"].index(severity)
+            fig_diversity.add_trace(go.Scattergl(
+                x=window_x,
+                y=window_y[y_index, c_index],
+                mode='lines',
+                line=dict(color=class_colors[severity], dash=year_dashes[y_index % len(year_dashes)], width=1.5),
+                name=f"{year} {severity} (n={diversity_data['sizes'][y_index, c_index]})",
+            ), row=2, col=1)
+
+    fig_diversity.update_layout(
+        height=500,
+        plot_bgcolor='white',
+        title=f"{diversity_metric} ({window_width} nt windows, step {window_step})",
+        legend=dict(orientation="h", x=0, y=-0.15),
+        margin=dict(l=40, r=40, t=60, b=40),
+    )
+    fig_diversity.update_yaxes(visible=False, range=[0, 1], row=1, col=1)
+    fig_diversity.update_yaxes(title=diversity_metric, showgrid=False, row=2, col=1)
+    fig_diversity.update_xaxes(showgrid=False)
+    fig_diversity.update_xaxes(title='Position', row=2, col=1)
+    st.plotly_chart(fig_diversity, use_container_width=True)
+
+
+diversity_tracks(selected_year)
+
+# Mutations of the selected year, filtered by type and position
+@st.fragment
+def mutations_list(df_selected_year, selected_year):
+    st.markdown('#### Mutations List')
+
+    # Sidebar selection for Mutation Type
+    mutation_types = df_selected_year["Mutation Type"].unique()
+    selected_mutation_type = st.selectbox("Select Mutation Type", ["All"] + list(mutation_types))
+
+    # Sidebar slider for Mutation Position
+    min_pos, max_pos = df_selected_year["Position"].min(), df_selected_year["Position"].max()
+    selected_position = st.slider("Select Position Range", int(min_pos), int(max_pos), (int(min_pos), int(max_pos)))
+
+    # Filter DataFrame based on selection
+    filtered_df = df_selected_year
+
+    if selected_mutation_type != "All":
+        filtered_df = filtered_df[filtered_df["Mutation Type"] == selected_mutation_type]
+
+    filtered_df = filtered_df[(filtered_df["Position"] >= selected_position[0]) & 
+                              (filtered_df["Position"] <= selected_position[1])]
+
+    # Display the filtered dataframe with selected columns
+    st.dataframe(
+        filtered_df,  # Ensure correct column selection
+        hide_index=True,
+        width=None,
+        column_config={
+            "Position": st.column_config.TextColumn("Position"),
+            "Frequency": st.column_config.ProgressColumn("Frequency", format="%.6f"),
+            "Mild Frequency": st.column_config.ProgressColumn("Mild Frequency", format="%.6f"),
+            "Moderate Frequency": st.column_config.ProgressColumn("Moderate Frequency", format="%.6f"),
+            "Severe Frequency": st.column_config.ProgressColumn("Severe Frequency", format="%.6f"),
+            "Year": st.column_config.TextColumn("Year"),
+            "Annotation": st.column_config.TextColumn("Annotation"),
+            "Gene": st.column_config.TextColumn("Gene")
+        }
+    )
+
+    # Download the same rows, written in chunks from the shared table
+    export.export_controls(
+        "mutations",
+        [
+            ("Year", "in", [selected_year]),
+            ("Mutation Type", "in", [] if selected_mutation_type == "All" else [selected_mutation_type]),
+            ("Position", "between", selected_position),
+        ],
+        list(df_selected_year.columns),
+        key="mutations_export",
+    )
+
+
+mutations_list(df_selected_year, selected_year)
+
+# Severity association statistics, precomputed for every mutation and year
+@st.fragment
+def severity_association_explorer():
+    st.markdown('#### Severity Association')
+    st.markdown(
+        """
+        Chi-square test of independence between carrying a mutation and disease severity (Mild / Moderate / Severe),
+        with Benjamini-Hochberg FDR correction within each year. A positive log2 odds ratio means the mutation is
+        more common in severe than in mild cases. Carriers are counted from the frequencies and the number of
+        genomes in each class the table was computed over (below); classes without genomes in a year are left out
+        of that year's test.
+        Rows with low expected cells (expected count below 5) have less reliable p-values.
+        """
+    )
+    assoc = mutations.load_association()
+    class_sizes, mismatches = mutations.load_group_sizes()
+    st.caption("Genomes per class in the mutation table: " + "; ".join(
+        f"{year}: " + ", ".join(f"{label} {row[col]}" for label, col in mutations.SEVERITY_FREQUENCIES.items())
+        for year, row in class_sizes.iterrows()
+    ))
+    if len(mismatches):
+        st.warning(
+            "The mutation table's class sizes differ from the sequenced genomes in the demographics table ("
+            + "; ".join(f"{r.Year} {r.Class}: {r.Table} vs {r.Demographics}" for r in mismatches.itertuples())
+            + "). The statistics use the table's own sizes."
+        )
+
+    f1, f2, f3, f4 = st.columns(4)
+    with f1:
+        assoc_year = st.selectbox("Year", ["All"] + sorted(assoc["Year"].unique().tolist()), key="assoc_year")
+    with f2:
+        assoc_genes = st.multiselect("Gene", sorted(assoc["Gene"].dropna().unique().tolist()), key="assoc_genes")
+    with f3:
+        max_q = st.select_slider("Maximum q-value", options=[0.01, 0.05, 0.1, 0.25, 0.5, 1.0], value=1.0)
+    with f4:
+        direction = st.selectbox("Direction", ["All", "Enriched in severe", "Enriched in mild"])
+
+    assoc_view = assoc[assoc["q-value"] <= max_q]
+    if assoc_year != "All":
+        assoc_view = assoc_view[assoc_view["Year"] == assoc_year]
+    if assoc_genes:
+        assoc_view = assoc_view[assoc_view["Gene"].isin(assoc_genes)]
+    if direction == "Enriched in severe":
+        assoc_view = assoc_view[assoc_view["log2 OR (Severe vs Mild)"] > 0]
+    elif direction == "Enriched in mild":
+        assoc_view = assoc_view[assoc_view["log2 OR (Severe vs Mild)"] < 0]
+
+    # Manhattan-style plot along the genome
+    fig_manhattan = px.scatter(
+        assoc_view,
+        x="Position",
+        y="-log10 p",
+        color="Gene",
+        symbol="Year" if assoc_year == "All" else None,
+        hover_data=["Mutation", "AA_mut", "q-value", "log2 OR (Severe vs Mild)"],
+        render_mode="webgl",
+        title="Severity Association along the Genome",
+        height=500,
+    )
+    significant = assoc[(assoc["q-value"] <= 0.05) & ((assoc["Year"] == assoc_year) | (assoc_year == "All"))]
+    if len(significant):
+        fig_manhattan.add_hline(
+            y=significant["-log10 p"].min(), line_dash="dash", line_color="crimson",
+            annotation_text="FDR 5%",
+        )
+    fig_manhattan.update_layout(plot_bgcolor="white", xaxis=dict(showgrid=False), yaxis=dict(showgrid=False))
+    st.plotly_chart(fig_manhattan, use_container_width=True)
+
+    st.dataframe(
+        assoc_view.sort_values("p-value"),
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "Position": st.column_config.TextColumn("Position"),
+            "Year": st.column_config.TextColumn("Year"),
+            "Chi-square": st.column_config.NumberColumn("Chi-square", format="%.2f"),
+            "Low Expected Cells": st.column_config.NumberColumn(
+                "Low Expected Cells", help="Cells of the table with an expected count below 5",
+            ),
+            "p-value": st.column_config.NumberColumn("p-value", format="%.2e"),
+            "q-value": st.column_config.NumberColumn("q-value", format="%.3f"),
+            "log2 OR (Severe vs Mild)": st.column_config.NumberColumn("log2 OR (Severe vs Mild)", format="%.2f"),
+            "-log10 p": None,
+        },
+    )
+
+
+severity_association_explorer()
 
 # Footer
-st.markdown(
-    """
-    <hr>
-    <p style='text-align: center;'>
-    © 2024 Rajesh Pandey | Ingen-hope Lab
-    </p>
-    """,
-    unsafe_allow_html=True
-)
+footer()
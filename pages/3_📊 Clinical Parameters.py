@@ -1,69 +1,35 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 
-# Set Streamlit page config
-st.set_page_config(
-    page_title="DENViewer",
-    page_icon="🧫",
-    layout="wide",
-    initial_sidebar_state="auto"
-)
-
-# Add Sidebar Content
-st.sidebar.image("pages/images/lab_logo.png", use_container_width=True)
-st.sidebar.markdown('<p class="sidebar-title">DENViewer</p>', unsafe_allow_html=True)
-st.sidebar.markdown("---")
-st.sidebar.markdown(
-    """
-    <style>
-        .sidebar-title {
-            font-size: 24px;
-            font-weight: bold;
-            text-align: center;
-            color: "white";
-            margin-bottom: 10px;
-        }
-        .sidebar-logo {
-            display: block;
-            margin: 0 auto;
-            width: 150px;  /* Adjust size as needed */
-            border-radius: 10px;
-        }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
-
-
-
-# Custom CSS to expand content area
-st.markdown(
-    """
-    <style>
-    .block-container {
-        max-width: 95%;
-        padding-left: 2rem;
-        padding-right: 2rem;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
-
-# Load Data
-data_file = "pages/files/all_demographics.csv"  # Update the path if needed
-df = pd.read_csv(data_file)
+from denviewer import data, export, refresh, serotypes
+from denviewer.layout import setup_page, footer
 
-df = df.dropna(subset=["Severity", "Age"])
+# Set Streamlit page config, sidebar logo and styling
+setup_page()
 
 # Define severity order (Severe → Mild → Moderate)
 severity_order = ["Severe", "Mild", "Moderate"]
-df["Severity"] = pd.Categorical(df["Severity"], categories=severity_order, ordered=True)
 
-# Convert categorical columns to strings
+# Columns offered as categories in the selectors
 categorical_cols = ["Age","Gender", "Severity","Collection_date"]  # Adjust if needed
-df[categorical_cols] = df[categorical_cols].astype(str)
+
+
+@refresh.cached
+def load_clinical_view():
+    # Patients with a recorded severity and age, with the categorical columns as
+    # plain string labels for plotly. Built once per data generation, shared by all sessions.
+    df = data.load_demographics().dropna(subset=["Severity", "Age"])
+    return df.assign(
+        Age=df["Age"].astype("Int16").astype(str),
+        Gender=df["Gender"].astype(str),
+        Severity=df["Severity"].astype(str),
+        Collection_date=df["Collection_date"].astype(str),
+    )
+
+
+# Load Data
+df = load_clinical_view()
 
 # Streamlit App Layout
 st.title("Clinical Parameters")
@@ -80,59 +46,148 @@ st.markdown(
         """,
         unsafe_allow_html=True
     )
-# Dropdown to Select Plot Type
-plot_type = st.selectbox(
-    "Select Plot Type", 
-    ["Sunburst Chart","Bar Plot","Boxplot", "Histogram", "Pie Chart" ]
-)
-
-# Dropdown to Select X-axis (only for relevant plots)
-if plot_type not in ["Pie Chart", "Sunburst Chart"]:
-    x_axis = st.selectbox("Select X-axis", df.columns)
-else:
-    x_axis = None  # No need for X-axis in Pie/Sunburst
-
-# Dropdown to Select Coloring (Optional)
-color_option = st.selectbox(
-    "Select Column for Coloring (Optional)", 
-    ["Gender"] + categorical_cols
-)
-color_column = None if color_option == "None" else color_option
-
-# Create Plots Based on Selection
-fig = None  # Initialize empty figure
-
-if plot_type == "Bar Plot":
-    df_grouped = df.groupby([x_axis, color_column]).size().reset_index(name="Count")
-    fig = px.bar(df_grouped, x=x_axis, y="Count", color=color_column, category_orders={"Severity": severity_order})
-    fig.update_layout(yaxis_title="Count")
-    fig.update_traces(hovertemplate="%{x}: %{y}")
-
-elif plot_type == "Boxplot":
-    fig = px.box(df, x=x_axis, y="Age", color=color_column, category_orders={"Severity": severity_order})
-    fig.update_traces(hovertemplate="%{x}: Median=%{y}")
-
-elif plot_type == "Histogram":
-    fig = px.histogram(df, x=x_axis, color=color_column, nbins=20, barmode="overlay", category_orders={"Severity": severity_order})
-    fig.update_traces(hovertemplate="%{x}: Count=%{y}")
-
-elif plot_type == "Pie Chart":
-    category_column = st.selectbox("Select Column for Pie Chart", categorical_cols)
-    fig = px.pie(df, names=category_column, title=f"Distribution of {category_column}", color=category_column)
-    fig.update_traces(hovertemplate="<b>%{label}</b>: %{percent:.1%}")
-
-elif plot_type == "Sunburst Chart":
-    path_columns = st.multiselect("Select Hierarchy for Sunburst", categorical_cols, default=["Severity", "Gender"])
-    if len(path_columns) > 0:
-        fig = px.sunburst(df, path=path_columns, title="Sunburst Chart of Selected Categories", color=path_columns[-1])
-        fig.update_traces(hovertemplate="<b>%{label}</b>: %{percentRoot:.1%} of Total")
-
-# Fix Y-axis for Age
-if fig and x_axis == "Age":
-    fig.update_layout(yaxis=dict(range=[0, 70]))
-
-if fig:
-    st.plotly_chart(fig, use_container_width=True)
+# The plot selectors and their chart form one fragment, so changing a
+# selector reruns only the chart and not the co-infection section below
+@st.fragment
+def clinical_plot_explorer(df):
+    # Dropdown to Select Plot Type
+    plot_type = st.selectbox(
+        "Select Plot Type", 
+        ["Sunburst Chart","Bar Plot","Boxplot", "Histogram", "Pie Chart" ]
+    )
+
+    # Dropdown to Select X-axis (only for relevant plots)
+    if plot_type not in ["Pie Chart", "Sunburst Chart"]:
+        x_axis = st.selectbox("Select X-axis", df.columns)
+    else:
+        x_axis = None  # No need for X-axis in Pie/Sunburst
+
+    # Dropdown to Select Coloring (Optional)
+    color_option = st.selectbox(
+        "Select Column for Coloring (Optional)", 
+        ["Gender"] + categorical_cols
+    )
+    color_column = None if color_option == "None" else color_option
+
+    # Create Plots Based on Selection
+    fig = None  # Initialize empty figure
+
+    if plot_type == "Bar Plot":
+        df_grouped = df.groupby([x_axis, color_column]).size().reset_index(name="Count")
+        fig = px.bar(df_grouped, x=x_axis, y="Count", color=color_column, category_orders={"Severity": severity_order})
+        fig.update_layout(yaxis_title="Count")
+        fig.update_traces(hovertemplate="%{x}: %{y}")
+
+    elif plot_type == "Boxplot":
+        fig = px.box(df, x=x_axis, y="Age", color=color_column, category_orders={"Severity": severity_order})
+        fig.update_traces(hovertemplate="%{x}: Median=%{y}")
+
+    elif plot_type == "Histogram":
+        fig = px.histogram(df, x=x_axis, color=color_column, nbins=20, barmode="overlay", category_orders={"Severity": severity_order})
+        fig.update_traces(hovertemplate="%{x}: Count=%{y}")
+
+    elif plot_type == "Pie Chart":
+        category_column = st.selectbox("Select Column for Pie Chart", categorical_cols)
+        fig = px.pie(df, names=category_column, title=f"Distribution of {category_column}", color=category_column)
+        fig.update_traces(hovertemplate="<b>%{label}</b>: %{percent:.1%}")
+
+    elif plot_type == "Sunburst Chart":
+        path_columns = st.multiselect("Select Hierarchy for Sunburst", categorical_cols, default=["Severity", "Gender"])
+        if len(path_columns) > 0:
+            fig = px.sunburst(df, path=path_columns, title="Sunburst Chart of Selected Categories", color=path_columns[-1])
+            fig.update_traces(hovertemplate="<b>%{label}</b>: %{percentRoot:.1%} of Total")
+
+    # Fix Y-axis for Age
+    if fig and x_axis == "Age":
+        fig.update_layout(yaxis=dict(range=[0, 70]))
+
+    if fig:
+        st.plotly_chart(fig, use_container_width=True)
+
+
+clinical_plot_explorer(df)
+
+
+# Patient cohort picked by severity, gender and age, downloadable with any of
+# the clinical columns
+@st.fragment
+def cohort_download():
+    st.markdown("#### Download Cohort")
+    demographics = data.load_demographics()
+
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        cohort_severity = st.multiselect("Severity", data.SEVERITY_ORDER, key="cohort_severity")
+    with c2:
+        cohort_gender = st.multiselect("Gender", data.GENDER_ORDER, key="cohort_gender")
+    with c3:
+        max_age = int(demographics["Age"].max())
+        cohort_age = st.slider("Age", 0, max_age, (0, max_age), key="cohort_age")
+
+    # Empty selections mean every value; the full age range keeps patients without an age
+    filters = [("Severity", "in", cohort_severity), ("Gender", "in", cohort_gender)]
+    if cohort_age != (0, max_age):
+        filters.append(("Age", "between", cohort_age))
+    st.caption(f"{len(export.filter_rows(demographics, filters))} patients selected")
+    export.export_controls("clinical", filters, list(demographics.columns), key="cohort_export")
+
+
+cohort_download()
+
+# Serotype co-infection, from the putative serotypes and per-serotype Ct values
+st.markdown("#### Serotype Co-infection")
+coinfection = serotypes.coinfection_summary()
+
+tab_counts, tab_ct, tab_severity = st.tabs(["Combinations", "Ct Values", "Severity"])
+
+with tab_counts:
+    combos = coinfection["combinations"]
+    fig_combos = px.bar(
+        combos, x="Combination", y="Samples", color="Serotypes",
+        hover_data={"Share (%)": ":.1f"},
+        title="Samples per Serotype Combination",
+    )
+    fig_combos.update_layout(coloraxis_showscale=False, xaxis_title=None)
+    st.plotly_chart(fig_combos, use_container_width=True)
+
+with tab_ct:
+    # Boxes are drawn from precomputed quartiles, one trace per serotype
+    ct_stats = coinfection["ct"]
+    fig_ct = go.Figure()
+    for serotype, group in ct_stats.groupby("Serotype"):
+        fig_ct.add_trace(go.Box(
+            name=serotype,
+            x=group["Combination"].astype(str),
+            q1=group["q1"], median=group["median"], q3=group["q3"],
+            lowerfence=group["lowerfence"], upperfence=group["upperfence"],
+            customdata=group[["n"]],
+            hovertemplate="%{x}<br>Median Ct: %{median:.1f}<br>n=%{customdata[0]}",
+        ))
+    fig_ct.update_layout(boxmode="group", title="Ct Distribution per Combination",
+                         yaxis_title="Ct", legend_title="Serotype")
+    st.plotly_chart(fig_ct, use_container_width=True)
+    st.caption("Lower Ct means higher viral load. Ct values of 0 are treated as not detected.")
+
+with tab_severity:
+    share = coinfection["severity_share"]
+    fig_sev = px.bar(
+        share.reset_index().melt(id_vars="Combination", var_name="Severity", value_name="Share (%)"),
+        x="Combination", y="Share (%)", color="Severity",
+        category_orders={"Severity": severity_order},
+        title="Severity within each Combination",
+    )
+    fig_sev.update_layout(xaxis_title=None)
+    st.plotly_chart(fig_sev, use_container_width=True)
+
+    residuals = coinfection["severity_residuals"]
+    fig_res = px.imshow(
+        residuals.T, text_auto=".2f", aspect="auto",
+        color_continuous_scale="RdBu_r", zmin=-3, zmax=3,
+        labels={"x": "Combination", "y": "Severity", "color": "Residual"},
+        title="Standardized Residuals (positive: more cases than expected under no association)",
+    )
+    st.plotly_chart(fig_res, use_container_width=True)
+    st.dataframe(coinfection["severity_counts"], use_container_width=True)
 
 with st.expander('About', expanded=True):
     st.write('''
@@ -144,12 +199,4 @@ with st.expander('About', expanded=True):
     ''')
 
 # Footer
-st.markdown(
-    """
-    <hr>
-    <p style='text-align: center;'>
-    © 2024 Rajesh Pandey | Ingen-hope Lab
-    </p>
-    """,
-    unsafe_allow_html=True
-)
+footer()
@@ -1,65 +1,13 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-from ete3 import Tree
 import plotly.graph_objects as go
 
-# Set Streamlit page config
-st.set_page_config(
-    page_title="DENViewer ", #Decoding 
-    page_icon="🧫",
-    layout="wide",
-    initial_sidebar_state="auto",
-    menu_items={
-        "Get Help": None,
-        "Report a bug": None,
-        "About": None,
-    }    
-)
-
-# Add logo (replace with your image path)
-st.sidebar.image("pages/images/lab_logo.png", use_container_width=True)
-# Add Dashboard Name
-st.sidebar.markdown('<p class="sidebar-title">DENViewer</p>', unsafe_allow_html=True)
+from denviewer import clock, clusters, phylo, tipsearch
+from denviewer.layout import setup_page, footer
 
-
-# Sidebar customization
-st.sidebar.markdown(
-    """
-    <style>
-        .sidebar-title {
-            font-size: 24px;
-            font-weight: bold;
-            text-align: center;
-            color: "white";
-            margin-bottom: 10px;
-        }
-        .sidebar-logo {
-            display: block;
-            margin: 0 auto;
-            width: 150px;  /* Adjust size as needed */
-            border-radius: 10px;
-        }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
-# Optional: Add a separator for aesthetics
-st.sidebar.markdown("---")
-
-
-# Custom CSS to expand content area
-st.markdown(
-    """
-    <style>
-    .block-container {
-        max-width: 95%;
-        padding-left: 2rem;
-        padding-right: 2rem;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
+# Set Streamlit page config, sidebar logo and styling
+setup_page(hide_menu=True)
 
 st.title("Phylogenetic Tree")
 
@@ -79,88 +27,144 @@ color_palette = [
 ]
 category_colors = {value: color_palette[i % len(color_palette)] for i, value in enumerate(unique_values)}
 
-# Load the Newick tree
+# Load the Newick tree as flat arrays, parsed and laid out once per process
 tree_file = "pages/files/tree.nwk"
-tree = Tree(tree_file, format=1)
+tree = phylo.load_tree(tree_file)
+x_positions, y_positions = phylo.load_layout(tree_file)
 
-# Assign positions for a rectangular layout
-y_positions = {}
-x_positions = {}
-y_offset = 0
+# Horizontal scale: topological depth, divergence, or calendar time under the
+# strict clock fitted in the temporal signal section below
+x_scales = {
+    "Tree depth": "Tree Depth (Evolutionary Distance)",
+    "Divergence": "Divergence from Root (substitutions/site)",
+    "Time (strict clock)": "Estimated Date",
+}
+time_x = clock.load_time_scaled_x(tree_file)
+x_scale = st.radio(
+    "Tree x-axis",
+    list(x_scales) if time_x is not None else list(x_scales)[:2],
+    horizontal=True,
+)
+if x_scale == "Divergence":
+    x_positions = tree.dist
+elif x_scale == "Time (strict clock)":
+    x_positions = time_x
 
+# Tip search: find samples by name or metadata and focus the tree on them
+search_index = tipsearch.load_search_index(tree_file)
+search_col, pick_col = st.columns((1.5, 3))
+with search_col:
+    query = st.text_input("Search tips", placeholder="Sample name, severity, month (2023-08) or serotype")
+hits = tipsearch.search(search_index, query) if query else []
+with pick_col:
+    # The options change with every query, which resets the widget, so the
+    # picked tips are kept in session state and always offered (while they are
+    # still in the tree after a data refresh)
+    picked = [i for i in st.session_state.get("picked_tips", []) if i < len(search_index["labels"])]
+    selected_tips = st.multiselect(
+        "Matching samples",
+        list(dict.fromkeys([*picked, *hits])),
+        default=picked,
+        format_func=lambda i: search_index["labels"][i],
+        key="tip_picker",
+        help=f"{len(hits)}{'+' if len(hits) == tipsearch.MAX_RESULTS else ''} samples match the search",
+    )
+    st.session_state["picked_tips"] = selected_tips
 
-def assign_positions(node, depth=0):
-    global y_offset
-    if node.is_leaf():
-        y_positions[node] = y_offset
-        x_positions[node] = depth
-        y_offset += 1
+shown_root = 0  # whole tree
+highlight_nodes = []
+if selected_tips:
+    selected_nodes = tree.tips[selected_tips]
+    view_col, level_col = st.columns((3, 1.5))
+    with view_col:
+        view_mode = st.radio("View", ["Zoom to enclosing subtree", "Highlight path to root"], horizontal=True)
+    if view_mode == "Zoom to enclosing subtree":
+        with level_col:
+            levels_up = st.number_input(
+                "Levels above common ancestor", min_value=0, max_value=int(tree.level.max()),
+                value=1 if len(selected_nodes) == 1 else 0,
+            )
+        shown_root = tree.mrca(selected_nodes)
+        for _ in range(levels_up):
+            if tree.parent[shown_root] < 0:
+                break
+            shown_root = int(tree.parent[shown_root])
     else:
-        child_positions = []
-        for child in node.children:
-            assign_positions(child, depth + 1)
-            child_positions.append(y_positions[child])
-        y_positions[node] = sum(child_positions) / len(child_positions)
-        x_positions[node] = depth
+        highlight_nodes = np.unique(np.concatenate([tree.path_to_root(v) for v in selected_nodes]))
 
-assign_positions(tree)
+# Nodes below shown_root form one preorder range, so the subtree is a slice
+shown_nodes = tree.subtree(shown_root)[1:]
+tip_lo, tip_hi = tree.tip_start[shown_root], tree.tip_end[shown_root]
 
 # Create the figure
 fig = go.Figure()
 
-# Add tree branches
-for node in tree.traverse():
-    if not node.is_root():
-        parent = node.up
-        if parent in x_positions and node in x_positions:
-            fig.add_trace(go.Scatter(
-                x=[x_positions[parent], x_positions[parent]],
-                y=[y_positions[parent], y_positions[node]],
-                mode="lines",
-                line=dict(color="black", width=1),
-                showlegend=False
-            ))
-            fig.add_trace(go.Scatter(
-                x=[x_positions[parent], x_positions[node]],
-                y=[y_positions[node], y_positions[node]],
-                mode="lines",
-                line=dict(color="black", width=1),
-                showlegend=False
-            ))
-
-# Add tree leaves with dynamic colors
-legend_traces = {}
-for leaf in tree.iter_leaves():
-    matched_rows = metadata.loc[metadata["IGIB_id"] == leaf.name, selected_column]
-    if not matched_rows.empty:
-        category = matched_rows.values[0]
-        color = category_colors.get(category, "black")
-        tooltip_text = f"{leaf.name}<br>{selected_column}: {category}"
-    else:
-        continue
-
-    trace = go.Scatter(
-    x=[x_positions[leaf]],
-    y=[y_positions[leaf]],
-    mode="markers",
-    marker=dict(color=color, size=10),
-    text=tooltip_text,
-    hoverinfo="text",
-    name=str(category) if category not in legend_traces else None,  # Convert to string
-    showlegend=category not in legend_traces
+# Add tree branches as a single line trace
+edge_x, edge_y = phylo.edge_segments(tree, x_positions, y_positions, shown_nodes)
+fig.add_trace(go.Scatter(
+    x=edge_x,
+    y=edge_y,
+    mode="lines",
+    line=dict(color="black", width=1),
+    hoverinfo="skip",
+    showlegend=False
+))
+
+if len(highlight_nodes):
+    path_x, path_y = phylo.edge_segments(tree, x_positions, y_positions, highlight_nodes)
+    fig.add_trace(go.Scatter(
+        x=path_x,
+        y=path_y,
+        mode="lines",
+        line=dict(color="crimson", width=3),
+        hoverinfo="skip",
+        name="Path to root",
+    ))
+
+# Add tree leaves with dynamic colors, one trace per category
+leaves = pd.DataFrame({
+    "IGIB_id": tree.names[tree.tips[tip_lo:tip_hi]],
+    "x": x_positions[tree.tips[tip_lo:tip_hi]],
+    "y": y_positions[tree.tips[tip_lo:tip_hi]],
+})
+# Colouring by the id column itself must not select it twice
+leaves = leaves.merge(
+    metadata.drop_duplicates("IGIB_id")[list(dict.fromkeys(["IGIB_id", selected_column]))],
+    on="IGIB_id",
+    how="inner",
 )
+for category, group in leaves.groupby(selected_column, sort=False, dropna=False):
+    fig.add_trace(go.Scatter(
+        x=group["x"],
+        y=group["y"],
+        mode="markers",
+        marker=dict(color=category_colors.get(category, "black"), size=10),
+        text=group["IGIB_id"] + f"<br>{selected_column}: " + group[selected_column].astype(str),
+        hoverinfo="text",
+        name=str(category),  # Convert to string
+    ))
 
-    fig.add_trace(trace)
-    legend_traces[category] = trace
+if selected_tips:
+    selected_nodes = tree.tips[selected_tips]
+    fig.add_trace(go.Scatter(
+        x=x_positions[selected_nodes],
+        y=y_positions[selected_nodes],
+        mode="markers+text",
+        marker=dict(symbol="star", color="gold", size=18, line=dict(color="black", width=1)),
+        text=tree.names[selected_nodes],
+        textposition="middle right",
+        hoverinfo="text",
+        name="Selected",
+    ))
 
 # Update layout with larger size
 fig.update_layout(
     showlegend=True,
     legend_title=selected_column,
-    xaxis=dict(title="Tree Depth (Evolutionary Distance)", zeroline=False),
+    xaxis=dict(title=x_scales[x_scale], zeroline=False),
     yaxis=dict(title="Leaf Nodes", showticklabels=False, zeroline=False),
     width=1500,
-    height=900,
+    height=900 if shown_root == 0 else int(np.clip(20 * (tip_hi - tip_lo), 400, 900)),
     margin=dict(l=20, r=20, t=60, b=20)
 )
 
@@ -169,13 +173,110 @@ fig.update_layout(
 with st.container():
     st.plotly_chart(fig, use_container_width=True)
 
-# Footer
+# Root-to-tip regression against sampling date
+st.markdown("### Temporal Signal")
+clock_table, clock_fit = clock.load_clock(tree_file)
+if clock_fit is None:
+    st.info("Not enough dated tips to test for a molecular clock signal.")
+else:
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Rate (subs/site/year)", f"{clock_fit['rate']:.2e}")
+    c2.metric("Root Date", f"{clock_fit['root_date']:.1f}")
+    c3.metric("R²", f"{clock_fit['r2']:.3f}")
+    c4.metric("Outlier Tips", int(clock_fit["outlier"].sum()))
+
+    dated = clock_table.dropna(subset=["Date"])
+    fig_clock = go.Figure()
+    for is_outlier, group in dated.groupby("Outlier"):
+        fig_clock.add_trace(go.Scatter(
+            x=group["Date"],
+            y=group["Distance"],
+            mode="markers",
+            marker=dict(color="crimson" if is_outlier else "steelblue", size=6, opacity=0.7),
+            text=group["strain"] + "<br>" + group["Collection_date"],
+            hoverinfo="text",
+            name="Outlier" if is_outlier else "Tip",
+        ))
+    line_x = np.array([dated["Date"].min(), dated["Date"].max()])
+    fig_clock.add_trace(go.Scatter(
+        x=line_x,
+        y=clock_fit["rate"] * line_x + clock_fit["intercept"],
+        mode="lines",
+        line=dict(color="black", dash="dash"),
+        name="Regression",
+    ))
+    fig_clock.update_layout(
+        title="Root-to-tip Divergence vs Sampling Date",
+        xaxis_title="Sampling Date",
+        yaxis_title="Root-to-tip Distance (substitutions/site)",
+        height=500,
+    )
+    st.plotly_chart(fig_clock, use_container_width=True)
+
+    outliers = clock_table[clock_table["Outlier"]]
+    if len(outliers):
+        with st.expander(f"Outlier tips ({len(outliers)})"):
+            st.dataframe(
+                outliers[["strain", "Collection_date", "Severity", "Distance", "Residual"]],
+                hide_index=True,
+                use_container_width=True,
+            )
+
+# Transmission clusters from branch lengths
+st.markdown("### Putative Transmission Clusters")
 st.markdown(
     """
-    <hr>
-    <p style='text-align: center;'>
-    © 2024 Rajesh Pandey | Ingen-hope Lab
-    </p>
-    """,
-    unsafe_allow_html=True
+    A cluster is the largest clade whose tips are all within the chosen patristic distance (substitutions per site)
+    of each other. Support values are read from numeric internal node labels; nodes without one are not filtered.
+    """
 )
+
+ctrl1, ctrl2, ctrl3 = st.columns(3)
+with ctrl1:
+    max_distance = st.select_slider(
+        "Maximum patristic distance",
+        options=[0.0005, 0.001, 0.0015, 0.002, 0.003, 0.005, 0.01],
+        value=0.0015,
+    )
+with ctrl2:
+    min_support = st.number_input("Minimum support", min_value=0.0, max_value=100.0, value=0.0, step=5.0)
+with ctrl3:
+    min_size = st.number_input("Minimum cluster size", min_value=2, max_value=50, value=3)
+
+cluster_result = clusters.load_clusters(max_distance, min_support or None, int(min_size), tree_file)
+cluster_table = cluster_result["table"]
+
+m1, m2 = st.columns(2)
+m1.metric("Clusters", len(cluster_table))
+m2.metric("Clustered Samples", f"{int(cluster_table['Tips'].sum())} of {len(tree.tips)}")
+
+if len(cluster_table):
+    st.dataframe(
+        cluster_table,
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "Max Distance": st.column_config.NumberColumn("Max Distance", format="%.5f"),
+            "First Sample": st.column_config.TextColumn("First Sample"),
+            "Last Sample": st.column_config.TextColumn("Last Sample"),
+        },
+    )
+
+    by_month = cluster_result["by_month"]
+    fig_months = go.Figure(go.Heatmap(
+        z=by_month.to_numpy(),
+        x=by_month.columns.astype(str),
+        y=by_month.index.astype(str),
+        colorscale="Blues",
+        hovertemplate="Cluster %{y}<br>%{x}: %{z} samples<extra></extra>",
+    ))
+    fig_months.update_layout(
+        title="Clustered Samples by Collection Month",
+        xaxis_title="Collection Month",
+        yaxis=dict(title="Cluster", autorange="reversed"),
+        height=max(400, 12 * len(by_month)),
+    )
+    st.plotly_chart(fig_months, use_container_width=True)
+
+# Footer
+footer()
@@ -0,0 +1,74 @@
+import streamlit as st
+import plotly.express as px
+
+from denviewer import catalogue
+from denviewer.layout import setup_page, footer
+
+# Set Streamlit page config, sidebar logo and styling
+setup_page()
+
+st.title("Dengue Genome Catalogue")
+st.markdown(
+    """
+    Browse complete dengue virus genomes deposited in NCBI between 2013 and 2024. Narrow the catalogue with the
+    filters on the left; the number next to each option shows how many genomes it would match given the other filters.
+    """
+)
+
+df, index = catalogue.load_catalogue()
+
+# Current selections are read before the widgets are drawn so every facet can
+# show counts that reflect the other facets' filters
+selections = {facet: st.session_state.get(f"facet_{facet}", []) for facet in catalogue.FACETS}
+counts = catalogue.facet_counts(index, selections)
+
+col1, col2 = st.columns((1.2, 4), gap="medium")
+
+with col1:
+    st.markdown("#### Filters")
+    for facet, entry in index["facets"].items():
+        facet_counts = counts[facet]
+        st.multiselect(
+            facet,
+            entry["values"],
+            key=f"facet_{facet}",
+            format_func=lambda value, c=facet_counts: f"{value} ({c[value]})",
+        )
+
+rows = catalogue.search(index, selections)
+matches = df.iloc[rows]
+
+with col2:
+    st.metric("Matching Genomes", f"{len(matches)} of {len(df)}")
+
+    by_year = matches.groupby(["Year", "Serotype"], observed=True).size().reset_index(name="Genomes")
+    fig = px.bar(
+        by_year, x="Year", y="Genomes", color="Serotype",
+        title="Genomes by Collection Year",
+        category_orders={"Serotype": sorted(index["facets"]["Serotype"]["values"])},
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Accessions link out to their GenBank records
+    table = matches.assign(Accession="https://www.ncbi.nlm.nih.gov/nuccore/" + matches["Accession"])
+    st.dataframe(
+        table[["Accession", "Serotype", "Country", "Geo_Location", "Collection_Date", "Length", "Host", "Release_Date"]],
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "Accession": st.column_config.LinkColumn(
+                "Accession",
+                display_text=r"https://www.ncbi.nlm.nih.gov/nuccore/(.*)",
+            ),
+            "Collection_Date": st.column_config.TextColumn("Collection Date"),
+            "Geo_Location": st.column_config.TextColumn("Location"),
+            "Release_Date": st.column_config.TextColumn("Release Date"),
+        },
+    )
+
+st.write('''
+Data Source: [NCBI Virus](<https://www.ncbi.nlm.nih.gov/labs/virus/vssi/>).
+''')
+
+# Footer
+footer()
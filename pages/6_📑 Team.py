@@ -1,49 +1,11 @@
 import streamlit as st
 from st_social_media_links import SocialMediaIcons
 
-# Set Streamlit page config
-st.set_page_config(
-    page_title="DENViewer ", #Decoding 
-    page_icon="🧫",
-    layout="wide",
-    initial_sidebar_state="auto",
-    menu_items={
-        "Get Help": None,
-        "Report a bug": None,
-        "About": None,
-    }    
-)
-
+from denviewer import assets
+from denviewer.layout import setup_page, footer
 
-# Add logo (replace with your image path)
-st.sidebar.image("pages/images/lab_logo.png", use_container_width=True)
-# Add Dashboard Name
-st.sidebar.markdown('<p class="sidebar-title">DENViewer</p>', unsafe_allow_html=True)
-
-
-# Sidebar customization
-st.sidebar.markdown(
-    """
-    <style>
-        .sidebar-title {
-            font-size: 24px;
-            font-weight: bold;
-            text-align: center;
-            color: "white";
-            margin-bottom: 10px;
-        }
-        .sidebar-logo {
-            display: block;
-            margin: 0 auto;
-            width: 150px;  /* Adjust size as needed */
-            border-radius: 10px;
-        }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
-# Optional: Add a separator for aesthetics
-st.sidebar.markdown("---")
+# Set Streamlit page config, sidebar logo and styling
+setup_page(wide_content=False, hide_menu=True)
 
 # Title for the page
 st.title("About Us")
@@ -114,7 +76,7 @@ for i in range(1):
         # Display Team Lead Separately
             st.markdown('<div class="team-container">', unsafe_allow_html=True)
             # Create a custom HTML to center the image
-            st.image(team_lead["photo"], width=300, output_format="PNG")
+            st.image(assets.image(team_lead["photo"]), width=assets.TEAM_PHOTO_WIDTH)
             st.markdown("""<div style="display: flex; justify-content: center;"
             </div>""", unsafe_allow_html=True)
             # Optionally, display the name below the image
@@ -147,7 +109,7 @@ for i in range(0, len(team_members1), 3):
                 st.markdown('<div class="team-container">', unsafe_allow_html=True)
                 
                 # Image (Centered)
-                st.image(member["photo"], width=300, output_format="PNG")
+                st.image(assets.image(member["photo"]), width=assets.TEAM_PHOTO_WIDTH)
 
                 # Name (Centered)
                 st.markdown(f'<p class="team-name">{member["name"]}</p>', unsafe_allow_html=True)
@@ -178,7 +140,7 @@ for i in range(0, len(team_members2), 3):
                 st.markdown('<div class="team-container">', unsafe_allow_html=True)
                 
                 # Image (Centered)
-                st.image(member["photo"], width=300, output_format="PNG")
+                st.image(assets.image(member["photo"]), width=assets.TEAM_PHOTO_WIDTH)
 
                 # Name (Centered)
                 st.markdown(f'<p class="team-name">{member["name"]}</p>', unsafe_allow_html=True)
@@ -225,12 +187,4 @@ st.write("""
 
 
 # Footer
-st.markdown(
-    """
-    <hr>
-    <p style='text-align: center;'>
-    © 2024 Rajesh Pandey | Ingen-hope Lab
-    </p>
-    """,
-    unsafe_allow_html=True
-)
+footer()
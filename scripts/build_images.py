@@ -0,0 +1,80 @@
+"""Build resized, recompressed copies of the page images.
+
+Every image in ``denviewer.assets.DISPLAY_WIDTHS`` is scaled down to the width
+it is displayed at and written to ``pages/images/optimized/`` under a
+content-hashed name, together with ``manifest.json`` mapping original paths to
+derivatives. Photos become progressive JPEGs and the logo a palette PNG:
+``st.image`` only passes JPEG/PNG/GIF bytes through untouched and re-encodes
+anything else (WebP included) on every rerun.
+
+Run from the repository root after adding or replacing an image:
+
+    python scripts/build_images.py
+"""
+
+import hashlib
+import io
+import json
+import os
+import sys
+
+from PIL import Image, ImageOps
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from denviewer.assets import DISPLAY_WIDTHS, MANIFEST_PATH, OPTIMIZED_DIR  # noqa: E402
+
+JPEG_QUALITY = 82
+
+
+def render(path, width):
+    # Encoded bytes and file extension of the derivative for one image
+    with Image.open(path) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.width > width:
+            height = round(im.height * width / im.width)
+            im = im.resize((width, height), Image.LANCZOS)
+
+        buf = io.BytesIO()
+        if im.mode in ("RGBA", "LA", "P"):
+            im = im.convert("RGBA").quantize(colors=256, method=Image.FASTOCTREE)
+            im.save(buf, format="PNG", optimize=True)
+            ext = ".png"
+        else:
+            im.convert("RGB").save(buf, format="JPEG", quality=JPEG_QUALITY,
+                                   optimize=True, progressive=True)
+            ext = ".jpg"
+    return buf.getvalue(), ext
+
+
+def build():
+    out_dir = os.path.join(ROOT, OPTIMIZED_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+
+    manifest = {}
+    for path, width in DISPLAY_WIDTHS.items():
+        data, ext = render(os.path.join(ROOT, path), width)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        digest = hashlib.sha256(data).hexdigest()[:10]
+        derived = f"{OPTIMIZED_DIR}/{stem}.{digest}{ext}"
+        with open(os.path.join(ROOT, derived), "wb") as f:
+            f.write(data)
+        manifest[path] = derived
+
+        before = os.path.getsize(os.path.join(ROOT, path))
+        print(f"{path:<32} {before / 1024:8.0f} KB -> {len(data) / 1024:6.0f} KB  {derived}")
+
+    # Drop derivatives of earlier builds that the new manifest no longer references
+    keep = {os.path.basename(p) for p in manifest.values()}
+    for name in os.listdir(out_dir):
+        if name != os.path.basename(MANIFEST_PATH) and name not in keep:
+            os.remove(os.path.join(out_dir, name))
+
+    with open(os.path.join(ROOT, MANIFEST_PATH), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+
+
+if __name__ == "__main__":
+    build()
@@ -0,0 +1,51 @@
+"""Regenerate the mutation table from an aligned FASTA.
+
+Reads a multiple sequence alignment that includes the NC_001474.2 reference,
+calls substitutions of every sequence against it and writes per-year,
+per-severity frequencies in the layout of ``all_Mutations.csv``. Sequence
+names are matched to the ``strain`` column of the demographics table for
+collection year and severity. The table goes to
+``pages/files/generated/all_Mutations.csv`` by default, leaving the curated
+file the app ships with untouched; publish it to the app with
+``scripts/publish_data.py --mutations``. Run from the repository root:
+
+    python scripts/build_mutations.py aligned.fasta
+    python scripts/build_mutations.py aligned.fasta --mmap /tmp/aln.npy --out new_mutations.csv
+    python scripts/publish_data.py --mutations pages/files/generated/all_Mutations.csv
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from denviewer import data, ingest  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("fasta", help="aligned FASTA including the reference")
+    parser.add_argument("--out", default=data.GENERATED_MUTATIONS_FILE, help="output CSV (default: %(default)s)")
+    parser.add_argument("--mmap", help="encode the alignment into this .npy file instead of memory")
+    parser.add_argument("--reference", default=ingest.REFERENCE_ID, help="reference sequence name (default: %(default)s)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    names, matrix = ingest.encode_alignment(args.fasta, args.mmap)
+    encoded = time.perf_counter()
+    table = ingest.mutation_table(names, matrix, data.load_demographics(), args.reference)
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    table.to_csv(args.out, index=False)
+    done = time.perf_counter()
+
+    print(f"{len(names)} sequences x {matrix.shape[1]} columns encoded in {encoded - start:.1f} s")
+    print(f"{len(table)} mutation rows written to {args.out} in {done - encoded:.1f} s")
+    print(f"Publish it to the app with: python scripts/publish_data.py --mutations {args.out}")
+
+
+if __name__ == "__main__":
+    main()
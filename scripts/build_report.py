@@ -0,0 +1,306 @@
+"""Pre-render every dashboard view into an offline report bundle.
+
+Enumerates the widget combinations of the Home, Mutation, Clinical Parameters
+and Phylogeny pages (serotype x year, year x diversity metric, plot type x
+colour column, colour column x tree axis), runs each page headlessly with
+those values in a process pool and writes every chart it draws as HTML (and
+PNG when kaleido is installed) under ``report/``, with an ``index.html``
+linking them all. The bundle works offline: the figures share one copy of
+plotly.js (``--standalone`` inlines it into every file instead).
+
+Builds are incremental. Each view is keyed by its page script, the size and
+modification time of the data files the page reads and the widget values,
+so a rerun only renders views whose inputs changed. Identical figures (charts
+that do not depend on the widgets) are written once.
+
+Run from the repository root:
+
+    python scripts/build_report.py
+    python scripts/build_report.py --jobs 8 --pages Home Mutation --out bulletin-2025-03
+"""
+
+import argparse
+import concurrent.futures
+import hashlib
+import html
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import plotly.io as pio  # noqa: E402
+import pyarrow as pa  # noqa: E402
+from plotly.offline import get_plotlyjs  # noqa: E402
+
+from denviewer import data, dataplane, phylo  # noqa: E402
+
+# Page name -> (script, widgets whose options are enumerated, data files read)
+PAGES = {
+    "Home": ("Home.py", ["Select Serotype:", "Select a year"],
+             [data.GISAID_FILE, data.DEMOGRAPHICS_FILE, data.CASES_FILE]),
+    "Mutation": ("pages/2_🧬_Mutation.py", ["Select Year", "Metric"],
+                 [data.MUTATIONS_FILE]),
+    "Clinical Parameters": ("pages/3_📊 Clinical Parameters.py",
+                            ["Select Plot Type", "Select Column for Coloring (Optional)"],
+                            [data.DEMOGRAPHICS_FILE]),
+    "Phylogeny": ("pages/4_🌿 Phylogeny.py", ["Select metadata column for coloring:", "Tree x-axis"],
+                  [phylo.TREE_FILE, "pages/files/all_clade.csv", data.DEMOGRAPHICS_FILE]),
+}
+OUT_DIR = "report"
+MANIFEST_FILE = "manifest.json"
+PLOTLY_JS = "plotly.min.js"
+# Seconds a page run may take before the view counts as failed
+RUN_TIMEOUT = 300
+TABLE_PAGE = """<!DOCTYPE html><html><head><meta charset='utf-8'><title>{title}</title>
+<style>body{{font-family:sans-serif;margin:2em}}table{{border-collapse:collapse;font-size:13px}}
+th,td{{border:1px solid #ddd;padding:2px 6px;text-align:right}}</style></head>
+<body><h3>{title}</h3>{table}</body></html>"""
+
+
+def _find_widget(at, label):
+    for widget in [*at.selectbox, *at.radio]:
+        if widget.label == label:
+            return widget
+    raise KeyError(f"No selectbox or radio labelled {label!r}")
+
+
+def run_page(script, choices=None):
+    # Run a page headlessly, with the given {label: (option index, option)}
+    # widget values applied on a second run
+    from streamlit.testing.v1 import AppTest
+
+    # Page scripts run as __main__; put this script back afterwards so the
+    # pool can still find the worker functions in it
+    main = sys.modules["__main__"]
+    try:
+        at = AppTest.from_file(script, default_timeout=RUN_TIMEOUT).run()
+        if choices:
+            for label, (index, _) in choices.items():
+                widget = _find_widget(at, label)
+                if hasattr(widget, "select_index"):
+                    widget.select_index(index)
+                else:
+                    widget.set_value(widget.options[index])
+            at.run()
+    finally:
+        sys.modules["__main__"] = main
+    return at
+
+
+def page_options(page):
+    # Options of the enumerated widgets, from one run with the defaults, as
+    # (index, option) pairs without repeated options
+    script, labels, _ = PAGES[page]
+    at = run_page(script)
+    if at.exception:
+        raise RuntimeError(f"{page} failed with the default widget values: {at.exception[0].message}")
+    options = {}
+    for label in labels:
+        seen, options[label] = set(), []
+        for index, option in enumerate(_find_widget(at, label).options):
+            if option not in seen:
+                seen.add(option)
+                options[label].append((index, option))
+    return options
+
+
+def view_key(page, choices):
+    # Hash of everything a view is rendered from: the page script, the data
+    # files it reads and the widget values
+    script, _, sources = PAGES[page]
+    digest = hashlib.sha256()
+    with open(script, "rb") as f:
+        digest.update(f.read())
+    for path in sources:
+        signature = dataplane.source_signature(path)
+        digest.update(f"{path}:{signature['size']}:{signature['mtime_ns']}".encode())
+    digest.update(f"data plane:{dataplane.current_version()}".encode())
+    digest.update(json.dumps(choices, sort_keys=True).encode())
+    return digest.hexdigest()[:24]
+
+
+def _write_atomic(path, content):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    mode = "wb" if isinstance(content, bytes) else "w"
+    with open(tmp, mode, **({} if mode == "wb" else {"encoding": "utf-8"})) as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+def render_view(page, choices, out_dir, standalone, images):
+    # Run the page with the given widget values and write its charts and
+    # tables; returns them in page order as {"hash", "kind", "title", "image"}
+    at = run_page(PAGES[page][0], choices)
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+    figures = []
+    for chart in at.get("plotly_chart"):
+        spec = chart.proto.spec
+        digest = hashlib.sha256(spec.encode("utf-8")).hexdigest()[:20]
+        html_path = os.path.join(out_dir, "figures", f"{digest}.html")
+        png_path = os.path.join(out_dir, "images", f"{digest}.png")
+        fig = None
+        if not os.path.exists(html_path):
+            fig = pio.from_json(spec)
+            _write_atomic(html_path, fig.to_html(include_plotlyjs=True if standalone else "directory"))
+        has_image = os.path.exists(png_path)
+        if images and not has_image:
+            fig = fig or pio.from_json(spec)
+            _write_atomic(png_path, fig.to_image(format="png", width=1200, height=700))
+            has_image = True
+        title = json.loads(spec).get("layout", {}).get("title", {})
+        figures.append({
+            "hash": digest,
+            "kind": "chart",
+            "title": title.get("text", "") if isinstance(title, dict) else str(title),
+            "image": has_image,
+        })
+
+    for number, table in enumerate(at.dataframe, start=1):
+        try:
+            frame = table.value
+        except TypeError:
+            # Pandas metadata pyarrow cannot restore (categorical column
+            # labels); the plain Arrow columns still hold the contents
+            frame = pa.ipc.open_stream(table.proto.data).read_all().to_pandas(ignore_metadata=True)
+        title = f"{page} table {number}"
+        content = TABLE_PAGE.format(title=html.escape(title), table=frame.to_html(index=False, border=0))
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:20]
+        html_path = os.path.join(out_dir, "figures", f"{digest}.html")
+        if not os.path.exists(html_path):
+            _write_atomic(html_path, content)
+        figures.append({"hash": digest, "kind": "table", "title": f"Table {number}", "image": False})
+    return figures
+
+
+def write_index(out_dir, views):
+    # index.html: one section per page, one entry per widget combination
+    parts = [
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>DENViewer report</title>",
+        "<style>body{font-family:sans-serif;margin:2em}h2{margin-top:2em}"
+        "li{margin:.3em 0}img{width:240px;border:1px solid #ddd;margin:4px}</style></head><body>",
+        f"<h1>DENViewer report</h1><p>Built {html.escape(time.strftime('%Y-%m-%d %H:%M'))}, "
+        f"{len(views)} views.</p>",
+    ]
+    for page in PAGES:
+        page_views = [v for v in views.values() if v["page"] == page]
+        if not page_views:
+            continue
+        parts.append(f"<h2>{html.escape(page)}</h2><ul>")
+        for view in sorted(page_views, key=lambda v: [c[0] for c in v["choices"].values()]):
+            label = ", ".join(f"{name.rstrip(':')}: {option}" for name, (_, option) in view["choices"].items())
+            if view.get("error"):
+                parts.append(f"<li>{html.escape(label)} — failed: {html.escape(view['error'])}</li>")
+                continue
+            links = []
+            for i, figure in enumerate(view["figures"], start=1):
+                text = html.escape(figure["title"] or f"Figure {i}")
+                if figure["image"]:
+                    text = f"<img src='images/{figure['hash']}.png' alt='{text}' title='{text}'>"
+                links.append(f"<a href='figures/{figure['hash']}.html'>{text}</a>")
+            parts.append(f"<li><b>{html.escape(label)}</b><br>{' · '.join(links) or 'no charts'}</li>")
+        parts.append("</ul>")
+    parts.append("</body></html>")
+    _write_atomic(os.path.join(out_dir, "index.html"), "\n".join(parts))
+
+
+def prune_figures(out_dir, views):
+    # Drop figure files no view links to any more
+    used = {f["hash"] for v in views.values() for f in v.get("figures", [])}
+    for folder in ("figures", "images"):
+        for name in os.listdir(os.path.join(out_dir, folder)):
+            if os.path.splitext(name)[0] not in used and name != PLOTLY_JS:
+                os.remove(os.path.join(out_dir, folder, name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", default=OUT_DIR, help="bundle directory (default: %(default)s)")
+    parser.add_argument("--pages", nargs="+", default=list(PAGES), choices=list(PAGES), metavar="PAGE",
+                        help="pages to render (default: all of %(choices)s)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes (default: one per CPU)")
+    parser.add_argument("--standalone", action="store_true", help="inline plotly.js into every figure file")
+    parser.add_argument("--no-images", action="store_true", help="skip the PNG copies")
+    parser.add_argument("--force", action="store_true", help="re-render every view")
+    args = parser.parse_args()
+
+    images = not args.no_images
+    if images:
+        try:
+            import kaleido  # noqa: F401
+        except ImportError:
+            print("kaleido is not installed; writing HTML only (pip install kaleido for PNGs)", file=sys.stderr)
+            images = False
+
+    out_dir = args.out
+    for folder in ("figures", "images"):
+        os.makedirs(os.path.join(out_dir, folder), exist_ok=True)
+    if not args.standalone and not os.path.exists(os.path.join(out_dir, "figures", PLOTLY_JS)):
+        _write_atomic(os.path.join(out_dir, "figures", PLOTLY_JS), get_plotlyjs())
+    manifest_path = os.path.join(out_dir, MANIFEST_FILE)
+    previous = {}
+    if os.path.exists(manifest_path) and not args.force:
+        with open(manifest_path, encoding="utf-8") as f:
+            previous = json.load(f)["views"]
+
+    # Spawned workers, so none inherits the threads of this process; each
+    # keeps its loaders warm across the views it renders
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs, mp_context=context) as pool:
+        options = dict(zip(args.pages, pool.map(page_options, args.pages)))
+
+        views, pending = {}, {}
+        for page in args.pages:
+            labels = list(options[page])
+            for combination in itertools.product(*(options[page][label] for label in labels)):
+                choices = dict(zip(labels, combination))
+                view_id = f"{page}:{json.dumps([option for _, option in combination])}"
+                key = view_key(page, choices)
+                old = previous.get(view_id)
+                # Failed views are retried, since the fix may lie outside the key
+                if old and old["key"] == key and not old.get("error") and all(
+                    os.path.exists(os.path.join(out_dir, "figures", f"{f['hash']}.html"))
+                    and (f["image"] or not images or f["kind"] == "table")
+                    for f in old["figures"]
+                ):
+                    views[view_id] = old
+                    continue
+                views[view_id] = {"page": page, "choices": choices, "key": key}
+                future = pool.submit(render_view, page, choices, out_dir, args.standalone, images)
+                pending[future] = view_id
+
+        skipped = len(views) - len(pending)
+        print(f"{len(views)} views: {skipped} unchanged, rendering {len(pending)} on {args.jobs} workers",
+              file=sys.stderr)
+        failed = 0
+        for done, future in enumerate(concurrent.futures.as_completed(pending), start=1):
+            view = views[pending[future]]
+            try:
+                view["figures"] = future.result()
+            except Exception as e:
+                view["figures"], view["error"] = [], str(e)
+                failed += 1
+                print(f"    {pending[future]} failed: {e}", file=sys.stderr)
+            if done % 10 == 0 or done == len(pending):
+                print(f"    {done}/{len(pending)}", file=sys.stderr)
+
+    # Views of pages not rendered this time are kept as they were
+    for view_id, view in previous.items():
+        if view["page"] not in args.pages:
+            views[view_id] = view
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"views": views}, f, indent=1)
+    prune_figures(out_dir, views)
+    write_index(out_dir, views)
+    print(f"Wrote {os.path.join(out_dir, 'index.html')} ({failed} views failed)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""Load test the dashboard with concurrent simulated sessions.
+
+Starts the app with ``streamlit run`` (or targets running servers with --url)
+and drives N sessions over the websocket protocol the browser uses. Each
+session opens the Home, Mutation, Clinical Parameters and Phylogeny pages and
+changes their widgets one at a time with a short think time, like a user
+would; widgets inside fragments rerun only their fragment, as in the browser.
+Reports throughput, p50/p95/p99 rerun latency per page and kind of run, and
+the resident memory of every server process (Linux only).
+
+Usage (from the repository root):
+
+    python scripts/load_test.py --sessions 20 --rounds 3
+    python scripts/load_test.py --servers 4 --sessions 80 --json after.json
+    python scripts/load_test.py --url http://localhost:8501 --pid 1234 --sessions 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import Counter
+from urllib.parse import urlsplit
+
+import numpy as np
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.Slider_pb2 import Slider
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.websocket import websocket_connect
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Page name (as in the sidebar) -> widgets a session changes on it, in order,
+# by label or label prefix
+SCENARIOS = {
+    "Home": ["Select Serotype:", "Select a year"],
+    "Mutation": [
+        "Select Year", "Metric", "Window width (nt)", "Years", "Select Mutation Type",
+        "Select Position Range", "Gene", "Maximum q-value",
+    ],
+    "Clinical Parameters": [
+        "Select Plot Type", "Select Column for Coloring (Optional)", "Severity", "Age",
+    ],
+    "Phylogeny": [
+        "Select metadata column for coloring:", "Tree x-axis", "Search tips", "Matching samples",
+        "Maximum patristic distance",
+    ],
+}
+# Values typed into text inputs
+TEXT_VALUES = {"Search tips": ["Severe", "2023-08", "DENV-2", "IGIB"]}
+WIDGET_KINDS = ("selectbox", "multiselect", "slider", "radio", "button", "text_input")
+PERCENTILES = [50, 95, 99]
+
+
+def random_state(kind, label, widget, rng):
+    # A value a user could pick for the widget, or None if it offers no choice
+    state = WidgetState(id=widget.id)
+    if kind in ("selectbox", "radio"):
+        if not widget.options:
+            return None
+        state.int_value = rng.randrange(len(widget.options))
+    elif kind == "multiselect":
+        if not widget.options:
+            return None
+        picks = rng.sample(range(len(widget.options)), rng.randint(1, min(3, len(widget.options))))
+        state.int_array_value.data.extend(sorted(picks))
+    elif kind == "slider":
+        if widget.options:  # select_slider: indices into the options
+            picks = [rng.randrange(len(widget.options)) for _ in widget.default]
+        else:
+            picks = [rng.uniform(widget.min, widget.max) for _ in widget.default]
+            if widget.data_type != Slider.FLOAT:
+                picks = [widget.min + round((p - widget.min) / widget.step) * widget.step for p in picks]
+        state.double_array_value.data.extend(sorted(picks))
+    elif kind == "button":
+        state.trigger_value = True
+    elif kind == "text_input":
+        state.string_value = rng.choice(TEXT_VALUES.get(label, ["a"]))
+    return state
+
+
+class Session:
+    # One simulated browser tab: a websocket, the widgets of the current page
+    # and the values this user has set
+
+    def __init__(self, url, timeout):
+        parts = urlsplit(url)
+        scheme = "wss" if parts.scheme == "https" else "ws"
+        self.ws_url = f"{scheme}://{parts.netloc}{parts.path.rstrip('/')}/_stcore/stream"
+        self.timeout = timeout
+        self.ws = None
+        self.page_hash = ""
+        self.widgets = {}  # label -> (kind, proto, fragment id)
+        self.states = {}  # widget id -> WidgetState
+        self.cache = {}  # message hash -> ForwardMsg, for ref_hash replies
+        self.errors = []
+
+    async def connect(self):
+        self.ws = await websocket_connect(self.ws_url, subprotocols=["streamlit"])
+
+    def close(self):
+        if self.ws is not None:
+            self.ws.close()
+
+    def find(self, label):
+        for name, widget in self.widgets.items():
+            if name == label or name.startswith(label):
+                return name, widget
+        return None, None
+
+    def _receive(self, msg):
+        if msg.WhichOneof("type") == "ref_hash":
+            msg = self.cache[msg.ref_hash]
+        elif msg.metadata.cacheable:
+            self.cache[msg.hash] = msg
+        kind = msg.WhichOneof("type")
+        if kind == "new_session":
+            if not msg.new_session.fragment_ids_this_run:
+                self.widgets = {}
+        elif kind == "navigation":
+            self.page_hash = msg.navigation.page_script_hash
+        elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+            element = msg.delta.new_element
+            element_kind = element.WhichOneof("type")
+            if element_kind in WIDGET_KINDS:
+                widget = getattr(element, element_kind)
+                self.widgets[widget.label] = (element_kind, widget, msg.delta.fragment_id)
+            elif element_kind == "exception":
+                self.errors.append(f"{element.exception.type}: {element.exception.message}")
+        elif kind == "script_finished":
+            return msg.script_finished
+        return None
+
+    async def run(self, page_name=None, fragment_id="", trigger=None):
+        # Rerun the page (or one fragment of it) with the widget values set so
+        # far and wait for it to finish; returns the seconds it took. A page
+        # name (its URL path, "" for Home) loads that page from scratch.
+        msg = BackMsg()
+        client = msg.rerun_script
+        if page_name is not None:
+            client.page_name = page_name
+        else:
+            client.page_script_hash = self.page_hash
+            live = {widget.id for _, widget, _ in self.widgets.values()}
+            client.widget_states.widgets.extend(s for i, s in self.states.items() if i in live)
+            if trigger is not None:
+                client.widget_states.widgets.append(trigger)
+            client.fragment_id = fragment_id
+        start = time.perf_counter()
+        await self.ws.write_message(msg.SerializeToString(), binary=True)
+        while True:
+            raw = await asyncio.wait_for(self.ws.read_message(), self.timeout)
+            if raw is None:
+                raise ConnectionError("server closed the connection")
+            if self._receive(ForwardMsg.FromString(raw)) is not None:
+                return time.perf_counter() - start
+
+
+async def simulate_user(number, url, args, results):
+    # One session's walk through every page, args.rounds times
+    rng = random.Random(args.seed * 100003 + number)
+    session = Session(url, args.timeout)
+    await asyncio.sleep(rng.uniform(0, args.ramp))
+
+    def record(page, kind, seconds):
+        results.append({"session": number, "page": page, "kind": kind, "seconds": seconds,
+                        "errors": list(session.errors)})
+        session.errors.clear()
+
+    try:
+        await session.connect()
+        for _ in range(args.rounds):
+            for page in args.pages:
+                session.states.clear()
+                record(page, "load", await session.run(page_name="" if page == "Home" else page.replace(" ", "_")))
+                for label in SCENARIOS[page]:
+                    await asyncio.sleep(rng.uniform(0, args.think))
+                    name, widget = session.find(label)
+                    if widget is None:
+                        continue
+                    kind, proto, fragment_id = widget
+                    state = random_state(kind, name, proto, rng)
+                    if state is None:
+                        continue
+                    if kind != "button":
+                        session.states[proto.id] = state
+                    seconds = await session.run(fragment_id=fragment_id, trigger=state if kind == "button" else None)
+                    record(page, "fragment" if fragment_id else "rerun", seconds)
+    except (asyncio.TimeoutError, ConnectionError, OSError) as e:
+        results.append({"session": number, "page": None, "kind": "failed", "seconds": None,
+                        "errors": [], "reason": f"{type(e).__name__}: {e}"})
+    finally:
+        session.close()
+
+
+def rss_bytes(pid):
+    # Resident set size of a process from /proc, None where unavailable
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+async def sample_memory(pids, samples, interval=0.5):
+    while True:
+        for pid in pids:
+            rss = rss_bytes(pid)
+            if rss is not None:
+                samples.setdefault(pid, []).append(rss)
+        await asyncio.sleep(interval)
+
+
+def start_servers(count, port):
+    # Launch count app processes on consecutive ports; returns (urls, processes)
+    processes, urls = [], []
+    for i in range(count):
+        command = [
+            sys.executable, "-m", "streamlit", "run", "Home.py",
+            "--server.headless", "true", "--server.port", str(port + i),
+            "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false",
+        ]
+        processes.append(subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        urls.append(f"http://127.0.0.1:{port + i}")
+    for url, process in zip(urls, processes):
+        deadline = time.monotonic() + 60
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"streamlit exited with code {process.returncode} before serving {url}")
+            try:
+                with urllib.request.urlopen(f"{url}/_stcore/health", timeout=2) as response:
+                    if response.status == 200:
+                        break
+            except OSError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{url} did not become healthy within 60 s")
+            time.sleep(0.5)
+    return urls, processes
+
+
+def latency_summary(seconds):
+    values = np.asarray(seconds) * 1000
+    summary = {"runs": len(values)}
+    if len(values):
+        summary.update({f"p{p}": float(np.percentile(values, p)) for p in PERCENTILES})
+        summary["max"] = float(values.max())
+    return summary
+
+
+def summarize(results, memory, wall, args, servers):
+    runs = [r for r in results if r["seconds"] is not None]
+    groups = {"all": runs}
+    for kind in ("load", "rerun", "fragment"):
+        groups[kind] = [r for r in runs if r["kind"] == kind]
+    for page in args.pages:
+        groups[page] = [r for r in runs if r["page"] == page]
+    return {
+        "sessions": args.sessions,
+        "rounds": args.rounds,
+        "servers": servers,
+        "seconds": wall,
+        "reruns": len(runs),
+        "reruns_per_second": len(runs) / wall if wall else 0.0,
+        "errors": dict(Counter(f"{r['page']}: {e}" for r in results for e in r["errors"]).most_common()),
+        "failed_sessions": [r["reason"] for r in results if r["kind"] == "failed"],
+        "latency_ms": {name: latency_summary([r["seconds"] for r in rows]) for name, rows in groups.items()},
+        "memory_mib": {
+            str(pid): {"start": rss[0] / 2**20, "peak": max(rss) / 2**20, "end": rss[-1] / 2**20}
+            for pid, rss in memory.items()
+        },
+    }
+
+
+def print_report(summary):
+    print(f"{summary['sessions']} sessions x {summary['rounds']} rounds on {summary['servers']} server(s): "
+          f"{summary['reruns']} reruns in {summary['seconds']:.1f} s "
+          f"({summary['reruns_per_second']:.2f} reruns/s), {sum(summary['errors'].values())} errors, "
+          f"{len(summary['failed_sessions'])} failed sessions")
+    for error, count in summary["errors"].items():
+        print(f"    {count} x {error}")
+    for reason in summary["failed_sessions"]:
+        print(f"    failed session: {reason}")
+    print()
+    print(f"{'latency (ms)':<22}{'runs':>6}" + "".join(f"{f'p{p}':>10}" for p in PERCENTILES) + f"{'max':>10}")
+    for name, stats in summary["latency_ms"].items():
+        if stats["runs"]:
+            print(f"{name:<22}{stats['runs']:>6}"
+                  + "".join(f"{stats[f'p{p}']:>10.0f}" for p in PERCENTILES) + f"{stats['max']:>10.0f}")
+    if summary["memory_mib"]:
+        print()
+        print(f"{'server RSS (MiB)':<22}{'start':>10}{'peak':>10}{'end':>10}")
+        for pid, rss in summary["memory_mib"].items():
+            print(f"{'pid ' + pid:<22}{rss['start']:>10.0f}{rss['peak']:>10.0f}{rss['end']:>10.0f}")
+
+
+async def load_test(urls, pids, args):
+    results, memory = [], {}
+    sampler = asyncio.create_task(sample_memory(pids, memory))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        simulate_user(i, urls[i % len(urls)], args, results) for i in range(args.sessions)
+    ))
+    wall = time.perf_counter() - start
+    sampler.cancel()
+    for pid in pids:  # one last sample after the final reruns
+        rss = rss_bytes(pid)
+        if rss is not None:
+            memory.setdefault(pid, []).append(rss)
+    return summarize(results, memory, wall, args, len(urls))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10, help="concurrent sessions (default: %(default)s)")
+    parser.add_argument("--rounds", type=int, default=1, help="walks through the pages per session (default: %(default)s)")
+    parser.add_argument("--pages", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS), metavar="PAGE",
+                        help="pages to visit, in order (default: all of %(choices)s)")
+    parser.add_argument("--think", type=float, default=1.0, help="maximum pause between interactions, seconds (default: %(default)s)")
+    parser.add_argument("--ramp", type=float, default=5.0, help="spread session starts over this many seconds (default: %(default)s)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds before a rerun counts as failed (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the widget values picked")
+    parser.add_argument("--url", action="append", help="target a running app instead of starting one (repeatable; sessions are spread round-robin)")
+    parser.add_argument("--pid", type=int, action="append", default=[], help="server process to sample memory of, with --url (repeatable)")
+    parser.add_argument("--servers", type=int, default=1, help="app processes to start without --url (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=8611, help="first port for the started servers (default: %(default)s)")
+    parser.add_argument("--json", help="also write the summary to this file, to compare runs")
+    args = parser.parse_args()
+
+    processes = []
+    if args.url:
+        urls, pids = args.url, args.pid
+    else:
+        print(f"Starting {args.servers} app process(es)...", file=sys.stderr)
+        urls, processes = start_servers(args.servers, args.port)
+        pids = [p.pid for p in processes]
+    try:
+        summary = asyncio.run(load_test(urls, pids, args))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+    print_report(summary)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Per-dataset memory usage of the frames the dashboard holds in memory.
+
+Compares the default ``pd.read_csv`` representation with the compact one the
+pages actually load. Run from the repository root:
+
+    python scripts/memory_report.py
+"""
+
+import os
+import sys
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from denviewer import data  # noqa: E402
+
+
+def main():
+    raw = pd.read_csv(data.DEMOGRAPHICS_FILE)
+    frames = {
+        "demographics (read_csv)": raw,
+        "demographics (compact)": data.compact_demographics(raw),
+        "mutations (read_csv)": pd.read_csv(data.MUTATIONS_FILE),
+        "cases (read_csv)": pd.read_csv(data.CASES_FILE),
+    }
+    report = data.memory_report(frames)
+    print(report.to_string(index=False, float_format="{:.2f}".format))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Import-time profile of the DENViewer pages.
+
+Each page's imports are timed in a fresh interpreter so the numbers reflect a
+cold container start, not a warm ``sys.modules``. A module's time only covers
+what earlier imports on the same page had not already loaded. For a full
+dependency breakdown of one module use ``python -X importtime -c "import plotly.express"``.
+
+Usage (from the repository root):
+
+    python scripts/profile_startup.py
+    python scripts/profile_startup.py --modules plotly.express pandas
+"""
+
+import argparse
+import ast
+import glob
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def page_imports(path):
+    # Top-level imports of a page script, in the order they appear
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+_TIMER = """
+import importlib, json, sys, time
+timings = {}
+for name in sys.argv[1:]:
+    start = time.perf_counter()
+    importlib.import_module(name)
+    timings[name] = time.perf_counter() - start
+print(json.dumps(timings))
+"""
+
+
+def import_time(modules):
+    # Marginal import time in seconds for each module, imported in order in
+    # one fresh interpreter so shared dependencies are only counted once
+    proc = subprocess.run(
+        [sys.executable, "-c", _TIMER, *modules],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def profile_page(path):
+    modules = page_imports(path)
+    timings = import_time(modules)
+    return modules, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", nargs="+", help="profile these modules instead of the pages")
+    args = parser.parse_args()
+
+    if args.modules:
+        for module in args.modules:
+            seconds = import_time([module]).get(module, 0.0)
+            print(f"{module:<40} {seconds * 1000:9.1f} ms")
+        return
+
+    pages = [os.path.join(ROOT, "Home.py")] + sorted(glob.glob(os.path.join(ROOT, "pages", "*.py")))
+    for path in pages:
+        modules, timings = profile_page(path)
+        total = sum(timings.values())
+        print(f"{os.path.relpath(path, ROOT)}  ({total * 1000:.1f} ms)")
+        for module in modules:
+            print(f"    {module:<36} {timings.get(module, 0.0) * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
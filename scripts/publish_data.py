@@ -0,0 +1,87 @@
+"""Publish the shared data plane.
+
+Parses the source files once and writes the arrays every dashboard process
+maps: demographics, GISAID and case-report columns, the mutation table, the position x
+year x severity diversity matrices and the tree with its layout. The new
+version goes live atomically; running processes pick it up on their next data
+refresh (see ``denviewer/refresh.py``). Run from the repository root after the
+source files change (the pages fall back to parsing any source file newer
+than the published copy):
+
+    python scripts/publish_data.py
+
+To serve a mutation table regenerated by ``scripts/build_mutations.py``
+instead of the curated ``all_Mutations.csv`` (which stays untouched), publish
+it in place of the curated file; publishing again without ``--mutations``
+goes back to the curated table:
+
+    python scripts/publish_data.py --mutations pages/files/generated/all_Mutations.csv
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from denviewer import data, dataplane, diversity, mutations, phylo  # noqa: E402
+
+
+def frame_dataset(df, *sources):
+    arrays, meta = dataplane.encode_frame(df)
+    return {"arrays": arrays, "meta": meta, "sources": [dataplane.source_signature(p) for p in sources]}
+
+
+def build(mutations_file=data.MUTATIONS_FILE):
+    mutation_table = mutations.read_mutations(mutations_file)
+    # Class sizes come from the table itself (mutations.group_sizes)
+    site = diversity.site_diversity(mutation_table)
+    with open(phylo.TREE_FILE, encoding="utf-8") as f:
+        tree = phylo.from_newick(f.read())
+    x, y = phylo.rectangular_layout(tree)
+
+    mutation_source = [dataplane.source_signature(mutations_file)]
+    # A generated table stands in for the curated one it was published over
+    replaces = [] if mutations_file == data.MUTATIONS_FILE else [data.MUTATIONS_FILE]
+    return {
+        "demographics": frame_dataset(
+            data.compact_demographics(pd.read_csv(data.DEMOGRAPHICS_FILE)), data.DEMOGRAPHICS_FILE
+        ),
+        "gisaid": frame_dataset(pd.read_csv(data.GISAID_FILE), data.GISAID_FILE),
+        "cases": frame_dataset(pd.read_csv(data.CASES_FILE), data.CASES_FILE),
+        "mutations": {**frame_dataset(mutation_table, mutations_file), "replaces": replaces},
+        "diversity": {
+            "arrays": {k: v for k, v in site.items() if k != "classes"},
+            "sources": mutation_source,
+            "replaces": replaces,
+        },
+        "tree": {
+            "arrays": {**tree.to_arrays(), "names": np.array(tree.names, dtype=str), "x": x, "y": y},
+            "sources": [dataplane.source_signature(phylo.TREE_FILE)],
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mutations", default=data.MUTATIONS_FILE,
+                        help="mutation table to publish (default: %(default)s)")
+    args = parser.parse_args()
+
+    datasets = build(args.mutations)
+    version = dataplane.publish(datasets)
+    print(f"Published {version} to {dataplane.DATA_PLANE_DIR}")
+    if args.mutations != data.MUTATIONS_FILE:
+        print(f"  mutations and diversity from {args.mutations} (in place of {data.MUTATIONS_FILE})")
+    for name, dataset in datasets.items():
+        size = sum(np.asarray(a).nbytes for a in dataset["arrays"].values())
+        print(f"  {name:<13} {len(dataset['arrays']):3d} arrays {size / 2**20:8.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
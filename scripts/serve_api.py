@@ -0,0 +1,38 @@
+"""Serve the dashboard aggregates over a read-only HTTP API.
+
+Lists the datasets at ``/api`` and serves each at ``/api/<name>`` as JSON, or
+as Arrow IPC with ``?format=arrow`` (or ``Accept:
+application/vnd.apache.arrow.stream``). Responses carry an ETag; send it back
+in ``If-None-Match`` to get a 304 until the data changes. Run from the
+repository root, next to ``streamlit run Home.py``:
+
+    python scripts/serve_api.py --port 8502
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from denviewer import api  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=api.DEFAULT_HOST, help="interface to bind (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=api.DEFAULT_PORT, help="port (default: %(default)s)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    try:
+        api.serve(args.host, args.port)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
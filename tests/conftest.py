@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def repo_root(monkeypatch):
+    # Pages and loaders use paths relative to the repository root
+    monkeypatch.chdir(ROOT)
+    return ROOT
+
+
+@pytest.fixture
+def refresh_state(monkeypatch):
+    # Empty loader caches at generation 0, restored afterwards
+    from denviewer import refresh
+
+    monkeypatch.setattr(refresh, "_entries", {})
+    monkeypatch.setattr(refresh, "_recent", refresh.collections.OrderedDict())
+    monkeypatch.setattr(refresh, "_building", {})
+    monkeypatch.setattr(refresh, "_state", {"live": 0, "oldest": 0, "watcher": None})
@@ -0,0 +1,31 @@
+import pandas as pd
+
+from denviewer import catalogue
+
+
+def catalogue_frame():
+    return pd.DataFrame({
+        "Organism_Name": ["Dengue virus 2", "dengue virus 1", "Dengue virus 2", "Dengue virus 3"],
+        "Geo_Location": ["India: Delhi", "India", "Brazil", None],
+        "Collection_Date": ["2023-08-01", "2019", None, "12-Mar-2021"],
+        "Length": [10723, 1500, 10600, None],
+        "Host": ["Homo sapiens", "Homo sapiens", "Aedes aegypti", None],
+    })
+
+
+def test_length_facet_follows_bin_order():
+    index = catalogue.build_index(catalogue.normalize_catalogue(catalogue_frame()))
+    assert index["facets"]["Length"]["values"] == ["< 2 kb", "10.5-10.7 kb", "10.7-11 kb", "Unknown"]
+
+
+def test_search_and_counts():
+    df = catalogue.normalize_catalogue(catalogue_frame())
+    assert df["Serotype"].tolist() == ["DENV-2", "DENV-1", "DENV-2", "DENV-3"]
+    assert df["Year"].astype(str).tolist() == ["2023", "2019", "Unknown", "2021"]
+    index = catalogue.build_index(df)
+    selections = {"Serotype": ["DENV-2"], "Country": ["India"]}
+    assert catalogue.search(index, selections).tolist() == [0]
+    counts = catalogue.facet_counts(index, selections)
+    # A facet is counted over the rows the other facets select
+    assert counts["Serotype"] == {"DENV-1": 1, "DENV-2": 1, "DENV-3": 0}
+    assert counts["Country"] == {"Brazil": 1, "India": 1, "Unknown": 0}
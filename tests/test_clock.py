@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from denviewer import clock
+
+
+def test_decimal_year():
+    years = clock.decimal_year(pd.PeriodIndex(["2020-01", None, "2021-12"], freq="M"))
+    assert years[0] == pytest.approx(2020 + 0.5 / 12)
+    assert np.isnan(years[1])
+    assert years[2] == pytest.approx(2021 + 11.5 / 12)
+
+
+def test_fit_clock_flags_outliers():
+    # 1e-3 substitutions per site per year from a root in 1990, with small
+    # alternating noise, one tip far off the line and one undated tip
+    dates = np.arange(2000.0, 2012.0)
+    distances = 1e-3 * (dates - 1990) + np.where(np.arange(len(dates)) % 2, 1e-5, -1e-5)
+    distances[5] += 0.05
+    dates = np.append(dates, np.nan)
+    distances = np.append(distances, 0.5)
+
+    fit = clock.fit_clock(dates, distances)
+    assert np.flatnonzero(fit["outlier"]).tolist() == [5]
+    assert fit["n"] == 11
+    assert fit["rate"] == pytest.approx(1e-3, rel=1e-2)
+    assert fit["root_date"] == pytest.approx(1990, abs=0.5)
+    assert fit["r2"] > 0.99
+    assert np.isnan(fit["residuals"][-1])
+
+
+def test_fit_clock_needs_dated_tips():
+    assert clock.fit_clock(np.array([2020.0, np.nan, 2021.0]), np.array([0.1, 0.2, 0.3])) is None
+    assert clock.fit_clock(np.full(4, 2020.0), np.arange(4.0)) is None
+
+
+def test_fit_clock_keeps_outliers_when_too_few_dates_remain():
+    # The two 2010 tips are far off the line through the tight 2000 group;
+    # dropping them would leave a single date to fit on
+    dates = np.array([2000.0] * 5 + [2010.0] * 2)
+    distances = np.array([0.1, 0.1001, 0.0999, 0.1002, 0.0998, 0.3, 0.7])
+    fit = clock.fit_clock(dates, distances)
+    assert not fit["outlier"].any()
+    assert fit["n"] == 7
+    assert fit["rate"] == pytest.approx(0.04)
@@ -0,0 +1,33 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from denviewer import clusters, phylo
+
+# Preorder ids: 0 root, 1 (A, B), 2 A, 3 B, 4 (C, D), 5 C, 6 D, 7 E
+NEWICK = "((A:1,B:2)95:0.5,(C:3,D:1)80:1,E:4);"
+
+
+@pytest.fixture
+def tree():
+    return phylo.from_newick(NEWICK)
+
+
+def test_subtree_diameters_match_brute_force(tree):
+    height, diameter = clusters.subtree_diameters(tree)
+    for v in np.flatnonzero(~tree.is_tip):
+        tips = tree.subtree_tips(v)
+        assert height[v] == max(tree.dist[t] - tree.dist[v] for t in tips)
+        assert diameter[v] == max(tree.patristic(s, t) for s, t in itertools.combinations(tips, 2))
+    assert diameter[0] == 8
+
+
+def test_find_clusters(tree):
+    tip_cluster, table = clusters.find_clusters(tree, max_distance=4)
+    assert tip_cluster.tolist() == [0, 0, 1, 1, -1]
+    assert table["Tips"].tolist() == [2, 2]
+    assert table["Max Distance"].tolist() == [3, 4]
+    # The (C, D) clade falls below the support threshold
+    tip_cluster, table = clusters.find_clusters(tree, max_distance=4, min_support=90)
+    assert tip_cluster.tolist() == [0, 0, -1, -1, -1]
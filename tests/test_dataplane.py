@@ -0,0 +1,25 @@
+import os
+
+import numpy as np
+
+from denviewer import dataplane
+
+
+def datasets(replaces=()):
+    return {"counts": {"arrays": {"values": np.arange(5)}, "meta": {"rows": 5}, "replaces": list(replaces)}}
+
+
+def test_publishing_the_same_inputs_twice_reuses_the_version(tmp_path, monkeypatch):
+    # Both within the same second
+    monkeypatch.setattr(dataplane.time, "strftime", lambda fmt: "20250101T000000")
+    root = str(tmp_path)
+    first = dataplane.publish(datasets(), root)
+    assert dataplane.publish(datasets(), root) == first
+    assert sorted(os.listdir(root)) == sorted([dataplane.POINTER_FILE, first])
+    assert dataplane.current_version(root) == first
+    np.testing.assert_array_equal(dataplane.open_version(first, root)["datasets"]["counts"]["arrays"]["values"],
+                                  np.arange(5))
+
+    # Anything in the manifest makes it a different version
+    other = dataplane.publish(datasets(replaces=["a.csv"]), root)
+    assert other != first and dataplane.current_version(root) == other
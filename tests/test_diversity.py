@@ -0,0 +1,31 @@
+import numpy as np
+
+from denviewer import diversity
+
+
+def test_window_means():
+    values = np.arange(1.0, 11.0)  # positions 1..10
+    cumsum = np.concatenate([[0], np.cumsum(values)])
+    centres, means = diversity.window_means(cumsum, width=3, step=2)
+    # Windows 1-3, 3-5, 5-7 and 7-9
+    assert centres.tolist() == [2, 4, 6, 8]
+    assert means.tolist() == [2, 4, 6, 8]
+    # A window wider than the genome is the whole genome
+    centres, means = diversity.window_means(cumsum, width=50, step=1)
+    assert centres.tolist() == [5.5] and means.tolist() == [5.5]
+
+
+def test_window_means_over_leading_axes():
+    cumsum = np.concatenate([np.zeros((2, 3, 1)), np.cumsum(np.ones((2, 3, 6)), axis=-1)], axis=-1)
+    centres, means = diversity.window_means(cumsum, width=2, step=2)
+    assert means.shape == (2, 3, 3)
+    assert (means == 1).all()
+
+
+def test_site_diversity_uses_the_table_sizes(repo_root):
+    from denviewer import mutations
+
+    site = diversity.site_diversity(mutations.read_mutations())
+    assert site["years"].tolist() == [2022, 2023]
+    # All pools the three classes the frequencies were computed over
+    assert site["sizes"].tolist() == [[1023, 522, 316, 185], [1294, 473, 405, 416]]
@@ -0,0 +1,71 @@
+import os
+import time
+
+import pandas as pd
+
+from denviewer import export, refresh
+
+
+def _touch(path, size, age):
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+
+
+def test_prune_keeps_recently_used_exports(tmp_path):
+    _touch(tmp_path / "old.csv", 100, age=3600)
+    _touch(tmp_path / "older.csv", 100, age=7200)
+    _touch(tmp_path / "recent.csv", 100, age=1)
+    _touch(tmp_path / "new.csv", 100, age=0)
+    export.prune(str(tmp_path), limit=150, grace=60)
+    # Over the limit, but the two used within the grace period stay
+    assert sorted(os.listdir(tmp_path)) == ["new.csv", "recent.csv"]
+
+
+def test_open_export_rewrites_a_file_pruned_before_it_is_opened(tmp_path, monkeypatch, repo_root):
+    monkeypatch.setattr(export, "EXPORT_DIR", str(tmp_path))
+    export_file = export.export_file
+    calls = []
+
+    def racing_export_file(*args):
+        path = export_file(*args)
+        if not calls:
+            os.remove(path)  # another process prunes it in between
+        calls.append(path)
+        return path
+
+    monkeypatch.setattr(export, "export_file", racing_export_file)
+    path, f = export.open_export("clinical", [("Severity", "in", ["Severe"])], ["Severity"], "csv")
+    with f:
+        lines = f.read().decode().splitlines()
+    assert len(calls) == 2 and os.path.exists(path)
+    assert lines[0] == "Severity" and set(lines[1:]) == {"Severe"}
+
+
+def test_exports_are_keyed_by_the_pinned_generation(tmp_path, monkeypatch, refresh_state):
+    monkeypatch.setattr(export, "EXPORT_DIR", str(tmp_path))
+    source = {"n": [1, 2]}
+
+    @refresh.cached
+    def table():
+        return pd.DataFrame({"n": source["n"]})
+
+    monkeypatch.setitem(export.VIEWS, "test", table)
+    monkeypatch.setattr(refresh, "get_script_run_ctx", lambda suppress_warning: object())
+    monkeypatch.setattr(refresh.st, "session_state", {})
+    refresh.pin()
+    old = export.export_file("test")
+
+    # The data changes and is refreshed while the session is still pinned
+    source["n"] = [3]
+    assert refresh.rebuild()
+    assert export.export_file("test") == old
+    with open(old) as f:
+        assert f.read() == "n\n1\n2\n"
+
+    refresh.pin()
+    new = export.export_file("test")
+    assert new != old
+    with open(new) as f:
+        assert f.read() == "n\n3\n"
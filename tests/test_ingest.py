@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from denviewer import ingest
+
+# Column 5 is an insertion relative to the reference and is dropped; s5 has no
+# demographic record and N is never called
+ALIGNMENT = """>NC_001474.2 reference
+ACGT-ACGT
+>s1 mild, 2022
+ACGTT
+ACGA
+>s2
+ACGT-ACGA
+>s3
+TCGT-ACGT
+>s4
+ACGT-ACNA
+>s5
+GCGT-ACGT
+"""
+
+
+def write_alignment(tmp_path):
+    path = tmp_path / "aligned.fasta"
+    path.write_text(ALIGNMENT)
+    return str(path)
+
+
+def test_read_fasta_joins_wrapped_lines(tmp_path):
+    records = list(ingest.read_fasta(write_alignment(tmp_path)))
+    assert [name for name, _ in records] == ["NC_001474.2", "s1", "s2", "s3", "s4", "s5"]
+    assert records[1][1] == "ACGTTACGA"
+
+
+def test_encode_alignment_to_memmap(tmp_path):
+    names, matrix = ingest.encode_alignment(write_alignment(tmp_path), str(tmp_path / "aln.npy"))
+    assert matrix.shape == (6, 9)
+    assert bytes(matrix[3]).decode() == "TCGT-ACGT"
+    np.testing.assert_array_equal(np.load(tmp_path / "aln.npy"), matrix)
+
+
+def test_allele_counts_is_independent_of_chunking(tmp_path):
+    names, matrix = ingest.encode_alignment(write_alignment(tmp_path))
+    groups = np.array([-1, 0, 0, 1, 1, -1])
+    counts, ref_columns = ingest.allele_counts(matrix, 0, groups, 2)
+    chunked, _ = ingest.allele_counts(matrix, 0, groups, 2, chunk_rows=1)
+    assert ref_columns.tolist() == [0, 1, 2, 3, 5, 6, 7, 8]
+    np.testing.assert_array_equal(counts, chunked)
+    # Position 8: T in s3, A in s1, s2 and s4, N in none of them
+    assert counts[:, :, 7].tolist() == [[2, 0, 0, 0], [1, 0, 0, 1]]
+    assert counts[1, :, 6].sum() == 1  # s4 has N at position 7
+
+
+def test_mutation_table(tmp_path):
+    names, matrix = ingest.encode_alignment(write_alignment(tmp_path))
+    demographics = pd.DataFrame({
+        "strain": ["s1", "s2", "s3", "s4"],
+        "Collection_date": pd.PeriodIndex(["2022-03", "2022-05", "2022-07", "2023-01"], freq="M"),
+        "Severity": pd.Categorical(["Mild", "Severe", None, "Mild"]),
+    })
+    table = ingest.mutation_table(names, matrix, demographics)
+    assert table[["Year", "Mutation", "Gene", "Mutation Type"]].values.tolist() == [
+        [2022, "A1T", "5'UTR", "Upstream Gene Variant"],
+        [2022, "T8A", "5'UTR", "Upstream Gene Variant"],
+        [2023, "T8A", "5'UTR", "Upstream Gene Variant"],
+    ]
+    # 2022 has three genomes, one of them mild and one severe
+    assert table["Frequency"].tolist() == [1 / 3, 2 / 3, 1]
+    assert table["Mild Frequency"].tolist() == [0, 1, 1]
+    assert table["Moderate Frequency"].tolist() == [0, 0, 0]
+    assert table["Severe Frequency"].tolist() == [0, 1, 0]
+
+
+def test_annotate_codons():
+    # Polyprotein starts at 97 with ATG GCT TGG
+    reference = "A" * 96 + "ATGGCTTGG"
+    table = ingest.annotate([99, 102, 104, 50], ["G", "T", "G", "A"], ["A", "C", "A", "C"], reference)
+    assert table["Gene"].tolist() == ["C", "C", "C", "5'UTR"]
+    assert table["AA_mut"].tolist() == ["p.Met1Ile", "p.Ala2Ala", "p.Trp3Ter", ""]
+    assert table["Mutation Type"].tolist() == [
+        "Missense Variant", "Synonymous Variant", "Stop Gained", "Upstream Gene Variant",
+    ]
@@ -0,0 +1,131 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from denviewer import mutations
+
+
+def test_benjamini_hochberg_within_each_year():
+    p = [0.01, 0.04, 0.03, 0.2, 0.5]
+    years = [2022, 2022, 2022, 2022, 2023]
+    # 2022: p * 4 / rank = 0.04, 0.06, 0.0533, 0.2, then the running minimum
+    # from the largest p down pulls 0.06 to 0.0533; 2023 is a family of one
+    q = mutations.benjamini_hochberg(p, years)
+    assert q == pytest.approx([0.04, 0.04 * 4 / 3, 0.04 * 4 / 3, 0.2, 0.5])
+
+
+def test_sample_sizes_counts_sequenced_genomes():
+    demographics = pd.DataFrame({
+        "strain": ["a", "b", "b", "c", "d", None, "e"],
+        "Collection_date": pd.PeriodIndex(
+            ["2021-01", "2021-02", "2021-02", "2021-03", "2022-01", "2022-01", "2022-05"], freq="M"
+        ),
+        "Severity": ["Mild", "Severe", "Severe", "Mild", "Severe", "Mild", None],
+    })
+    sizes = mutations.sample_sizes(demographics)
+    assert sizes.index.tolist() == [2021, 2022]
+    assert sizes.to_dict("list") == {
+        "Mild Frequency": [2, 0],
+        "Moderate Frequency": [0, 0],
+        "Severe Frequency": [1, 1],
+    }
+
+
+
+def test_group_sizes_from_the_frequencies():
+    df = pd.DataFrame({
+        "Year": [2021, 2021, 2021, 2022],
+        "Mild Frequency": [1 / 7, 3 / 7, 1.0, 0.5],
+        "Moderate Frequency": [0.0, 0.0, 0.0, 0.25],
+        "Severe Frequency": [2 / 6, 0.5, np.nan, 0.0],
+    })
+    sizes = mutations.group_sizes(df)
+    # Severe 1 / 3 and 1 / 2 are first both whole counts out of 6; the missing
+    # value counts as 0 and Moderate has no genomes in 2021
+    assert sizes.to_dict("index") == {
+        2021: {"Mild Frequency": 7, "Moderate Frequency": 0, "Severe Frequency": 6},
+        2022: {"Mild Frequency": 2, "Moderate Frequency": 4, "Severe Frequency": 0},
+    }
+    with pytest.raises(ValueError):
+        mutations.group_sizes(df.assign(**{"Mild Frequency": [0.123456789, 0, 0, 0]}), max_size=50)
+
+
+def test_size_mismatches():
+    sizes = pd.DataFrame(
+        {"Mild Frequency": [7], "Moderate Frequency": [0], "Severe Frequency": [6]}, index=pd.Index([2021], name="Year"),
+    )
+    samples = pd.DataFrame({"Mild Frequency": [7], "Severe Frequency": [5]}, index=[2021])
+    mismatches = mutations.size_mismatches(sizes, samples)
+    assert mismatches.values.tolist() == [[2021, "Severe", 6, 5]]
+
+
+def test_curated_table_counts_are_whole(repo_root):
+    df = mutations.read_mutations()
+    sizes = mutations.group_sizes(df)
+    assert sizes.loc[2022].tolist() == [522, 316, 185]
+    n = sizes.reindex(df["Year"]).to_numpy(dtype=np.float64)
+    counts = df[list(mutations.SEVERITY_FREQUENCIES.values())].fillna(0).to_numpy() * n
+    assert np.abs(counts - np.round(counts)).max() < 1e-6
+    # The overall frequency is over the three classes together
+    total = df["Frequency"].to_numpy() * n.sum(axis=1)
+    assert np.abs(total - np.round(total)).max() < 1e-6
+
+def _table(rows):
+    return pd.DataFrame([
+        {"Mutation": name, "Position": i + 1, "Gene": "E", "AA_mut": "", "Mutation Type": "", "Year": year,
+         "Mild Frequency": mild, "Moderate Frequency": moderate, "Severe Frequency": severe}
+        for i, (name, year, mild, moderate, severe) in enumerate(rows)
+    ])
+
+
+def test_severity_association_by_hand():
+    sizes = pd.DataFrame(
+        {"Mild Frequency": [10, 20], "Moderate Frequency": [10, 0], "Severe Frequency": [10, 20]},
+        index=pd.Index([2020, 2021], name="Year"),
+    )
+    df = _table([
+        ("A", 2020, 0.2, 0.5, 0.8),   # carriers 2 / 5 / 8 of 10 each
+        ("B", 2021, 0.2, 0.0, 0.6),   # no moderate genomes: 4 / 12 of 20
+        ("C", 2021, 0.05, 0.0, 0.0),  # a single mild carrier
+        ("D", 2020, 0.0, 0.0, 0.0),   # nobody carries it
+    ])
+    result = mutations.severity_association(df, sizes).set_index("Mutation")
+
+    # A: every expected count is 5, chi2 = 2 * (9 + 0 + 9) / 5 on 2 df
+    assert result.loc["A", ["Mild Carriers", "Moderate Carriers", "Severe Carriers"]].tolist() == [2, 5, 8]
+    assert result.loc["A", "Chi-square"] == pytest.approx(7.2)
+    assert result.loc["A", "df"] == 2
+    assert result.loc["A", "p-value"] == pytest.approx(math.exp(-3.6))
+    assert result.loc["A", "Low Expected Cells"] == 0
+    assert result.loc["A", "log2 OR (Severe vs Mild)"] == pytest.approx(math.log2(8.5 * 8.5 / (2.5 * 2.5)))
+
+    # B: 2 x 2 table [[4, 12], [16, 8]], expected [[8, 8], [12, 12]], 1 df
+    chi2 = 2 * 16 / 8 + 2 * 16 / 12
+    assert result.loc["B", "Chi-square"] == pytest.approx(chi2)
+    assert result.loc["B", "df"] == 1
+    assert result.loc["B", "p-value"] == pytest.approx(math.erfc(math.sqrt(chi2 / 2)))
+    assert result.loc["B", "Low Expected Cells"] == 0
+
+    # C: expected carriers 0.5 in each class are flagged
+    assert result.loc["C", "Chi-square"] == pytest.approx(1 + 2 * 0.25 / 19.5)
+    assert result.loc["C", "Low Expected Cells"] == 2
+
+    # D: no carriers, so nothing to test
+    assert result.loc["D", "df"] == 0
+    assert result.loc["D", "p-value"] == 1.0
+
+    # Within 2021, B and C are one family of two tests
+    p_b, p_c = result.loc["B", "p-value"], result.loc["C", "p-value"]
+    assert result.loc["B", "q-value"] == pytest.approx(min(p_b * 2, p_c))
+
+
+def test_odds_ratio_needs_mild_and_severe_genomes():
+    sizes = pd.DataFrame(
+        {"Mild Frequency": [0], "Moderate Frequency": [10], "Severe Frequency": [10]},
+        index=pd.Index([2020], name="Year"),
+    )
+    result = mutations.severity_association(_table([("A", 2020, 0.0, 0.1, 0.5)]), sizes)
+    assert np.isnan(result["log2 OR (Severe vs Mild)"].iloc[0])
+    assert result["df"].iloc[0] == 1
@@ -0,0 +1,37 @@
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+PHYLOGENY_PAGE = "pages/4_🌿 Phylogeny.py"
+PHYLOGENY_FILES = ["pages/files/tree.nwk", "pages/files/all_clade.csv"]
+
+
+def test_phylogeny_coloured_by_id_column(repo_root):
+    missing = [path for path in PHYLOGENY_FILES if not os.path.exists(path)]
+    if missing:
+        pytest.skip(f"data files not present: {', '.join(missing)}")
+    at = AppTest.from_file(PHYLOGENY_PAGE, default_timeout=300).run()
+    assert not at.exception
+    colour = next(w for w in at.selectbox if w.label == "Select metadata column for coloring:")
+    colour.set_value("IGIB_id").run()
+    assert not at.exception, at.exception[0].message
+    assert at.get("plotly_chart")
+
+
+def test_phylogeny_tip_selection_survives_a_new_search(repo_root):
+    missing = [path for path in PHYLOGENY_FILES if not os.path.exists(path)]
+    if missing:
+        pytest.skip(f"data files not present: {', '.join(missing)}")
+    from denviewer import tipsearch
+
+    tip = int(tipsearch.search(tipsearch.load_search_index(), "B2B23")[1])
+    at = AppTest.from_file(PHYLOGENY_PAGE, default_timeout=300).run()
+    at.text_input[0].input("B2B23").run()
+    at.multiselect(key="tip_picker").select(tip).run()
+    # A query the picked tip does not match changes every option
+    at.text_input[0].input("2023-08").run()
+    assert not at.exception, at.exception[0].message
+    picker = at.multiselect(key="tip_picker")
+    assert picker.label == "Matching samples"
+    assert picker.value == [tip]
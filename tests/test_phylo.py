@@ -0,0 +1,62 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from denviewer import phylo
+
+# Preorder ids: 0 root, 1 (A, B c), 2 A, 3 B c, 4 (C, D), 5 C, 6 D, 7 it's
+NEWICK = "((A:1,'B c':2)95:0.5,(C:3,D:1)'80/90':1[&comment],'it''s':4);"
+
+
+@pytest.fixture
+def tree():
+    return phylo.from_newick(NEWICK)
+
+
+def test_parse_labels_support_and_lengths(tree):
+    assert tree.names.tolist() == ["", "95", "A", "B c", "80/90", "C", "D", "it's"]
+    assert tree.parent.tolist() == [-1, 0, 1, 1, 0, 4, 4, 0]
+    assert tree.length.tolist() == [0, 0.5, 1, 2, 1, 3, 1, 4]
+    assert tree.dist[tree.tips].tolist() == [1.5, 2.5, 4, 2, 4]
+    # Support from internal labels only, the first value of "80/90"
+    np.testing.assert_array_equal(tree.support, [np.nan, 95, np.nan, np.nan, 80, np.nan, np.nan, np.nan])
+    assert tree.subtree_tips(4).tolist() == [5, 6]
+
+
+def test_parse_rejects_unbalanced_parentheses():
+    with pytest.raises(ValueError):
+        phylo.parse_newick("((A,B);")
+
+
+def test_lca_mrca_and_patristic(tree):
+    a, b, c, d, e = (tree.node(name) for name in ["A", "B c", "C", "D", "it's"])
+    assert tree.lca(a, b) == 1
+    assert tree.lca(c, c) == c
+    assert tree.lca(np.array([a, c]), np.array([b, d])).tolist() == [1, 4]
+    assert tree.mrca([c, d]) == 4
+    assert tree.mrca([a, d]) == 0
+    assert tree.patristic(a, b) == 3
+    assert tree.patristic(a, d) == 3.5
+    assert tree.patristic(c, e) == 8
+    assert tree.path_to_root(d).tolist() == [d, 4, 0]
+
+
+def test_arrays_round_trip(tree):
+    copy = phylo.ArrayTree.from_arrays(tree.names, tree.to_arrays())
+    pairs = np.array(list(itertools.combinations(tree.tips, 2)))
+    np.testing.assert_array_equal(copy.lca(pairs[:, 0], pairs[:, 1]), tree.lca(pairs[:, 0], pairs[:, 1]))
+    assert copy.node("it's") == tree.node("it's")
+
+
+def test_rectangular_layout_and_segments(tree):
+    x, y = phylo.rectangular_layout(tree)
+    assert y[tree.tips].tolist() == [0, 1, 2, 3, 4]
+    assert y[[1, 4]].tolist() == [0.5, 2.5]
+    assert y[0] == pytest.approx((0.5 + 2.5 + 4) / 3)
+    assert x.tolist() == tree.level.tolist()
+    xs, ys = phylo.edge_segments(tree, x, y)
+    assert len(xs) == len(ys) == 4 * (tree.n - 1)
+    # The edge to D: down from its parent's row, then across to its depth
+    assert xs[4 * 5:4 * 5 + 3].tolist() == [1, 1, 2]
+    assert ys[4 * 5:4 * 5 + 3].tolist() == [2.5, 3, 3]
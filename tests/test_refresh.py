@@ -0,0 +1,127 @@
+import pytest
+
+from denviewer import refresh
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(refresh_state):
+    pass
+
+
+def counting_loaders():
+    calls = []
+
+    @refresh.cached
+    def table(path="a.csv"):
+        calls.append(("table", path))
+        return path
+
+    @refresh.cached
+    def clusters(threshold, min_size=2):
+        calls.append(("clusters", threshold))
+        return threshold * min_size
+
+    return table, clusters, calls
+
+
+def test_argument_entries_are_least_recently_used(monkeypatch):
+    monkeypatch.setattr(refresh, "MAX_ARGUMENT_ENTRIES", 2)
+    table, clusters, calls = counting_loaders()
+    table()
+    clusters(1)
+    clusters(2)
+    clusters(1)  # cached, and now more recent than 2
+    clusters(3)  # evicts 2
+    assert calls == [("table", "a.csv"), ("clusters", 1), ("clusters", 2), ("clusters", 3)]
+    clusters(1)
+    clusters(2)
+    assert calls[-1] == ("clusters", 2)
+    assert len(refresh._recent) == 2
+    # The no-argument entry is not counted or evicted
+    table()
+    assert calls.count(("table", "a.csv")) == 1
+
+
+def test_rebuild_warms_only_no_argument_loaders():
+    table, clusters, calls = counting_loaders()
+    table()
+    clusters(5)
+    calls.clear()
+    assert refresh.rebuild()
+    assert calls == [("table", "a.csv")]
+    assert refresh._state == {"live": 1, "oldest": 0, "watcher": None}
+    clusters(5)  # recomputed on demand under the new generation
+    assert calls[-1] == ("clusters", 5)
+
+
+def test_failed_rebuild_keeps_live_generation():
+    fail = []
+
+    @refresh.cached
+    def flaky():
+        if fail:
+            raise OSError("half-written file")
+        return "ok"
+
+    flaky()
+    fail.append(True)
+    assert not refresh.rebuild()
+    assert refresh._state["live"] == 0
+    assert all(key[1] == 0 for key in refresh._entries)
+    assert flaky() == "ok"
+
+
+def test_watcher_retries_until_a_rebuild_succeeds(monkeypatch):
+    class Done(Exception):
+        pass
+
+    snapshots = iter([{"f": 1}] * 4)
+    results = iter([False, True])
+    rebuilds = []
+
+    def snapshot():
+        try:
+            return next(snapshots)
+        except StopIteration:
+            raise Done
+
+    def rebuild():
+        rebuilds.append(True)
+        return next(results)
+
+    monkeypatch.setattr(refresh, "snapshot", snapshot)
+    monkeypatch.setattr(refresh, "rebuild", rebuild)
+    monkeypatch.setattr(refresh.time, "sleep", lambda seconds: None)
+    with pytest.raises(Done):
+        refresh._watch({"f": 0}, 0)
+    # Settled on the second poll, failed, retried on the third, then seen
+    assert len(rebuilds) == 2
+
+
+def test_runs_pinned_to_a_dropped_generation_read_the_live_one(monkeypatch):
+    session = {}
+    monkeypatch.setattr(refresh, "get_script_run_ctx", lambda suppress_warning: object())
+    monkeypatch.setattr(refresh.st, "session_state", session)
+    refresh.pin()
+    assert refresh.generation() == 0
+    refresh.rebuild()
+    assert refresh.generation() == 0  # the previous generation is still kept
+    refresh.rebuild()
+    assert refresh.generation() == 2
+
+
+def test_failed_compute_releases_its_build_lock():
+    fail = [True]
+
+    @refresh.cached
+    def flaky():
+        if fail:
+            raise OSError("half-written file")
+        return "ok"
+
+    with pytest.raises(OSError):
+        flaky()
+    assert refresh._building == {}
+    fail.clear()
+    assert flaky() == "ok"
+    assert refresh._building == {}